@@ -0,0 +1,247 @@
+"""Computer player for combine.py.
+
+The search runs on a background thread so the pygame loop keeps drawing at
+60 FPS while the computer thinks.  The render loop spends most of each frame
+asleep in clock.tick(), which releases the GIL to the search thread; the
+search in turn only holds the GIL for the interpreter's switch interval
+before the loop gets it back.
+
+Run this module directly to measure every strength level:
+    python ai.py --positions 20
+"""
+
+import argparse
+import logging
+import random
+import sys
+import threading
+import time
+
+from engine import Position, SearchState, encode_move, decode_move
+from search import Searcher, SearchAborted, SearchResult, move_to_board
+from book import OpeningBook
+from search_cache import SearchCache
+from search_stats import SearchStats, OFF
+
+logger = logging.getLogger(__name__)
+
+# Opened on the first probe, so importing this module stays cheap.
+OPENING_BOOK = OpeningBook()
+# Set by open_search_cache(); None leaves caching off.
+SEARCH_CACHE = None
+# Set by open_search_stats(); None counts nothing.
+SEARCH_STATS = None
+
+# Alpha-beta levels cap the search depth; the MCTS level caps playouts.
+# Both stop when the time per move runs out.  Levels with "book" play the
+# opening book's best move while the game is still in it; levels with
+# "cache" reuse a cached search that went at least as deep or had at least
+# as much time, and add their own results to the cache.
+STRENGTH_LEVELS = [
+    {"label": "Easy", "searcher": "alphabeta", "depth": 2, "time": 0.05,
+     "book": False, "cache": False},
+    {"label": "Medium", "searcher": "alphabeta", "depth": 4, "time": 0.2,
+     "book": True, "cache": True},
+    {"label": "Hard", "searcher": "alphabeta", "depth": 64, "time": 0.5,
+     "book": True, "cache": True},
+    {"label": "Expert", "searcher": "alphabeta", "depth": 64, "time": 2.0,
+     "book": True, "cache": True},
+    {"label": "MCTS", "searcher": "mcts", "iterations": 8192, "time": 1.0,
+     "book": False, "cache": False},
+]
+DEFAULT_LEVEL = 1
+
+
+class SearchJob:
+    """One search started by an AIPlayer.
+
+    The worker thread writes only to its own job and sets `finished` last,
+    so a cancelled search that ends late can never touch a newer one.
+    """
+
+    def __init__(self, position, level):
+        self.position = position
+        self.level = level
+        self.stop_event = threading.Event()
+        self.finished = threading.Event()
+        self.result = None
+
+    def run(self):
+        try:
+            self.result = run_level(self.level, self.position, self.stop_event)
+        except SearchAborted:
+            pass
+        except Exception:
+            # Keep the game going: log the failure and play any legal move.
+            logger.exception("AI search failed for %r", self.position)
+            moves = self.position.legal_moves()
+            if moves:
+                self.result = SearchResult(moves[0], 0, 0, 0, 0.0)
+        finally:
+            self.finished.set()
+
+
+class AIPlayer:
+    """Plays one side of a GameState using a search on a worker thread."""
+
+    def __init__(self, plays_fox, level=DEFAULT_LEVEL):
+        self.plays_fox = plays_fox
+        self.level = level
+        self.job = None
+        self.thread = None
+        self.last_result = None
+
+    def label(self):
+        return STRENGTH_LEVELS[self.level]["label"]
+
+    def is_turn(self, game_state):
+        return not game_state.game_over and game_state.fox_turn == self.plays_fox
+
+    def is_thinking(self):
+        return self.job is not None
+
+    def start(self, game_state):
+        """Begin searching the current position unless already doing so."""
+        if self.job is not None or not self.is_turn(game_state):
+            return
+        self.job = SearchJob(Position.from_game_state(game_state),
+                             STRENGTH_LEVELS[self.level])
+        self.thread = threading.Thread(target=self.job.run, daemon=True)
+        self.thread.start()
+
+    def poll(self, game_state):
+        """Play the finished search's move on `game_state`; True if it moved."""
+        job = self.job
+        if job is None or not job.finished.is_set():
+            return False
+        self.job = None
+        self.thread = None
+        result = job.result
+        if result is None or result.move is None:
+            return False
+        self.last_result = result
+        (from_r, from_c), (to_r, to_c) = move_to_board(result.move)
+        game_state.select_piece(from_r, from_c)
+        return game_state.move_piece(to_r, to_c)
+
+    def cancel(self):
+        """Abandon any search in progress; it stops within a few ms."""
+        if self.job is not None:
+            self.job.stop_event.set()
+        self.job = None
+        self.thread = None
+
+
+def run_level(level, position, stop_event=None):
+    """Pick a move for `position` at strength `level`; returns a SearchResult."""
+    if level.get("book"):
+        started = time.perf_counter()
+        entry = OPENING_BOOK.best_move(position)
+        if entry is not None:
+            move, score = entry
+            return SearchResult(move, score, 0, 0, time.perf_counter() - started)
+    if level["searcher"] == "mcts":
+        # NumPy is only needed for this level.
+        from mcts import MCTS
+        mcts = MCTS(level["iterations"], stop_event=stop_event)
+        return mcts.search(position, level["time"])
+    cache = SEARCH_CACHE if level.get("cache") else None
+    budget_ms = int(level["time"] * 1000)
+    if cache is not None:
+        started = time.perf_counter()
+        entry = cache.get(position.key())
+        if entry is not None and (entry.depth >= level["depth"] or
+                                  entry.budget_ms >= budget_ms):
+            return SearchResult(decode_move(entry.move), entry.score,
+                                entry.depth, 0, time.perf_counter() - started)
+    searcher = Searcher(stop_event=stop_event, stats=SEARCH_STATS)
+    result = searcher.search_timed(position, level["time"], level["depth"])
+    if cache is not None and result.move is not None and result.depth:
+        cache.put(position.key(), result.depth, result.score,
+                  encode_move(result.move), budget_ms)
+    return result
+
+
+def open_search_cache(path, max_entries=200000):
+    """Turn on the persistent search cache, loading it in the background."""
+    global SEARCH_CACHE
+    SEARCH_CACHE = SearchCache(path, max_entries)
+    SEARCH_CACHE.load_async()
+    return SEARCH_CACHE
+
+
+def close_search_cache():
+    """Write new cache entries to disk and turn the cache off."""
+    global SEARCH_CACHE
+    if SEARCH_CACHE is not None:
+        SEARCH_CACHE.close()
+        SEARCH_CACHE = None
+
+
+def open_search_stats(mode, path=None, sample_every=16):
+    """Count alpha-beta searches in `mode`, appending JSON lines to `path`."""
+    global SEARCH_STATS
+    close_search_stats()
+    if mode != OFF:
+        SEARCH_STATS = SearchStats(mode, sample_every, path)
+    return SEARCH_STATS
+
+
+def close_search_stats():
+    global SEARCH_STATS
+    if SEARCH_STATS is not None:
+        SEARCH_STATS.close()
+        SEARCH_STATS = None
+
+
+################################################################################
+# Strength measurement
+################################################################################
+def sample_positions(count, seed=0, max_plies=40):
+    """Positions reached by random play from the start, for benchmarking."""
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        state = SearchState()
+        for _ in range(rng.randrange(max_plies)):
+            if state.is_game_over():
+                break
+            state.make(rng.choice(state.legal_moves()))
+        if not state.is_game_over():
+            positions.append(state.position())
+    return positions
+
+
+def measure_level(level, positions):
+    """(nodes per second, mean seconds per move) for one strength level.
+
+    For MCTS levels the "nodes" are playouts.
+    """
+    nodes = 0
+    elapsed = 0.0
+    for position in positions:
+        result = run_level(STRENGTH_LEVELS[level], position)
+        nodes += result.nodes
+        elapsed += result.elapsed
+    return nodes / elapsed if elapsed else 0.0, elapsed / len(positions)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure AI strength levels")
+    parser.add_argument("--positions", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    positions = sample_positions(args.positions, args.seed)
+    for level, settings in enumerate(STRENGTH_LEVELS):
+        started = time.perf_counter()
+        nps, per_move = measure_level(level, positions)
+        unit = "playouts/s" if settings["searcher"] == "mcts" else "nodes/s"
+        print("%-7s %5.0f ms budget: %8.0f %-10s %7.1f ms/move  (%.1fs total)" % (
+            settings["label"], settings["time"] * 1000, nps, unit,
+            per_move * 1000, time.perf_counter() - started))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,280 @@
+"""Headless matches between computer players, with Elo ratings.
+
+Agents are named by spec strings:
+
+    random                    uniformly random legal moves
+    alphabeta:<depth>         fixed-depth alpha-beta (search.Searcher)
+    mcts:<playouts>           MCTS with a fixed playout count
+    level:<label>             an ai.STRENGTH_LEVELS entry, e.g. level:Hard
+                              (time-limited, so results depend on the machine)
+    py:<module>.<factory>     any factory(seed) returning an object with a
+                              choose(position) -> move method
+
+Every pair of agents plays game pairs: both games of a pair start with the
+same few random opening plies (so deterministic agents do not repeat one
+game forever) and the agents swap sides between them.  A game's seed is
+derived from --seed and its number alone, so a rerun replays the same games
+for every agent except the time-limited ones.  --first picks which side
+moves first: geese as in combine.py, fox as in game.py, or both.
+
+Games run in a process pool and results are reported as they arrive.
+Ratings are a Bradley-Terry fit (draws count half) anchored so the first
+agent is 0, with 95% error bars from the fit's curvature; --stop-width ends
+the run once every error bar is narrower than that.
+
+Usage:
+    python arena.py random alphabeta:2 alphabeta:4 --games 200 --workers 4
+    python arena.py level:Medium level:Hard --games 1000 --stop-width 50
+"""
+
+import argparse
+import importlib
+import itertools
+import math
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+from engine import Position, SearchState
+from rules import DrawRules, REPETITION_LIMIT
+
+FIRST_CHOICES = ("geese", "fox", "both")
+
+
+################################################################################
+# Agents
+################################################################################
+class RandomAgent:
+    def __init__(self, seed):
+        self.rng = random.Random(seed)
+
+    def choose(self, position):
+        return self.rng.choice(position.legal_moves())
+
+
+class AlphaBetaAgent:
+    def __init__(self, depth, seed):
+        from search import Searcher
+        self.depth = depth
+        self.searcher = Searcher(tt_bits=16)
+
+    def choose(self, position):
+        return self.searcher.search(position, self.depth).move
+
+
+class MCTSAgent:
+    def __init__(self, playouts, seed):
+        from mcts import MCTS
+        self.mcts = MCTS(playouts, seed=seed)
+
+    def choose(self, position):
+        return self.mcts.search(position).move
+
+
+class LevelAgent:
+    def __init__(self, label, seed):
+        import ai
+        levels = {level["label"].lower(): level for level in ai.STRENGTH_LEVELS}
+        if label.lower() not in levels:
+            raise ValueError("unknown level %r" % label)
+        self.level = levels[label.lower()]
+        self.run_level = ai.run_level
+
+    def choose(self, position):
+        return self.run_level(self.level, position).move
+
+
+def make_agent(spec, seed):
+    """Build the agent named by `spec` (see the module docstring)."""
+    kind, _, argument = spec.partition(":")
+    if kind == "random":
+        return RandomAgent(seed)
+    if kind == "alphabeta":
+        return AlphaBetaAgent(int(argument), seed)
+    if kind == "mcts":
+        return MCTSAgent(int(argument), seed)
+    if kind == "level":
+        return LevelAgent(argument, seed)
+    if kind == "py":
+        module, _, name = argument.rpartition(".")
+        return getattr(importlib.import_module(module), name)(seed)
+    raise ValueError("unknown agent spec %r" % spec)
+
+
+################################################################################
+# Games
+################################################################################
+def play_game(task):
+    """Play one game; run in a pool worker.
+
+    task is (game number, fox spec, geese spec, fox moves first, opening
+    plies, max plies, base seed).  Returns (game number, fox spec, geese
+    spec, result) with result 1 fox won, 0 geese won, 0.5 draw.
+    """
+    number, fox_spec, geese_spec, fox_first, opening, max_plies, seed = task
+    # Both games of a pair share the opening.
+    opening_rng = random.Random("opening/%d/%d" % (seed, number // 2))
+    agent_seed = (seed * 1000003 + number) * 2
+    agents = {True: make_agent(fox_spec, agent_seed),
+              False: make_agent(geese_spec, agent_seed + 1)}
+    start = Position.start()
+    state = SearchState(Position(start.fox, start.geese, fox_first))
+    draw_rules = DrawRules(REPETITION_LIMIT, max_plies)
+    draw_rules.reset(state.key)
+    while not state.is_game_over():
+        if draw_rules.ply < opening:
+            move = opening_rng.choice(state.legal_moves())
+        else:
+            move = agents[state.fox_turn].choose(state.position())
+        state.make(move)
+        if draw_rules.record(state.key, move[2] is not None) is not None:
+            break
+    winner = state.winner()
+    result = 0.5 if winner is None else (1.0 if winner == "Fox" else 0.0)
+    return number, fox_spec, geese_spec, result
+
+
+def schedule(specs, games_per_pairing, first, opening, max_plies, seed):
+    """Game tasks, interleaved across pairings so partial results stay fair."""
+    pairings = list(itertools.combinations(specs, 2))
+    firsts = {"geese": [False], "fox": [True], "both": [False, True]}[first]
+    tasks = []
+    number = 0
+    for pair in range(games_per_pairing // 2):
+        fox_first = firsts[pair % len(firsts)]
+        for a, b in pairings:
+            tasks.append((number, a, b, fox_first, opening, max_plies, seed))
+            tasks.append((number + 1, b, a, fox_first, opening, max_plies, seed))
+            number += 2
+    return tasks
+
+
+################################################################################
+# Ratings
+################################################################################
+class Scoreboard:
+    """Accumulates results and fits Elo ratings."""
+
+    def __init__(self, specs):
+        self.specs = list(specs)
+        index = {spec: i for i, spec in enumerate(self.specs)}
+        self.index = index
+        count = len(self.specs)
+        # points[i][j]: points i scored against j; games[i][j]: games played.
+        self.points = [[0.0] * count for _ in range(count)]
+        self.games = [[0] * count for _ in range(count)]
+        self.fox_points = 0.0
+        self.total = 0
+
+    def add(self, fox_spec, geese_spec, result):
+        fox = self.index[fox_spec]
+        geese = self.index[geese_spec]
+        self.points[fox][geese] += result
+        self.points[geese][fox] += 1.0 - result
+        self.games[fox][geese] += 1
+        self.games[geese][fox] += 1
+        self.fox_points += result
+        self.total += 1
+
+    def ratings(self, iterations=200):
+        """[(spec, elo, 95% half-width)], the first agent anchored at 0."""
+        count = len(self.specs)
+        # One virtual drawn game against a strength-1 opponent keeps
+        # all-win and all-loss records finite.
+        strength = [1.0] * count
+        for _ in range(iterations):
+            for i in range(count):
+                wins = 0.5
+                denominator = 1.0 / (strength[i] + 1.0)
+                for j in range(count):
+                    if self.games[i][j]:
+                        wins += self.points[i][j]
+                        denominator += (self.games[i][j] /
+                                        (strength[i] + strength[j]))
+                strength[i] = wins / denominator
+            anchor = strength[0]
+            strength = [s / anchor for s in strength]
+        scale = 400 / math.log(10)
+        rows = []
+        for i in range(count):
+            information = 0.0
+            for j in range(count):
+                if self.games[i][j]:
+                    p = strength[i] / (strength[i] + strength[j])
+                    information += self.games[i][j] * p * (1 - p)
+            elo = scale * math.log(strength[i])
+            if i == 0:
+                width = 0.0
+            elif information:
+                width = 1.96 * scale / math.sqrt(information)
+            else:
+                width = math.inf
+            rows.append((self.specs[i], elo, width))
+        return rows
+
+    def report(self):
+        lines = []
+        for spec, elo, width in self.ratings():
+            i = self.index[spec]
+            played = sum(self.games[i])
+            score = sum(self.points[i]) / played if played else 0.0
+            lines.append("  %-20s %+7.0f +/- %-5.0f  score %.3f in %d games" % (
+                spec, elo, width, score, played))
+        if self.total:
+            lines.append("  fox side scored %.3f" % (self.fox_points / self.total))
+        return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play agents against each other")
+    parser.add_argument("agents", nargs="+", help="two or more agent specs")
+    parser.add_argument("--games", type=int, default=100,
+                        help="games per pairing (rounded down to pairs)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--first", choices=FIRST_CHOICES, default="geese",
+                        help="side to move first")
+    parser.add_argument("--opening", type=int, default=4,
+                        help="random plies before the agents take over")
+    parser.add_argument("--max-plies", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stop-width", type=float, default=0.0,
+                        help="stop once every 95%% Elo error bar is narrower")
+    parser.add_argument("--report-every", type=int, default=20)
+    args = parser.parse_args(argv)
+    if len(args.agents) < 2:
+        parser.error("need at least two agents")
+    for spec in args.agents:
+        make_agent(spec, 0)  # fail early on a bad spec
+
+    tasks = schedule(args.agents, args.games, args.first, args.opening,
+                     args.max_plies, args.seed)
+    board = Scoreboard(args.agents)
+    started = time.perf_counter()
+    stopped_early = False
+    with multiprocessing.Pool(args.workers) as pool:
+        for _, fox_spec, geese_spec, result in pool.imap_unordered(play_game, tasks):
+            board.add(fox_spec, geese_spec, result)
+            if board.total % args.report_every == 0 or board.total == len(tasks):
+                elapsed = time.perf_counter() - started
+                print("%d/%d games, %.1f games/s" % (
+                    board.total, len(tasks), board.total / elapsed))
+                print(board.report())
+                sys.stdout.flush()
+            if args.stop_width and board.total % 2 == 0:
+                widths = [width for _, _, width in board.ratings()[1:]]
+                if max(widths) < args.stop_width:
+                    stopped_early = True
+                    pool.terminate()
+                    break
+    elapsed = time.perf_counter() - started
+    print("%s after %d games in %.1fs (%.1f games/s)" % (
+        "stopped early" if stopped_early else "finished", board.total,
+        elapsed, board.total / elapsed))
+    print(board.report())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""Vectorized environment that advances N games per call.
+
+All game state lives in NumPy arrays (see vector_rules), so one step() for
+every game is a fixed number of array operations.  Finished games are reset
+to the start position in place, and the observation returned for them is the
+fresh start, as in most vectorized RL environments.
+
+Observations are (N, 34) int8: the 33 points in engine.POINTS order using
+the GameState.board encoding (0 empty, 1 fox, 2 goose), then the side to
+move (1 fox, 0 geese).  Actions use vector_rules' discrete action space,
+from_point * 33 + to_point, with an (N, NUM_ACTIONS) legal-action mask.
+
+Rewards are for the side that just moved: +1 if its move won the game, 0
+otherwise.  Games are drawn by rules.DrawRules: the same position a third
+time, or `max_plies` plies.
+
+Run this module directly for steps per second:
+    python batch_env.py --envs 4096 --steps 200
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from engine import Position
+from rules import DrawRules, REPETITION_LIMIT
+import vector_rules
+from vector_rules import NUM_POINTS, MOVE_OF_ACTION
+
+OBSERVATION_SIZE = NUM_POINTS + 1
+
+# Values in info["winner"].
+FOX_WON = 1
+GEESE_WON = -1
+NO_WINNER = 0
+
+
+class BatchEnv:
+    def __init__(self, num_envs, max_plies=200, seed=None):
+        self.num_envs = num_envs
+        self.max_plies = max_plies
+        self.rng = np.random.default_rng(seed)
+        start_fox, start_geese, start_turn = vector_rules.from_positions(
+            [Position.start()])
+        self.start_fox = start_fox[0]
+        self.start_geese = start_geese[0]
+        self.start_turn = start_turn[0]
+        self.fox = np.empty(num_envs, dtype=np.int64)
+        self.geese = np.empty((num_envs, NUM_POINTS), dtype=bool)
+        self.fox_turn = np.empty(num_envs, dtype=bool)
+        self.start_key = Position.start().key()
+        self.draw_rules = [DrawRules(REPETITION_LIMIT, max_plies)
+                           for _ in range(num_envs)]
+        self.mask = None
+        self._rows = np.arange(num_envs)
+
+    def _reset_rows(self, rows):
+        self.fox[rows] = self.start_fox
+        self.geese[rows] = self.start_geese
+        self.fox_turn[rows] = self.start_turn
+        for row in rows.tolist():
+            self.draw_rules[row].reset(self.start_key)
+
+    def reset(self):
+        """Start every game over; returns (observations, action masks)."""
+        self._reset_rows(self._rows)
+        self.mask, _ = vector_rules.action_mask(self.fox, self.geese,
+                                                self.fox_turn)
+        return self.observe(), self.mask
+
+    def observe(self):
+        obs = np.zeros((self.num_envs, OBSERVATION_SIZE), dtype=np.int8)
+        obs[:, :NUM_POINTS] = self.geese * 2
+        obs[self._rows, self.fox] = 1
+        obs[:, NUM_POINTS] = self.fox_turn
+        return obs
+
+    def step(self, actions):
+        """Play one action in every game.
+
+        Returns (observations, rewards, dones, action masks, info), where
+        info["winner"] holds FOX_WON / GEESE_WON / NO_WINNER per game.
+        """
+        actions = np.asarray(actions, dtype=np.int64)
+        legal = self.mask[self._rows, actions]
+        if not legal.all():
+            bad = np.nonzero(~legal)[0]
+            raise ValueError("illegal action in env(s) %s" % bad[:10].tolist())
+        moves = MOVE_OF_ACTION[self.fox_turn.astype(np.int64), actions]
+        mover_is_fox = self.fox_turn.copy()
+        captured = vector_rules.MOVE_CAPTURE[moves] != vector_rules.NO_CAPTURE
+        vector_rules.apply_moves(self.fox, self.geese, self.fox_turn, moves)
+        keys = vector_rules.position_keys(self.fox, self.geese, self.fox_turn)
+        # One DrawRules per game, so the draw rule is the same one every
+        # other pipeline uses; this loop is most of step()'s Python work.
+        drawn = np.array([rules.record(key, capture) is not None
+                          for rules, key, capture in zip(
+                              self.draw_rules, keys.tolist(), captured.tolist())],
+                         dtype=bool)
+
+        mask, has_move = vector_rules.action_mask(self.fox, self.geese,
+                                                  self.fox_turn)
+        few_geese = self.geese.sum(axis=1) < 3
+        won = few_geese | ~has_move
+        # Whoever just moved wins: the fox by capturing down to two geese,
+        # either side by leaving the other without a move.
+        winner = np.where(won, np.where(mover_is_fox, FOX_WON, GEESE_WON),
+                          NO_WINNER)
+        dones = won | drawn
+        rewards = won.astype(np.float32)
+
+        finished = np.nonzero(dones)[0]
+        if len(finished):
+            self._reset_rows(finished)
+            mask[finished], _ = vector_rules.action_mask(
+                self.fox[finished], self.geese[finished], self.fox_turn[finished])
+        self.mask = mask
+        info = {"winner": winner}
+        return self.observe(), rewards, dones, mask, info
+
+    def random_actions(self, mask):
+        """A uniformly random legal action for every game."""
+        counts = mask.sum(axis=1)
+        picks = (self.rng.random(len(mask)) * counts).astype(np.int64)
+        return (mask.cumsum(axis=1) > picks[:, None]).argmax(axis=1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="BatchEnv steps per second")
+    parser.add_argument("--envs", type=int, default=4096)
+    parser.add_argument("--steps", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    env = BatchEnv(args.envs, seed=0)
+    obs, mask = env.reset()
+    step_time = 0.0
+    games = 0
+    for _ in range(args.steps):
+        actions = env.random_actions(mask)
+        started = time.perf_counter()
+        obs, rewards, dones, mask, info = env.step(actions)
+        step_time += time.perf_counter() - started
+        games += int(dones.sum())
+    total = args.envs * args.steps
+    print("%d envs x %d steps: %.0f env steps/s in step() (%d games finished)"
+          % (args.envs, args.steps, total / step_time, games))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,317 @@
+"""Benchmark suite with JSON results and a regression check.
+
+    python bench.py run --out results.json
+    python bench.py compare baseline.json results.json --threshold 0.10
+
+`run` measures:
+
+    valid_moves          rules.GameState.calculate_valid_moves calls/s
+    game_over_check      rules.GameState.check_for_game_over_on_turn calls/s
+    random_games         random games/s through GameState.select_piece and
+                         move_piece (with the rules.DrawRules defaults)
+    engine_random_games  the same with engine.SearchState
+    frame_draw_ms        draw_board + draw_pieces + draw_dropdown_menu (menu
+                         fully open) per frame under the SDL dummy driver
+    search_nps           alpha-beta nodes/s at depth 4
+    mcts_playouts        MCTS playouts/s (needs NumPy)
+
+Each measurement is repeated and the best run kept, which filters out most
+scheduling noise.  The JSON file also records the machine: Python and
+library versions, platform, CPU count and git commit, since numbers from
+different machines are not comparable.
+
+`compare` lists every benchmark's change and exits with status 1 if any got
+worse by more than the threshold (a fraction: 0.10 is 10%).
+"""
+
+import argparse
+import ast
+import datetime
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def _sample_states(count, seed=0):
+    """rules.GameState objects from random play, via perft's setup."""
+    from ai import sample_positions
+    from engine import POINTS, row_col
+    from perft import RulesPerft
+    perft = RulesPerft()
+    states = []
+    for position in sample_positions(count, seed, max_plies=60):
+        geese = [row_col(sq) for sq in POINTS if (position.geese >> sq) & 1]
+        states.append(perft.setup(row_col(position.fox), geese,
+                                  position.fox_turn))
+    return states
+
+
+def _best_rate(function, repeat):
+    """Highest (count / seconds) over `repeat` runs of function() -> count."""
+    best = 0.0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        count = function()
+        best = max(best, count / (time.perf_counter() - started))
+    return best
+
+
+################################################################################
+# Benchmarks: each returns (value, unit, higher_is_better)
+################################################################################
+def bench_valid_moves(repeat):
+    states = _sample_states(200)
+
+    def run():
+        calls = 0
+        for state in states:
+            pieces = [state.fox_pos] if state.fox_turn else state.geese_positions
+            for piece in pieces:
+                state.selected_piece = piece
+                state.calculate_valid_moves()
+                calls += 1
+            state.selected_piece = None
+        return calls
+
+    return _best_rate(run, repeat), "calls/s", True
+
+
+def bench_game_over_check(repeat):
+    states = _sample_states(200)
+
+    def run():
+        for state in states:
+            state.check_for_game_over_on_turn()
+        return len(states)
+
+    return _best_rate(run, repeat), "calls/s", True
+
+
+def bench_random_games(repeat, games=20):
+    import rules
+    from perft import RulesPerft
+    perft = RulesPerft()
+
+    def run():
+        rng = random.Random(0)
+        for _ in range(games):
+            state = rules.GameState(rules.REPETITION_LIMIT, rules.PLY_LIMIT)
+            while not state.game_over:
+                move = rng.choice(perft.moves(state))
+                state.select_piece(*move[0])
+                state.move_piece(*move[1])
+        return games
+
+    return _best_rate(run, repeat), "games/s", True
+
+
+def bench_engine_random_games(repeat, games=200):
+    from engine import SearchState
+    from rules import DrawRules
+
+    def run():
+        rng = random.Random(0)
+        for _ in range(games):
+            state = SearchState()
+            draw_rules = DrawRules()
+            draw_rules.reset(state.key)
+            while not state.is_game_over():
+                move = rng.choice(state.legal_moves())
+                state.make(move)
+                if draw_rules.record(state.key, move[2] is not None):
+                    break
+        return games
+
+    return _best_rate(run, repeat), "games/s", True
+
+
+def load_combine():
+    """combine.py's globals after its setup code, without the main loop.
+
+    The SDL dummy drivers are selected first, so nothing opens a window.
+    """
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    os.environ["SDL_AUDIODRIVER"] = "dummy"
+    path = os.path.join(HERE, "combine.py")
+    with open(path) as f:
+        tree = ast.parse(f.read(), path)
+    body = []
+    for node in tree.body:
+        if isinstance(node, ast.While):
+            break
+        if "open_search_cache(" in ast.unparse(node):
+            continue
+        body.append(node)
+    namespace = {"__name__": "combine", "__file__": path}
+    exec(compile(ast.Module(body=body, type_ignores=[]), path, "exec"), namespace)
+    return namespace
+
+
+def bench_frame_draw(repeat, frames=200):
+    combine = load_combine()
+    combine["dropdown_open"] = True
+    combine["dropdown_anim_height"] = combine["DROPDOWN_TARGET_HEIGHT"]
+    draw_board = combine["draw_board"]
+    draw_pieces = combine["draw_pieces"]
+    draw_dropdown_menu = combine["draw_dropdown_menu"]
+    best = None
+    for _ in range(repeat):
+        times = []
+        for _ in range(frames):
+            started = time.perf_counter()
+            draw_board()
+            draw_pieces()
+            draw_dropdown_menu()
+            times.append(time.perf_counter() - started)
+        median = statistics.median(times) * 1000
+        best = median if best is None else min(best, median)
+    return best, "ms/frame", False
+
+
+def bench_search(repeat):
+    from ai import sample_positions
+    from search import Searcher
+    positions = sample_positions(10)
+
+    def run():
+        nodes = 0
+        for position in positions:
+            nodes += Searcher(tt_bits=16).search(position, 4).nodes
+        return nodes
+
+    return _best_rate(run, repeat), "nodes/s", True
+
+
+def bench_mcts(repeat):
+    from engine import Position
+    from mcts import MCTS
+
+    def run():
+        return MCTS(1024, seed=0).search(Position.start()).nodes
+
+    return _best_rate(run, repeat), "playouts/s", True
+
+
+BENCHMARKS = {
+    "valid_moves": bench_valid_moves,
+    "game_over_check": bench_game_over_check,
+    "random_games": bench_random_games,
+    "engine_random_games": bench_engine_random_games,
+    "frame_draw_ms": bench_frame_draw,
+    "search_nps": bench_search,
+    "mcts_playouts": bench_mcts,
+}
+
+
+################################################################################
+# Results
+################################################################################
+def _version(module_name):
+    try:
+        return __import__(module_name).__version__
+    except Exception:
+        return None
+
+
+def machine_metadata():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=HERE,
+                                capture_output=True, text=True,
+                                timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "pygame": _version("pygame"),
+        "numpy": _version("numpy"),
+        "git_commit": commit,
+    }
+
+
+def run(names, repeat):
+    results = {}
+    for name in names:
+        try:
+            value, unit, higher_is_better = BENCHMARKS[name](repeat)
+        except ImportError as error:
+            print("%-20s skipped (%s)" % (name, error))
+            continue
+        results[name] = {"value": value, "unit": unit,
+                         "higher_is_better": higher_is_better}
+        print("%-20s %14.2f %s" % (name, value, unit))
+        sys.stdout.flush()
+    return {"metadata": machine_metadata(), "results": results}
+
+
+def compare(baseline, current, threshold):
+    """Print the changes; returns the names that regressed."""
+    regressions = []
+    for name, base in sorted(baseline["results"].items()):
+        new = current["results"].get(name)
+        if new is None:
+            print("%-20s missing from the new results" % name)
+            continue
+        change = (new["value"] - base["value"]) / base["value"]
+        # Positive `gain` is always an improvement.
+        gain = change if base["higher_is_better"] else -change
+        flag = ""
+        if gain < -threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print("%-20s %14.2f -> %14.2f %-10s %+7.1f%%%s" % (
+            name, base["value"], new["value"], base["unit"], change * 100, flag))
+    for key in ("platform", "cpu_count", "python"):
+        if baseline["metadata"].get(key) != current["metadata"].get(key):
+            print("note: %s differs (%s vs %s)" % (
+                key, baseline["metadata"].get(key), current["metadata"].get(key)))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks and regression check")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run_parser = sub.add_parser("run")
+    run_parser.add_argument("--out", default=None, help="write JSON results here")
+    run_parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS),
+                            default=list(BENCHMARKS))
+    run_parser.add_argument("--repeat", type=int, default=3)
+    compare_parser = sub.add_parser("compare")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.10)
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        results = run(args.only, args.repeat)
+        if args.out:
+            with open(args.out, "w") as f:
+                json.dump(results, f, indent=2)
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    regressions = compare(baseline, current, args.threshold)
+    if regressions:
+        print("%d regression(s) beyond %.0f%%" % (len(regressions),
+                                                  args.threshold * 100))
+        return 1
+    print("no regressions beyond %.0f%%" % (args.threshold * 100))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
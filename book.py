@@ -0,0 +1,205 @@
+"""Opening book: searched answers for the first plies of every game.
+
+Every game starts from the same position, so the first few plies are worth
+searching once, deeply, offline.  `python book.py build` walks every line
+from the start position to `--plies` plies, scores each legal move of each
+position with a fixed-depth search, and keeps the best `--moves` of them.
+
+The book file is a flat array of little-endian RECORD records sorted by
+key, with no header:
+
+    key    uint64  engine Zobrist key, the smaller of the position's and its
+                   mirror image's (see SearchState.canonical_key)
+    move   uint32  engine.encode_move, in the frame of the keyed position
+    score  int32   search score for the side to move
+    depth  uint8   search depth
+
+A position's moves are the run of records with its key, best first.
+OpeningBook opens the file only on the first probe, as a memory map, and
+finds that run by binary search, so loading the game costs nothing and a
+probe touches a handful of pages.  Only the standard library is used, so
+combine.py can use the book without NumPy.
+
+Usage:
+    python book.py build --plies 4 --depth 6
+    python book.py show
+"""
+
+import argparse
+import mmap
+import os
+import struct
+import sys
+import time
+
+from engine import Position, encode_move, decode_move, mirror_move
+from search import Searcher, MATE
+
+RECORD = struct.Struct("<QIiB")
+BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         "opening_book.bin")
+
+
+def book_key(position):
+    """(canonical key, whether `position` is the mirror of the keyed one)."""
+    key = position.key()
+    mirror_key = position.mirror().key()
+    return min(key, mirror_key), mirror_key < key
+
+
+class OpeningBook:
+    """Read-only access to a book file, opened on first use."""
+
+    def __init__(self, path=BOOK_PATH):
+        self.path = path
+        self.data = None
+        self.count = 0
+        self.loaded = False
+
+    def _load(self):
+        self.loaded = True
+        if os.path.exists(self.path) and os.path.getsize(self.path):
+            with open(self.path, "rb") as f:
+                self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self.count = len(self.data) // RECORD.size
+
+    def _key_at(self, index):
+        return struct.unpack_from("<Q", self.data, index * RECORD.size)[0]
+
+    def _first_at_least(self, key):
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key_at(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def probe(self, position):
+        """[(move, score), ...] for `position`, best first; [] if not in book."""
+        if not self.loaded:
+            self._load()
+        if self.data is None:
+            return []
+        key, mirrored = book_key(position)
+        entries = []
+        index = self._first_at_least(key)
+        while index < self.count:
+            record_key, code, score, _ = RECORD.unpack_from(
+                self.data, index * RECORD.size)
+            if record_key != key:
+                break
+            move = decode_move(code)
+            entries.append((mirror_move(move) if mirrored else move, score))
+            index += 1
+        return entries
+
+    def best_move(self, position):
+        entries = self.probe(position)
+        return entries[0] if entries else None
+
+    def __len__(self):
+        if not self.loaded:
+            self._load()
+        return self.count
+
+    def close(self):
+        if self.data is not None:
+            self.data.close()
+        self.data = None
+        self.count = 0
+        self.loaded = False
+
+
+################################################################################
+# Building
+################################################################################
+def score_moves(searcher, position, depth):
+    """[(score, move)] for every legal move, best first."""
+    scored = []
+    for move in position.legal_moves():
+        child = position.play(move)
+        winner = child.winner()
+        if winner is not None:
+            mover = "Fox" if position.fox_turn else "Geese"
+            score = MATE if winner == mover else -MATE
+        else:
+            score = -searcher.search(child, depth - 1).score
+        scored.append((score, move))
+    scored.sort(key=lambda item: -item[0])
+    return scored
+
+
+def build(plies, depth, moves_per_position, tt_bits=20, progress=None):
+    """Search every position within `plies` of the start.
+
+    Returns (key, move code, score, depth) tuples sorted by key, each
+    position's moves best first.
+    """
+    searcher = Searcher(tt_bits)
+    rows = []
+    seen = set()
+    level = [Position.start()]
+    for ply in range(plies + 1):
+        next_level = []
+        for position in level:
+            key, mirrored = book_key(position)
+            if key in seen or position.winner() is not None:
+                continue
+            seen.add(key)
+            scored = score_moves(searcher, position, depth)
+            for score, move in scored[:moves_per_position]:
+                stored = mirror_move(move) if mirrored else move
+                rows.append((key, encode_move(stored), score, depth))
+            if ply < plies:
+                next_level.extend(position.play(move) for _, move in scored)
+        if progress:
+            progress(ply, len(seen))
+        level = next_level
+    # Stable sort keeps each position's moves best first.
+    rows.sort(key=lambda row: row[0])
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or inspect the opening book")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build_parser = sub.add_parser("build")
+    build_parser.add_argument("--plies", type=int, default=4)
+    build_parser.add_argument("--depth", type=int, default=6)
+    build_parser.add_argument("--moves", type=int, default=3,
+                              help="moves kept per position")
+    build_parser.add_argument("--out", default=BOOK_PATH)
+    show_parser = sub.add_parser("show")
+    show_parser.add_argument("--book", default=BOOK_PATH)
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        started = time.perf_counter()
+
+        def progress(ply, positions):
+            print("ply %d done: %d positions, %.1fs" % (
+                ply, positions, time.perf_counter() - started))
+
+        records = build(args.plies, args.depth, args.moves, progress=progress)
+        # Write under a temporary name so a running game never maps a
+        # half-written book.
+        partial = args.out + ".tmp"
+        with open(partial, "wb") as f:
+            for record in records:
+                f.write(RECORD.pack(*record))
+        os.replace(partial, args.out)
+        print("%d records (%d bytes) written to %s" % (
+            len(records), len(records) * RECORD.size, args.out))
+    else:
+        book = OpeningBook(args.book)
+        position = Position.start()
+        print("%d records" % len(book))
+        for move, score in book.probe(position):
+            print("start: %s score %d" % (move, score))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,17 +1,37 @@
 import pygame
+import os
 import sys
 import random
 
+from rules import (BOARD_SIZE, is_valid_point, initialize_diagonal_connections,
+                   GameState, DRAW)
+from ai import (AIPlayer, STRENGTH_LEVELS, DEFAULT_LEVEL, open_search_cache,
+                close_search_cache, open_search_stats, close_search_stats)
+from frame_profiler import FrameProfiler
+
 pygame.init()
 
 # Window and board settings: 800x800 size
 WIDTH, HEIGHT = 800, 800
-BOARD_SIZE = 7  # 7x7 grid underlying the plus-shaped board
 CELL_SIZE = WIDTH // BOARD_SIZE
 BOARD_PIXEL_SIZE = BOARD_SIZE * CELL_SIZE
 BOARD_OFFSET_X = (WIDTH - BOARD_PIXEL_SIZE) // 2
 BOARD_OFFSET_Y = (HEIGHT - BOARD_PIXEL_SIZE) // 2
 
+# Computer-player searches are remembered here between sessions; set to None
+# to turn the cache off.
+SEARCH_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                 "search_cache.bin")
+# Computer-player search counters: "off", "sampled" (every 16th move) or
+# "full", written one JSON line per move to SEARCH_STATS_PATH.
+SEARCH_STATS_MODE = "off"
+SEARCH_STATS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                 "search_stats.jsonl")
+# F3 toggles the frame-time overlay; F4 writes the last minute of frame
+# timings to FRAME_TIMES_PATH.
+FRAME_TIMES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "frame_times.csv")
+
 # Colors
 BG_COLOR = (210, 180, 140)      # Tan background
 LINE_COLOR = (101, 67, 33)      # Brown for connecting lines
@@ -22,235 +42,6 @@ HIGHLIGHT_COLOR = (255, 255, 0) # Yellow for highlights
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
 
-##########################################################################
-# Board definition: A cell is valid if its row or column is in [2, 3, 4].
-##########################################################################
-def is_valid_point(row, col):
-    return (row in [2, 3, 4]) or (col in [2, 3, 4])
-
-# Dictionary to store valid diagonal connections.
-diagonal_connections = {}
-
-def initialize_diagonal_connections():
-    """Create a mapping of all valid diagonal connections on the board."""
-    global diagonal_connections
-    diagonal_connections.clear()
-    for r in range(BOARD_SIZE - 1):
-        for c in range(BOARD_SIZE - 1):
-            if (is_valid_point(r, c) and is_valid_point(r, c+1) and
-                is_valid_point(r+1, c) and is_valid_point(r+1, c+1)):
-                tl = (r, c)       # top-left
-                tr = (r, c+1)     # top-right
-                bl = (r+1, c)     # bottom-left
-                br = (r+1, c+1)   # bottom-right
-                if (r + c) % 2 == 0:  # Diagonal from top-left to bottom-right
-                    diagonal_connections[(tl, br)] = True
-                    diagonal_connections[(br, tl)] = True
-                else:  # Diagonal from top-right to bottom-left
-                    diagonal_connections[(tr, bl)] = True
-                    diagonal_connections[(bl, tr)] = True
-
-def has_diagonal_connection(row, col, dr, dc):
-    """Check for an actual diagonal connection from (row, col) in direction (dr, dc)."""
-    target_row, target_col = row + dr, col + dc
-    return ((row, col), (target_row, target_col)) in diagonal_connections
-
-################################################################################
-# Game state
-################################################################################
-class GameState:
-    def __init__(self):
-        # Create board: valid cells get 0; invalid cells are None.
-        self.board = []
-        for row in range(BOARD_SIZE):
-            row_list = []
-            for col in range(BOARD_SIZE):
-                row_list.append(0 if is_valid_point(row, col) else None)
-            self.board.append(row_list)
-        
-        # Place fox at center (3,3)
-        self.fox_pos = (3, 3)
-        self.board[3][3] = 1
-
-        # Place geese:
-        self.geese_positions = []
-        for col in range(7):
-            self.board[4][col] = 2
-            self.geese_positions.append((4, col))
-        for col in [2, 3, 4]:
-            self.board[5][col] = 2
-            self.geese_positions.append((5, col))
-        for col in [2, 3, 4]:
-            self.board[6][col] = 2
-            self.geese_positions.append((6, col))
-        
-        # Geese move first.
-        self.fox_turn = False
-        self.selected_piece = None
-        self.valid_moves = []
-        self.game_over = False
-        self.winner = None
-
-    def select_piece(self, row, col):
-        if self.game_over or not is_valid_point(row, col):
-            return False
-        # Geese turn: select a goose.
-        if not self.fox_turn and self.board[row][col] == 2:
-            self.selected_piece = (row, col)
-            self.calculate_valid_moves()
-            return True
-        # Fox turn: select the fox.
-        if self.fox_turn and self.board[row][col] == 1:
-            self.selected_piece = (row, col)
-            self.calculate_valid_moves()
-            return True
-        return False
-
-    def calculate_valid_moves(self):
-        self.valid_moves = []
-        if not self.selected_piece:
-            return
-        row, col = self.selected_piece
-        piece_type = self.board[row][col]
-        
-        if piece_type == 1:  # Fox moves: all 8 directions.
-            directions = [(-1, 0), (1, 0), (0, -1), (0, 1),
-                          (-1, -1), (-1, 1), (1, -1), (1, 1)]
-            for dr, dc in directions:
-                new_r, new_c = row + dr, col + dc
-                if dr != 0 and dc != 0:
-                    if not has_diagonal_connection(row, col, dr, dc):
-                        continue
-                if 0 <= new_r < BOARD_SIZE and 0 <= new_c < BOARD_SIZE and is_valid_point(new_r, new_c):
-                    if self.board[new_r][new_c] == 0:
-                        self.valid_moves.append((new_r, new_c, None))
-                    elif self.board[new_r][new_c] == 2:
-                        jump_r, jump_c = new_r + dr, new_c + dc
-                        if (0 <= jump_r < BOARD_SIZE and 0 <= jump_c < BOARD_SIZE and 
-                            is_valid_point(jump_r, jump_c) and self.board[jump_r][jump_c] == 0):
-                            if dr != 0 and dc != 0:
-                                if not (has_diagonal_connection(row, col, dr, dc) and 
-                                        has_diagonal_connection(new_r, new_c, dr, dc)):
-                                    continue
-                            self.valid_moves.append((jump_r, jump_c, (new_r, new_c)))
-        elif piece_type == 2:  # Geese moves: forward and diagonally upward.
-            directions = [(-1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1)]
-            for dr, dc in directions:
-                new_r, new_c = row + dr, col + dc
-                if dr != 0 and dc != 0:
-                    if not has_diagonal_connection(row, col, dr, dc):
-                        continue
-                if 0 <= new_r < BOARD_SIZE and 0 <= new_c < BOARD_SIZE:
-                    if is_valid_point(new_r, new_c) and self.board[new_r][new_c] == 0:
-                        self.valid_moves.append((new_r, new_c, None))
-    
-    def move_piece(self, row, col):
-        if (not self.selected_piece or 
-            (row, col) not in [(m[0], m[1]) for m in self.valid_moves]):
-            return False
-        old_r, old_c = self.selected_piece
-        piece_type = self.board[old_r][old_c]
-        capture_pos = None
-        for mv in self.valid_moves:
-            if (mv[0], mv[1]) == (row, col):
-                capture_pos = mv[2]
-                break
-        
-        self.board[old_r][old_c] = 0
-        self.board[row][col] = piece_type
-        
-        if piece_type == 1:
-            self.fox_pos = (row, col)
-            if capture_pos:
-                cap_r, cap_c = capture_pos
-                self.board[cap_r][cap_c] = 0
-                if (cap_r, cap_c) in self.geese_positions:
-                    self.geese_positions.remove((cap_r, cap_c))
-                if len(self.geese_positions) < 3:
-                    self.game_over = True
-                    self.winner = "Fox"
-        else:
-            if (old_r, old_c) in self.geese_positions:
-                self.geese_positions.remove((old_r, old_c))
-            self.geese_positions.append((row, col))
-            self.check_if_fox_trapped()
-        
-        self.selected_piece = None
-        self.valid_moves = []
-        # Switch turn.
-        self.fox_turn = not self.fox_turn
-        # Check if the new active player has any legal moves.
-        self.check_for_game_over_on_turn()
-        return True
-
-    def check_if_fox_trapped(self):
-        # Existing check after a goose move.
-        row, col = self.fox_pos
-        directions = [(-1, 0), (1, 0), (0, -1), (0, 1),
-                      (-1, -1), (-1, 1), (1, -1), (1, 1)]
-        for dr, dc in directions:
-            nr, nc = row + dr, col + dc
-            if 0 <= nr < BOARD_SIZE and 0 <= nc < BOARD_SIZE and is_valid_point(nr, nc):
-                if self.board[nr][nc] == 0:
-                    return False
-                if self.board[nr][nc] == 2:
-                    jr, jc = nr + dr, nc + dc
-                    if (0 <= jr < BOARD_SIZE and 0 <= jc < BOARD_SIZE and 
-                        is_valid_point(jr, jc) and self.board[jr][jc] == 0):
-                        return False
-        self.game_over = True
-        self.winner = "Geese"
-        return True
-
-    def check_for_game_over_on_turn(self):
-        """Check if the current player (fox or geese) has any valid moves.
-           If not, end the game accordingly."""
-        if self.fox_turn:
-            fox_r, fox_c = self.fox_pos
-            moves = []
-            directions = [(-1, 0), (1, 0), (0, -1), (0, 1),
-                          (-1, -1), (-1, 1), (1, -1), (1, 1)]
-            for dr, dc in directions:
-                new_r, new_c = fox_r + dr, fox_c + dc
-                if dr != 0 and dc != 0:
-                    if not has_diagonal_connection(fox_r, fox_c, dr, dc):
-                        continue
-                if (0 <= new_r < BOARD_SIZE and 0 <= new_c < BOARD_SIZE and 
-                    is_valid_point(new_r, new_c)):
-                    if self.board[new_r][new_c] == 0:
-                        moves.append((new_r, new_c))
-                    elif self.board[new_r][new_c] == 2:
-                        jump_r, jump_c = new_r + dr, new_c + dc
-                        if (0 <= jump_r < BOARD_SIZE and 0 <= jump_c < BOARD_SIZE and 
-                            is_valid_point(jump_r, jump_c) and self.board[jump_r][jump_c] == 0):
-                            if dr != 0 and dc != 0:
-                                if not (has_diagonal_connection(fox_r, fox_c, dr, dc) and 
-                                        has_diagonal_connection(new_r, new_c, dr, dc)):
-                                    continue
-                            moves.append((jump_r, jump_c))
-            if not moves:
-                self.game_over = True
-                self.winner = "Geese"
-        else:
-            # Check if at least one goose can move.
-            possible = False
-            for (r, c) in self.geese_positions:
-                directions = [(-1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1)]
-                for dr, dc in directions:
-                    new_r, new_c = r + dr, c + dc
-                    if dr != 0 and dc != 0:
-                        if not has_diagonal_connection(r, c, dr, dc):
-                            continue
-                    if (0 <= new_r < BOARD_SIZE and 0 <= new_c < BOARD_SIZE and 
-                        is_valid_point(new_r, new_c) and self.board[new_r][new_c] == 0):
-                        possible = True
-                        break
-                if possible:
-                    break
-            if not possible:
-                self.game_over = True
-                self.winner = "Fox"
-
 ################################################################################
 # Confetti effect classes and functions
 ################################################################################
@@ -369,6 +160,8 @@ def draw_pieces():
 def draw_turn_indicator():
     font = pygame.font.SysFont(None, 30)
     turn_text = "Fox's Turn" if game_state.fox_turn else "Geese's Turn"
+    if ai_player is not None and ai_player.is_thinking():
+        turn_text += " (thinking...)"
     color = FOX_COLOR if game_state.fox_turn else GEESE_COLOR
     text = font.render(turn_text, True, color)
     screen.blit(text, (10, 10))
@@ -380,7 +173,11 @@ def draw_game_over():
         overlay.fill((0, 0, 0))
         screen.blit(overlay, (0, 0))
         font = pygame.font.SysFont(None, 72)
-        text = font.render(f"{game_state.winner} wins!", True, WHITE)
+        if game_state.winner == DRAW:
+            message = f"Draw by {game_state.draw_reason}"
+        else:
+            message = f"{game_state.winner} wins!"
+        text = font.render(message, True, WHITE)
         rect = text.get_rect(center=(WIDTH // 2, HEIGHT // 2))
         screen.blit(text, rect)
         font_small = pygame.font.SysFont(None, 36)
@@ -397,18 +194,24 @@ DROPDOWN_X = WIDTH - 10 - DROPDOWN_WIDTH  # right-aligned with a 10px margin
 DROPDOWN_Y = SETTINGS_BUTTON_RECT.bottom  # just below the settings button
 DROPDOWN_BUTTON_HEIGHT = 40
 DROPDOWN_BUTTON_SPACING = 10
-DROPDOWN_TARGET_HEIGHT = 4 * DROPDOWN_BUTTON_HEIGHT + 3 * DROPDOWN_BUTTON_SPACING
-
 dropdown_anim_height = 0
 dropdown_open = False
 
-# Update dropdown_buttons: set "2P" action to reset the game.
+# "2P" resets to a two-player game; "AI Fox"/"AI Geese" start a new game with
+# the computer playing that side at the strength shown on the level button.
 dropdown_buttons = [
     {"label": "2P", "action": "reset"},
-    {"label": "AI Fox", "action": None},
-    {"label": "AI Geese", "action": None},
+    {"label": "AI Fox", "action": "ai_fox"},
+    {"label": "AI Geese", "action": "ai_geese"},
+    {"label": f"Level: {STRENGTH_LEVELS[DEFAULT_LEVEL]['label']}", "action": "cycle_level"},
     {"label": "Rules", "action": "open_rules"}
 ]
+DROPDOWN_TARGET_HEIGHT = (len(dropdown_buttons) * DROPDOWN_BUTTON_HEIGHT +
+                          (len(dropdown_buttons) - 1) * DROPDOWN_BUTTON_SPACING)
+
+# Computer player (None in two-player games) and its strength level.
+ai_player = None
+ai_level = DEFAULT_LEVEL
 
 rules_open = False
 
@@ -522,8 +325,50 @@ def draw_rules_modal():
     
     return close_button_rect
 
+################################################################################
+# Frame-time overlay
+################################################################################
+FRAME_PHASES = ("tick", "events", "ai", "board", "pieces", "turn_indicator",
+                "settings_button", "dropdown", "rules_modal", "game_over",
+                "confetti", "hud", "flip")
+frame_profiler = FrameProfiler(FRAME_PHASES, capacity=3600)
+hud_open = False
+HUD_FONT = pygame.font.SysFont(None, 20)
+HUD_REFRESH = 0.5  # seconds between overlay text updates
+hud_lines = []
+hud_age = HUD_REFRESH
+
+def update_frame_hud(dt):
+    """Re-render the overlay text from the last second of frames."""
+    global hud_lines, hud_age
+    hud_age += dt
+    if hud_age < HUD_REFRESH:
+        return
+    hud_age = 0.0
+    summary = frame_profiler.summary(window=60)
+    if summary is None:
+        return
+    texts = [f"{summary['fps']:.1f} FPS  frame p50 {summary['p50']:.1f}"
+             f"  p95 {summary['p95']:.1f}  p99 {summary['p99']:.1f}"
+             f"  max {summary['max']:.1f} ms"]
+    for phase, mean, worst in summary["phases"]:
+        texts.append(f"{phase:<16} {mean:6.2f} ms  max {worst:6.2f}")
+    hud_lines = [HUD_FONT.render(text, True, WHITE) for text in texts]
+
+def draw_frame_hud():
+    if not hud_open or not hud_lines:
+        return
+    line_height = HUD_FONT.get_linesize()
+    width = max(line.get_width() for line in hud_lines) + 12
+    height = line_height * len(hud_lines) + 8
+    panel = pygame.Rect(10, HEIGHT - height - 10, width, height)
+    pygame.draw.rect(screen, BLACK, panel)
+    for i, line in enumerate(hud_lines):
+        screen.blit(line, (panel.x + 6, panel.y + 4 + i * line_height))
+
 def handle_dropdown_click(pos):
     global rules_open, game_state, confetti_particles, dropdown_open
+    global ai_player, ai_level
     if pos[0] < DROPDOWN_X or pos[0] > DROPDOWN_X + DROPDOWN_WIDTH:
         return False
     if pos[1] < DROPDOWN_Y or pos[1] > DROPDOWN_Y + dropdown_anim_height:
@@ -534,8 +379,22 @@ def handle_dropdown_click(pos):
         if btn_rect.collidepoint(pos):
             # If the button action is "reset", reset the game.
             if button["action"] == "reset":
+                if ai_player is not None:
+                    ai_player.cancel()
+                ai_player = None
+                game_state = GameState()
+                confetti_particles.clear()
+            elif button["action"] in ("ai_fox", "ai_geese"):
+                if ai_player is not None:
+                    ai_player.cancel()
+                ai_player = AIPlayer(button["action"] == "ai_fox", ai_level)
                 game_state = GameState()
                 confetti_particles.clear()
+            elif button["action"] == "cycle_level":
+                ai_level = (ai_level + 1) % len(STRENGTH_LEVELS)
+                button["label"] = f"Level: {STRENGTH_LEVELS[ai_level]['label']}"
+                if ai_player is not None:
+                    ai_player.level = ai_level
             elif button["action"] == "open_rules":
                 rules_open = True
             # Close the dropdown after an action.
@@ -548,9 +407,14 @@ def handle_dropdown_click(pos):
 ################################################################################
 game_state = GameState()
 initialize_diagonal_connections()
+if SEARCH_CACHE_PATH:
+    open_search_cache(SEARCH_CACHE_PATH)
+open_search_stats(SEARCH_STATS_MODE, SEARCH_STATS_PATH)
 running = True
 while running:
+    frame_profiler.start_frame()
     dt = clock.tick(60) / 1000.0  # Delta time (seconds)
+    frame_profiler.mark("tick")
     update_dropdown(dt)
     
     for event in pygame.event.get():
@@ -559,8 +423,15 @@ while running:
         
         if event.type == pygame.KEYDOWN:
             if event.key == pygame.K_r and game_state.game_over:
+                if ai_player is not None:
+                    ai_player.cancel()
                 game_state = GameState()
                 confetti_particles.clear()
+            elif event.key == pygame.K_F3:
+                hud_open = not hud_open
+                hud_age = HUD_REFRESH  # refresh the text right away
+            elif event.key == pygame.K_F4:
+                frame_profiler.dump_csv(FRAME_TIMES_PATH)
         
         if event.type == pygame.MOUSEBUTTONDOWN:
             mx, my = pygame.mouse.get_pos()
@@ -582,6 +453,10 @@ while running:
                 if handle_dropdown_click((mx, my)):
                     continue
             
+            # Ignore board clicks while it is the computer's turn.
+            if ai_player is not None and ai_player.is_turn(game_state):
+                continue
+            
             if (BOARD_OFFSET_X <= mx <= BOARD_OFFSET_X + BOARD_PIXEL_SIZE and 
                 BOARD_OFFSET_Y <= my <= BOARD_OFFSET_Y + BOARD_PIXEL_SIZE):
                 board_x = mx - BOARD_OFFSET_X
@@ -602,22 +477,47 @@ while running:
                                 game_state.selected_piece = None
                                 game_state.valid_moves = []
     
+    frame_profiler.mark("events")
+    
+    # Let the computer move: pick up a finished search, or start a new one.
+    if ai_player is not None:
+        ai_player.poll(game_state)
+        ai_player.start(game_state)
+    frame_profiler.mark("ai")
+    
     draw_board()
+    frame_profiler.mark("board")
     draw_pieces()
+    frame_profiler.mark("pieces")
     draw_turn_indicator()
+    frame_profiler.mark("turn_indicator")
     draw_settings_button()
+    frame_profiler.mark("settings_button")
     draw_dropdown_menu()
+    frame_profiler.mark("dropdown")
     if rules_open:
         draw_rules_modal()
+    frame_profiler.mark("rules_modal")
     
     if game_state.game_over:
         draw_game_over()
+        frame_profiler.mark("game_over")
         if not confetti_particles:
             confetti_particles = [ConfettiParticle() for _ in range(100)]
         update_confetti(dt)
         draw_confetti()
+        frame_profiler.mark("confetti")
+    
+    if hud_open:
+        update_frame_hud(dt)
+        draw_frame_hud()
+    frame_profiler.mark("hud")
     
     pygame.display.flip()
+    frame_profiler.mark("flip")
+    frame_profiler.end_frame()
 
+close_search_cache()
+close_search_stats()
 pygame.quit()
 sys.exit()
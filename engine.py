@@ -0,0 +1,517 @@
+"""Bitboard rules engine for Fox and Geese.
+
+Squares are numbered row * BOARD_SIZE + col, so a position is just the fox
+square, an integer with one bit per goose and the side to move.  All move
+tables are derived from rules.initialize_diagonal_connections(), so this
+engine plays exactly the same game as rules.GameState, only much faster.
+
+Moves are (from_square, to_square, capture_square) tuples; capture_square is
+None for plain steps, mirroring the (row, col, capture) tuples in
+GameState.valid_moves.
+"""
+
+from math import comb
+
+from rules import (BOARD_SIZE, is_valid_point, diagonal_connections,
+                   initialize_diagonal_connections, ZOBRIST_FOX, ZOBRIST_GOOSE,
+                   ZOBRIST_FOX_TURN)
+
+initialize_diagonal_connections()
+
+NUM_SQUARES = BOARD_SIZE * BOARD_SIZE
+
+FOX_DIRECTIONS = [(-1, 0), (1, 0), (0, -1), (0, 1),
+                  (-1, -1), (-1, 1), (1, -1), (1, 1)]
+GOOSE_DIRECTIONS = [(-1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1)]
+
+
+def square(row, col):
+    return row * BOARD_SIZE + col
+
+
+def row_col(sq):
+    return divmod(sq, BOARD_SIZE)
+
+
+def _can_step(row, col, dr, dc):
+    """True if a piece on (row, col) may step one point in direction (dr, dc)."""
+    new_r, new_c = row + dr, col + dc
+    if not (0 <= new_r < BOARD_SIZE and 0 <= new_c < BOARD_SIZE):
+        return False
+    if not is_valid_point(new_r, new_c):
+        return False
+    if dr != 0 and dc != 0:
+        return ((row, col), (new_r, new_c)) in diagonal_connections
+    return True
+
+
+################################################################################
+# Precomputed tables
+################################################################################
+POINTS = [square(r, c) for r in range(BOARD_SIZE) for c in range(BOARD_SIZE)
+          if is_valid_point(r, c)]
+POINT_MASK = 0
+for _sq in POINTS:
+    POINT_MASK |= 1 << _sq
+
+# Fox steps and jumps for every square.  A jump over (mid) to (land) is legal
+# when both single steps along the same line are.
+FOX_STEPS = [[] for _ in range(NUM_SQUARES)]
+FOX_STEP_MASK = [0] * NUM_SQUARES
+FOX_JUMPS = [[] for _ in range(NUM_SQUARES)]
+for _sq in POINTS:
+    _r, _c = row_col(_sq)
+    for _dr, _dc in FOX_DIRECTIONS:
+        if not _can_step(_r, _c, _dr, _dc):
+            continue
+        _mid = square(_r + _dr, _c + _dc)
+        FOX_STEPS[_sq].append(_mid)
+        FOX_STEP_MASK[_sq] |= 1 << _mid
+        if _can_step(_r + _dr, _c + _dc, _dr, _dc):
+            FOX_JUMPS[_sq].append((_mid, square(_r + 2 * _dr, _c + 2 * _dc)))
+
+# Goose moves as (shift, source mask) pairs: every goose on a square in the
+# source mask may move by `shift` squares.  Shifting the whole flock at once
+# and masking with the empty points yields every destination in one go.
+GOOSE_SHIFTS = []
+for _dr, _dc in GOOSE_DIRECTIONS:
+    _source = 0
+    for _sq in POINTS:
+        _r, _c = row_col(_sq)
+        if _can_step(_r, _c, _dr, _dc):
+            _source |= 1 << _sq
+    GOOSE_SHIFTS.append((_dr * BOARD_SIZE + _dc, _source))
+
+# Dense point numbering 0..len(POINTS)-1, used to rank positions.
+POINT_INDEX = [-1] * NUM_SQUARES
+for _i, _sq in enumerate(POINTS):
+    POINT_INDEX[_sq] = _i
+BINOMIAL = [[comb(n, k) for k in range(len(POINTS) + 1)]
+            for n in range(len(POINTS) + 1)]
+
+# Zobrist keys by square, shared with rules.GameState.zobrist_key.
+FOX_KEYS = [0] * NUM_SQUARES
+GOOSE_KEYS = [0] * NUM_SQUARES
+for _sq in POINTS:
+    _r, _c = row_col(_sq)
+    FOX_KEYS[_sq] = ZOBRIST_FOX[_r][_c]
+    GOOSE_KEYS[_sq] = ZOBRIST_GOOSE[_r][_c]
+
+# Left-right mirror (col -> BOARD_SIZE - 1 - col).  The board and the (r+c)%2
+# diagonal pattern are both symmetric under it, so a mirrored position plays
+# exactly like the original.  Bitboards are mirrored a row at a time.
+MIRROR_SQUARE = [square(_sq // BOARD_SIZE, BOARD_SIZE - 1 - _sq % BOARD_SIZE)
+                 for _sq in range(NUM_SQUARES)]
+_ROW_MASK = (1 << BOARD_SIZE) - 1
+MIRROR_ROW = [int(format(_bits, "0%db" % BOARD_SIZE)[::-1], 2)
+              for _bits in range(1 << BOARD_SIZE)]
+MIRROR_FOX_KEYS = [FOX_KEYS[MIRROR_SQUARE[_sq]] for _sq in range(NUM_SQUARES)]
+MIRROR_GOOSE_KEYS = [GOOSE_KEYS[MIRROR_SQUARE[_sq]] for _sq in range(NUM_SQUARES)]
+
+# For incremental mobility: the squares a goose on each square could step to,
+# and the squares from which a goose could step onto each square.
+GOOSE_TARGET_MASK = [0] * NUM_SQUARES
+GOOSE_SOURCE_MASK = [0] * NUM_SQUARES
+for _sq in POINTS:
+    _r, _c = row_col(_sq)
+    for _dr, _dc in GOOSE_DIRECTIONS:
+        if _can_step(_r, _c, _dr, _dc):
+            _to = square(_r + _dr, _c + _dc)
+            GOOSE_TARGET_MASK[_sq] |= 1 << _to
+            GOOSE_SOURCE_MASK[_to] |= 1 << _sq
+
+# Every square that can affect the fox's moves from a given square.
+FOX_REACH_MASK = [0] * NUM_SQUARES
+for _sq in POINTS:
+    FOX_REACH_MASK[_sq] = FOX_STEP_MASK[_sq]
+    for _mid, _land in FOX_JUMPS[_sq]:
+        FOX_REACH_MASK[_sq] |= 1 << _land
+
+# The geese on a square's FOX_REACH_MASK decide every fox move from it, so
+# fox moves are looked up by square and that occupancy, like the goose byte
+# tables below.  All 79,680 patterns take about half a second to build, so
+# each is filled in on first use instead of at import.
+FOX_MOVE_CACHE = [{} for _ in range(NUM_SQUARES)]
+
+# Destination bitboards are decoded a byte at a time: GOOSE_MOVE_CHUNKS[i][k][b]
+# is the ready-made move list for direction i when byte k of the targets is b.
+GOOSE_MOVE_CHUNKS = []
+for _shift, _source in GOOSE_SHIFTS:
+    _per_byte = []
+    for _k in range((NUM_SQUARES + 7) // 8):
+        _lists = []
+        for _byte in range(256):
+            _moves = []
+            for _bit in range(8):
+                _to = 8 * _k + _bit
+                if (_byte >> _bit) & 1 and _to < NUM_SQUARES:
+                    _moves.append((_to - _shift, _to, None))
+            _lists.append(tuple(_moves))
+        _per_byte.append(_lists)
+    GOOSE_MOVE_CHUNKS.append((_shift, _source, _per_byte))
+
+
+################################################################################
+# Move generation
+################################################################################
+def goose_moves(fox, geese):
+    """All goose moves for the whole flock."""
+    empty = POINT_MASK & ~geese & ~(1 << fox)
+    moves = []
+    for shift, source, per_byte in GOOSE_MOVE_CHUNKS:
+        # Every goose direction moves up or sideways, so shifts are negative
+        # except for the single step to the right.
+        if shift < 0:
+            targets = ((geese & source) >> -shift) & empty
+        else:
+            targets = ((geese & source) << shift) & empty
+        k = 0
+        while targets:
+            byte = targets & 0xFF
+            if byte:
+                moves.extend(per_byte[k][byte])
+            targets >>= 8
+            k += 1
+    return moves
+
+
+def _generate_fox_moves(fox, geese):
+    moves = []
+    for to in FOX_STEPS[fox]:
+        if not (geese >> to) & 1:
+            moves.append((fox, to, None))
+    for mid, land in FOX_JUMPS[fox]:
+        if (geese >> mid) & 1 and not (geese >> land) & 1:
+            moves.append((fox, land, mid))
+    return tuple(moves)
+
+
+def _fox_move_tuple(fox, geese):
+    occupancy = geese & FOX_REACH_MASK[fox]
+    cache = FOX_MOVE_CACHE[fox]
+    moves = cache.get(occupancy)
+    if moves is None:
+        moves = cache[occupancy] = _generate_fox_moves(fox, occupancy)
+    return moves
+
+
+def fox_moves(fox, geese):
+    """All fox steps and single jumps from the fox square."""
+    return list(_fox_move_tuple(fox, geese))
+
+
+def fox_mobility(fox, geese):
+    """Number of legal fox moves."""
+    return len(_fox_move_tuple(fox, geese))
+
+
+def goose_mobility(fox, geese):
+    """Number of legal goose moves for the whole flock."""
+    empty = POINT_MASK & ~geese & ~(1 << fox)
+    count = 0
+    for shift, source in GOOSE_SHIFTS:
+        if shift < 0:
+            count += (((geese & source) >> -shift) & empty).bit_count()
+        else:
+            count += (((geese & source) << shift) & empty).bit_count()
+    return count
+
+
+def position_key(fox, geese, fox_turn):
+    """Zobrist key of a position, equal to GameState.zobrist_key."""
+    key = FOX_KEYS[fox]
+    while geese:
+        low = geese & -geese
+        key ^= GOOSE_KEYS[low.bit_length() - 1]
+        geese ^= low
+    if fox_turn:
+        key ^= ZOBRIST_FOX_TURN
+    return key
+
+
+def rank_geese(fox, geese):
+    """Colex rank of the goose set among the points not holding the fox.
+
+    Together with the fox point and side to move this gives every position
+    with a given number of geese a dense index in
+    range(len(POINTS) * BINOMIAL[len(POINTS) - 1][count] * 2).
+    """
+    fox_point = POINT_INDEX[fox]
+    rank = 0
+    i = 1
+    while geese:
+        low = geese & -geese
+        point = POINT_INDEX[low.bit_length() - 1]
+        if point > fox_point:
+            point -= 1
+        rank += BINOMIAL[point][i]
+        i += 1
+        geese ^= low
+    return rank
+
+
+def unrank_geese(fox, count, rank):
+    """Inverse of rank_geese: the goose bitboard for a rank."""
+    fox_point = POINT_INDEX[fox]
+    geese = 0
+    point = len(POINTS) - 1
+    for i in range(count, 0, -1):
+        while BINOMIAL[point][i] > rank:
+            point -= 1
+        rank -= BINOMIAL[point][i]
+        geese |= 1 << POINTS[point + 1 if point >= fox_point else point]
+    return geese
+
+
+def encode_move(move):
+    """Pack a move tuple into a small int (for tables and files)."""
+    frm, to, capture = move
+    return frm | (to << 6) | ((0 if capture is None else capture + 1) << 12)
+
+
+def decode_move(code):
+    capture = code >> 12
+    return (code & 63, (code >> 6) & 63, None if capture == 0 else capture - 1)
+
+
+def mirror_geese(geese):
+    mirrored = 0
+    shift = 0
+    while geese:
+        mirrored |= MIRROR_ROW[geese & _ROW_MASK] << shift
+        geese >>= BOARD_SIZE
+        shift += BOARD_SIZE
+    return mirrored
+
+
+def mirror_move(move):
+    """Map a move into the mirrored frame (mirroring twice is the identity)."""
+    frm, to, capture = move
+    return (MIRROR_SQUARE[frm], MIRROR_SQUARE[to],
+            None if capture is None else MIRROR_SQUARE[capture])
+
+
+def canonical(fox, geese):
+    """Pick one representative of a position and its mirror image.
+
+    Returns (fox, geese, mirrored); when `mirrored` is true, moves found in
+    the canonical frame go back through mirror_move() before being played.
+    """
+    mirrored_geese = mirror_geese(geese)
+    if mirrored_geese < geese or (mirrored_geese == geese and
+                                  MIRROR_SQUARE[fox] < fox):
+        return MIRROR_SQUARE[fox], mirrored_geese, True
+    return fox, geese, False
+
+
+def has_goose_move(fox, geese):
+    empty = POINT_MASK & ~geese & ~(1 << fox)
+    for shift, source in GOOSE_SHIFTS:
+        if shift < 0:
+            if ((geese & source) >> -shift) & empty:
+                return True
+        elif ((geese & source) << shift) & empty:
+            return True
+    return False
+
+
+def has_fox_move(fox, geese):
+    if FOX_STEP_MASK[fox] & ~geese:
+        return True
+    return bool(_fox_move_tuple(fox, geese))
+
+
+################################################################################
+# Position
+################################################################################
+class Position:
+    """A Fox and Geese position packed into bitboards."""
+
+    __slots__ = ("fox", "geese", "fox_turn")
+
+    def __init__(self, fox, geese, fox_turn):
+        self.fox = fox
+        self.geese = geese
+        self.fox_turn = fox_turn
+
+    @classmethod
+    def start(cls):
+        """The combine.py starting position: fox at (3,3), geese to move."""
+        geese = 0
+        for col in range(BOARD_SIZE):
+            geese |= 1 << square(4, col)
+        for row in (5, 6):
+            for col in (2, 3, 4):
+                geese |= 1 << square(row, col)
+        return cls(square(3, 3), geese, False)
+
+    @classmethod
+    def from_game_state(cls, state):
+        geese = 0
+        for r, c in state.geese_positions:
+            geese |= 1 << square(r, c)
+        return cls(square(*state.fox_pos), geese, state.fox_turn)
+
+    def copy(self):
+        return Position(self.fox, self.geese, self.fox_turn)
+
+    def __eq__(self, other):
+        return (isinstance(other, Position) and self.fox == other.fox and
+                self.geese == other.geese and self.fox_turn == other.fox_turn)
+
+    def __hash__(self):
+        return hash((self.fox, self.geese, self.fox_turn))
+
+    def __repr__(self):
+        return "Position(fox=%r, geese=%#x, fox_turn=%r)" % (
+            row_col(self.fox), self.geese, self.fox_turn)
+
+    def key(self):
+        return position_key(self.fox, self.geese, self.fox_turn)
+
+    def goose_count(self):
+        return self.geese.bit_count()
+
+    def mirror(self):
+        return Position(MIRROR_SQUARE[self.fox], mirror_geese(self.geese),
+                        self.fox_turn)
+
+    def canonical(self):
+        """(canonical position, mirrored flag); see canonical()."""
+        fox, geese, mirrored = canonical(self.fox, self.geese)
+        return Position(fox, geese, self.fox_turn), mirrored
+
+    def legal_moves(self):
+        if self.fox_turn:
+            return fox_moves(self.fox, self.geese)
+        return goose_moves(self.fox, self.geese)
+
+    def play(self, move):
+        """Return the position after `move` (the receiver is left unchanged)."""
+        frm, to, capture = move
+        if self.fox_turn:
+            geese = self.geese
+            if capture is not None:
+                geese &= ~(1 << capture)
+            return Position(to, geese, False)
+        return Position(self.fox, self.geese ^ (1 << frm) ^ (1 << to), True)
+
+    def winner(self):
+        """"Fox", "Geese" or None, using the same rules as GameState.move_piece."""
+        if self.geese.bit_count() < 3:
+            return "Fox"
+        if self.fox_turn:
+            if not has_fox_move(self.fox, self.geese):
+                return "Geese"
+        elif not has_goose_move(self.fox, self.geese):
+            return "Fox"
+        return None
+
+
+class SearchState:
+    """Mutable position with make/unmake for search and rollouts.
+
+    Both sides' mobility counts are kept up to date from the squares each
+    move touches, so is_game_over() and winner() never generate moves.
+    """
+
+    __slots__ = ("fox", "geese", "fox_turn", "fox_mobility",
+                 "goose_mobility", "key", "mirror_key", "history")
+
+    def __init__(self, position=None):
+        if position is None:
+            position = Position.start()
+        self.fox = position.fox
+        self.geese = position.geese
+        self.fox_turn = position.fox_turn
+        self.fox_mobility = fox_mobility(self.fox, self.geese)
+        self.goose_mobility = goose_mobility(self.fox, self.geese)
+        self.key = position_key(self.fox, self.geese, self.fox_turn)
+        self.mirror_key = position_key(MIRROR_SQUARE[self.fox],
+                                       mirror_geese(self.geese), self.fox_turn)
+        # (move, fox_mobility, goose_mobility, key, mirror_key) before each
+        # made move.
+        self.history = []
+
+    def position(self):
+        return Position(self.fox, self.geese, self.fox_turn)
+
+    def legal_moves(self):
+        if self.fox_turn:
+            return fox_moves(self.fox, self.geese)
+        return goose_moves(self.fox, self.geese)
+
+    def _vacate(self, sq, goose):
+        """Empty `sq` (held by a goose if `goose`), adjusting goose mobility."""
+        bit = 1 << sq
+        if goose:
+            self.geese ^= bit
+            empty = POINT_MASK & ~self.geese & ~(1 << self.fox)
+            self.goose_mobility -= (empty & GOOSE_TARGET_MASK[sq]).bit_count()
+        self.goose_mobility += (self.geese & GOOSE_SOURCE_MASK[sq]).bit_count()
+
+    def _occupy(self, sq, goose):
+        """Fill the empty `sq` (with a goose if `goose`), adjusting goose mobility."""
+        self.goose_mobility -= (self.geese & GOOSE_SOURCE_MASK[sq]).bit_count()
+        if goose:
+            self.geese |= 1 << sq
+            empty = POINT_MASK & ~self.geese & ~(1 << self.fox)
+            self.goose_mobility += (empty & GOOSE_TARGET_MASK[sq]).bit_count()
+
+    def make(self, move):
+        frm, to, capture = move
+        self.history.append((move, self.fox_mobility, self.goose_mobility,
+                             self.key, self.mirror_key))
+        if self.fox_turn:
+            self.key ^= FOX_KEYS[frm] ^ FOX_KEYS[to] ^ ZOBRIST_FOX_TURN
+            self.mirror_key ^= (MIRROR_FOX_KEYS[frm] ^ MIRROR_FOX_KEYS[to] ^
+                                ZOBRIST_FOX_TURN)
+            # The fox square is already empty as far as goose moves go, so
+            # vacate it only after the fox has moved on.
+            self.fox = to
+            self._occupy(to, False)
+            self._vacate(frm, False)
+            if capture is not None:
+                self._vacate(capture, True)
+                self.key ^= GOOSE_KEYS[capture]
+                self.mirror_key ^= MIRROR_GOOSE_KEYS[capture]
+            self.fox_mobility = fox_mobility(to, self.geese)
+        else:
+            self.key ^= GOOSE_KEYS[frm] ^ GOOSE_KEYS[to] ^ ZOBRIST_FOX_TURN
+            self.mirror_key ^= (MIRROR_GOOSE_KEYS[frm] ^ MIRROR_GOOSE_KEYS[to] ^
+                                ZOBRIST_FOX_TURN)
+            self._vacate(frm, True)
+            self._occupy(to, True)
+            # Only a change next to the fox can alter its mobility.
+            if ((1 << frm) | (1 << to)) & FOX_REACH_MASK[self.fox]:
+                self.fox_mobility = fox_mobility(self.fox, self.geese)
+        self.fox_turn = not self.fox_turn
+
+    def unmake(self):
+        (move, self.fox_mobility, self.goose_mobility,
+         self.key, self.mirror_key) = self.history.pop()
+        frm, to, capture = move
+        self.fox_turn = not self.fox_turn
+        if self.fox_turn:
+            self.fox = frm
+            if capture is not None:
+                self.geese |= 1 << capture
+        else:
+            self.geese ^= (1 << frm) | (1 << to)
+
+    def canonical_key(self):
+        """The same key for this position and its mirror image."""
+        return min(self.key, self.mirror_key)
+
+    def is_game_over(self):
+        if self.fox_turn:
+            return self.fox_mobility == 0 or self.geese.bit_count() < 3
+        return self.goose_mobility == 0 or self.geese.bit_count() < 3
+
+    def winner(self):
+        """"Fox", "Geese" or None, without generating any moves."""
+        if self.geese.bit_count() < 3:
+            return "Fox"
+        if self.fox_turn:
+            return "Geese" if self.fox_mobility == 0 else None
+        return "Fox" if self.goose_mobility == 0 else None
@@ -0,0 +1,261 @@
+"""Single-game reset/step environment and a subprocess vector wrapper.
+
+FoxGeeseEnv follows the Gymnasium calling convention without depending on
+it: reset() returns (observation, info) and step() returns (observation,
+reward, terminated, truncated, info).  Observations and actions match
+batch_env: a 34-entry int8 vector (33 points as 0/1/2, then side to move) and
+the discrete action from_point * 33 + to_point.  info["action_mask"] lists
+the legal actions.  Draws follow rules.DrawRules: a repetition draw
+terminates the game and reaching `max_plies` truncates it.
+
+SubprocVecEnv runs one FoxGeeseEnv per process.  Actions, observations,
+rewards, flags and masks live in shared-memory arrays that both sides map
+as NumPy views; the pipe to each worker only carries a one-word command, so
+nothing is pickled per step.  Like BatchEnv, finished games reset
+themselves and the returned observation is the new start.
+
+Run this module directly for steps per second:
+    python env.py --envs 4 --steps 2000
+"""
+
+import argparse
+import multiprocessing
+import sys
+import time
+
+import numpy as np
+
+from engine import POINT_INDEX, SearchState
+from rules import DrawRules, REPETITION_LIMIT
+from vector_rules import NUM_POINTS, NUM_ACTIONS
+
+OBSERVATION_SIZE = NUM_POINTS + 1
+
+
+def write_observation(position, out):
+    """Fill `out` (34 entries, any numeric dtype) from a Position or
+    SearchState."""
+    out[:] = 0
+    geese = position.geese
+    while geese:
+        low = geese & -geese
+        out[POINT_INDEX[low.bit_length() - 1]] = 2
+        geese ^= low
+    out[POINT_INDEX[position.fox]] = 1
+    out[NUM_POINTS] = position.fox_turn
+
+
+class FoxGeeseEnv:
+    """One game of Fox and Geese; rewards are for the side that just moved."""
+
+    num_actions = NUM_ACTIONS
+    observation_shape = (OBSERVATION_SIZE,)
+
+    def __init__(self, max_plies=200):
+        self.max_plies = max_plies
+        self.state = None
+        self.draw_rules = DrawRules(REPETITION_LIMIT, max_plies)
+        self.moves_by_action = {}
+
+    def reset(self, seed=None):
+        """`seed` is accepted for Gymnasium compatibility; the start position
+        is fixed."""
+        self.state = SearchState()
+        self.draw_rules.reset(self.state.key)
+        return self._observe(), self._info()
+
+    def action_mask(self):
+        mask = np.zeros(NUM_ACTIONS, dtype=bool)
+        mask[list(self.moves_by_action)] = True
+        return mask
+
+    def _observe(self):
+        obs = np.zeros(OBSERVATION_SIZE, dtype=np.int8)
+        self.write_observation(obs)
+        return obs
+
+    def write_observation(self, out):
+        """Fill a preallocated 34-entry int8 array."""
+        write_observation(self.state, out)
+
+    def _info(self, winner=None):
+        self.moves_by_action = {
+            POINT_INDEX[move[0]] * NUM_POINTS + POINT_INDEX[move[1]]: move
+            for move in self.state.legal_moves()
+        }
+        return {"action_mask": self.action_mask(), "winner": winner}
+
+    def step(self, action):
+        move = self.moves_by_action.get(int(action))
+        if move is None:
+            raise ValueError("illegal action %d" % action)
+        self.state.make(move)
+        draw_reason = self.draw_rules.record(self.state.key, move[2] is not None)
+        winner = self.state.winner()
+        # A repetition draw ends the game; the move limit only truncates it.
+        terminated = winner is not None or draw_reason == "repetition"
+        truncated = not terminated and draw_reason == "move limit"
+        # Draws, repetition included, pay nothing.
+        reward = 1.0 if winner is not None else 0.0
+        return self._observe(), reward, terminated, truncated, self._info(winner)
+
+
+################################################################################
+# Subprocess vector wrapper
+################################################################################
+_STEP = 1
+_RESET = 2
+_CLOSE = 3
+
+# Shared buffers: name -> (per-env shape, dtype, ctypes typecode).
+_BUFFERS = {
+    "actions": ((), np.int64, "q"),
+    "observations": ((OBSERVATION_SIZE,), np.int8, "b"),
+    "rewards": ((), np.float32, "f"),
+    "terminated": ((), np.bool_, "b"),
+    "truncated": ((), np.bool_, "b"),
+    "masks": ((NUM_ACTIONS,), np.bool_, "b"),
+    "winners": ((), np.int8, "b"),
+}
+
+
+def _views(raw, num_envs):
+    views = {}
+    for name, (shape, dtype, _) in _BUFFERS.items():
+        views[name] = np.frombuffer(raw[name], dtype=dtype).reshape(
+            (num_envs,) + shape)
+    return views
+
+
+_WINNER_CODES = {None: 0, "Fox": 1, "Geese": -1}
+
+
+def _worker(conn, index, raw, num_envs, max_plies):
+    buffers = _views(raw, num_envs)
+    env = FoxGeeseEnv(max_plies)
+    observation = buffers["observations"][index]
+
+    def publish(info):
+        env.write_observation(observation)
+        buffers["masks"][index] = info["action_mask"]
+        buffers["winners"][index] = _WINNER_CODES[info["winner"]]
+
+    while True:
+        command = conn.recv()
+        if command == _STEP:
+            _, reward, terminated, truncated, info = env.step(
+                buffers["actions"][index])
+            buffers["rewards"][index] = reward
+            buffers["terminated"][index] = terminated
+            buffers["truncated"][index] = truncated
+            winner = info["winner"]
+            if terminated or truncated:
+                _, info = env.reset()
+            publish(info)
+            buffers["winners"][index] = _WINNER_CODES[winner]
+        elif command == _RESET:
+            _, info = env.reset()
+            buffers["rewards"][index] = 0.0
+            buffers["terminated"][index] = False
+            buffers["truncated"][index] = False
+            publish(info)
+        elif command == _CLOSE:
+            break
+        conn.send(True)
+    conn.close()
+
+
+class SubprocVecEnv:
+    """One FoxGeeseEnv per process, exchanging data through shared memory.
+
+    step() and reset() return views of the shared arrays; copy them if they
+    must outlive the next call.
+    """
+
+    def __init__(self, num_envs, max_plies=200):
+        ctx = multiprocessing.get_context()
+        self.num_envs = num_envs
+        raw = {}
+        for name, (shape, _, typecode) in _BUFFERS.items():
+            size = num_envs * int(np.prod(shape, dtype=np.int64))
+            raw[name] = ctx.RawArray(typecode, size)
+        self.buffers = _views(raw, num_envs)
+        self.connections = []
+        self.processes = []
+        for index in range(num_envs):
+            parent, child = ctx.Pipe()
+            process = ctx.Process(target=_worker,
+                                  args=(child, index, raw, num_envs, max_plies),
+                                  daemon=True)
+            process.start()
+            child.close()
+            self.connections.append(parent)
+            self.processes.append(process)
+        self.closed = False
+
+    def _broadcast(self, command):
+        for conn in self.connections:
+            conn.send(command)
+        for conn in self.connections:
+            conn.recv()
+
+    def reset(self):
+        """Returns (observations, action masks)."""
+        self._broadcast(_RESET)
+        return self.buffers["observations"], self.buffers["masks"]
+
+    def step(self, actions):
+        """Returns (observations, rewards, terminated, truncated, masks,
+        winners); winners are 1 fox, -1 geese, 0 none."""
+        self.buffers["actions"][:] = actions
+        self._broadcast(_STEP)
+        b = self.buffers
+        return (b["observations"], b["rewards"], b["terminated"],
+                b["truncated"], b["masks"], b["winners"])
+
+    def close(self):
+        if self.closed:
+            return
+        for conn in self.connections:
+            conn.send(_CLOSE)
+        for process in self.processes:
+            process.join()
+        self.closed = True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Environment steps per second")
+    parser.add_argument("--envs", type=int, default=4)
+    parser.add_argument("--steps", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(args.seed)
+    env = FoxGeeseEnv()
+    _, info = env.reset()
+    started = time.perf_counter()
+    for _ in range(args.steps):
+        action = rng.choice(np.nonzero(info["action_mask"])[0])
+        _, _, terminated, truncated, info = env.step(action)
+        if terminated or truncated:
+            _, info = env.reset()
+    elapsed = time.perf_counter() - started
+    print("FoxGeeseEnv: %.0f steps/s" % (args.steps / elapsed))
+
+    vec = SubprocVecEnv(args.envs)
+    try:
+        _, masks = vec.reset()
+        started = time.perf_counter()
+        for _ in range(args.steps):
+            actions = [rng.choice(np.nonzero(row)[0]) for row in masks]
+            _, _, _, _, masks, _ = vec.step(actions)
+        elapsed = time.perf_counter() - started
+    finally:
+        vec.close()
+    print("SubprocVecEnv x%d: %.0f env steps/s" % (
+        args.envs, args.envs * args.steps / elapsed))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
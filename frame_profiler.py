@@ -0,0 +1,103 @@
+"""Per-frame, per-phase timings for the pygame loop.
+
+The loop calls start_frame() at the top of each frame, mark(phase) after
+each piece of work, and end_frame() after display.flip().  mark() charges
+the time since the previous mark to that phase.  Timings for the last
+`capacity` frames are kept in a ring buffer: one flat array of doubles
+allocated up front, `len(phases) + 1` columns per frame (the frame total
+first), which is overwritten in place, so profiling never grows memory.
+
+summary() reduces the buffer to FPS, frame-time percentiles and per-phase
+mean and worst times; it sorts a copy, so call it a few times a second,
+not every frame.  dump_csv() writes the buffered frames oldest first.
+
+Usage (in the loop):
+    profiler = FrameProfiler(("events", "draw", "flip"))
+    profiler.start_frame()
+    ...
+    profiler.mark("events")
+"""
+
+import time
+from array import array
+
+
+class FrameProfiler:
+    def __init__(self, phases, capacity=3600):
+        self.phases = tuple(phases)
+        self.columns = len(self.phases) + 1
+        # Column of each phase; column 0 is the frame total.
+        self.phase_column = {phase: i + 1 for i, phase in enumerate(self.phases)}
+        self.capacity = capacity
+        self.times = array("d", bytes(8 * capacity * self.columns))
+        self.count = 0
+        self.frame = 0
+        self.row = 0
+        self.frame_started = 0.0
+        self.last_mark = 0.0
+
+    def start_frame(self):
+        row = (self.frame % self.capacity) * self.columns
+        times = self.times
+        for column in range(row, row + self.columns):
+            times[column] = 0.0
+        self.row = row
+        self.frame_started = self.last_mark = time.perf_counter()
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.times[self.row + self.phase_column[phase]] += now - self.last_mark
+        self.last_mark = now
+
+    def end_frame(self):
+        self.times[self.row] = time.perf_counter() - self.frame_started
+        self.frame += 1
+        if self.count < self.capacity:
+            self.count += 1
+
+    def _rows(self):
+        """Buffer offsets of the stored frames, oldest first."""
+        first = self.frame - self.count
+        return [((first + i) % self.capacity) * self.columns
+                for i in range(self.count)]
+
+    def summary(self, window=None):
+        """FPS, frame-time percentiles and per-phase times, in milliseconds.
+
+        Covers the last `window` frames, or the whole buffer.
+        """
+        rows = self._rows()
+        if window is not None:
+            rows = rows[-window:]
+        if not rows:
+            return None
+        times = self.times
+        frames = sorted(times[row] for row in rows)
+        total = sum(frames)
+
+        def percentile(p):
+            return frames[min(len(frames) - 1, int(p * len(frames)))] * 1000
+
+        phases = []
+        for phase, column in self.phase_column.items():
+            values = [times[row + column] for row in rows]
+            phases.append((phase, sum(values) / len(values) * 1000,
+                           max(values) * 1000))
+        return {"frames": len(frames),
+                "fps": len(frames) / total if total else 0.0,
+                "p50": percentile(0.50), "p95": percentile(0.95),
+                "p99": percentile(0.99), "max": frames[-1] * 1000,
+                "phases": phases}
+
+    def dump_csv(self, path):
+        """Write the buffered frames, in milliseconds; returns the row count."""
+        rows = self._rows()
+        first = self.frame - self.count
+        with open(path, "w") as f:
+            f.write("frame,total_ms," +
+                    ",".join(phase + "_ms" for phase in self.phases) + "\n")
+            for i, row in enumerate(rows):
+                values = self.times[row:row + self.columns]
+                f.write("%d,%s\n" % (first + i, ",".join(
+                    "%.4f" % (value * 1000) for value in values)))
+        return len(rows)
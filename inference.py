@@ -0,0 +1,264 @@
+"""NumPy policy/value network and a batching inference server.
+
+PolicyValueNet is a plain MLP: the 34-entry observation of batch_env (33
+points as 0/1/2, then side to move) in, a logit per discrete action
+(from_point * 33 + to_point) and a tanh value for the fox out.
+
+A forward pass over 64 rows costs a fraction of 64 one-row passes, so
+InferenceServer lets many search threads or environments share one forward
+pass.  submit() queues an observation and returns a
+concurrent.futures.Future; a single server thread waits for the first
+request, keeps collecting until it has `max_batch_size` of them or
+`max_wait` seconds have passed, evaluates them together and resolves the
+futures.  NumPy releases the GIL during the multiply, so callers keep
+running meanwhile.  stats() reports request latency and batch fill as
+histograms, the two numbers to trade off when tuning those limits.
+
+Run this module directly to see the effect of the batch limits:
+    python inference.py --clients 32 --requests 200 --max-batch-size 64
+"""
+
+import argparse
+import bisect
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from env import OBSERVATION_SIZE, write_observation
+from vector_rules import NUM_ACTIONS
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket
+# takes everything slower.
+LATENCY_BUCKETS = [0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1]
+
+
+def observation(position):
+    """batch_env-style float32 observation of an engine Position."""
+    obs = np.empty(OBSERVATION_SIZE, dtype=np.float32)
+    write_observation(position, obs)
+    return obs
+
+
+class PolicyValueNet:
+    """MLP with ReLU hidden layers, a policy head and a value head."""
+
+    def __init__(self, hidden=(256, 256), seed=0):
+        rng = np.random.default_rng(seed)
+        sizes = [OBSERVATION_SIZE] + list(hidden)
+        self.weights = []
+        self.biases = []
+        for fan_in, fan_out in zip(sizes, sizes[1:]):
+            self.weights.append((rng.standard_normal((fan_in, fan_out)) *
+                                 np.sqrt(2.0 / fan_in)).astype(np.float32))
+            self.biases.append(np.zeros(fan_out, dtype=np.float32))
+        last = sizes[-1]
+        self.policy_weights = (rng.standard_normal((last, NUM_ACTIONS)) *
+                               np.sqrt(1.0 / last)).astype(np.float32)
+        self.policy_bias = np.zeros(NUM_ACTIONS, dtype=np.float32)
+        self.value_weights = (rng.standard_normal((last, 1)) *
+                              np.sqrt(1.0 / last)).astype(np.float32)
+        self.value_bias = np.zeros(1, dtype=np.float32)
+
+    def forward(self, observations):
+        """(policy logits (B, NUM_ACTIONS), values (B,)) for (B, 34) inputs."""
+        x = np.asarray(observations, dtype=np.float32)
+        for weights, bias in zip(self.weights, self.biases):
+            x = np.maximum(x @ weights + bias, 0.0)
+        logits = x @ self.policy_weights + self.policy_bias
+        values = np.tanh(x @ self.value_weights + self.value_bias)[:, 0]
+        return logits, values
+
+    def save(self, path):
+        arrays = {"policy_weights": self.policy_weights,
+                  "policy_bias": self.policy_bias,
+                  "value_weights": self.value_weights,
+                  "value_bias": self.value_bias}
+        for i, (weights, bias) in enumerate(zip(self.weights, self.biases)):
+            arrays["weights_%d" % i] = weights
+            arrays["bias_%d" % i] = bias
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        net = cls.__new__(cls)
+        with np.load(path) as arrays:
+            layers = sum(1 for name in arrays.files if name.startswith("weights_"))
+            net.weights = [arrays["weights_%d" % i] for i in range(layers)]
+            net.biases = [arrays["bias_%d" % i] for i in range(layers)]
+            for name in ("policy_weights", "policy_bias", "value_weights",
+                         "value_bias"):
+                setattr(net, name, arrays[name])
+        return net
+
+
+class InferenceServer:
+    """Batches concurrent evaluation requests into single forward passes.
+
+    max_batch_size:  most requests evaluated together
+    max_wait:        seconds to hold the first request of a batch while
+                     waiting for more
+    """
+
+    def __init__(self, model, max_batch_size=64, max_wait=0.002):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.requests = queue.Queue()
+        self.lock = threading.Lock()
+        self.latency_counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.batch_fill_counts = [0] * (max_batch_size + 1)
+        self.evaluated = 0
+        self.closed = False
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+        self.thread.start()
+
+    def submit(self, obs):
+        """Queue one observation; the future resolves to (logits, value)."""
+        future = Future()
+        # Under the lock close() takes, so nothing is queued behind its
+        # stop marker.
+        with self.lock:
+            if self.closed:
+                raise RuntimeError("inference server is closed")
+            self.requests.put((obs, future, time.perf_counter()))
+        return future
+
+    def evaluate(self, position):
+        """Blocking convenience call for one engine Position."""
+        return self.submit(observation(position)).result()
+
+    def _collect(self):
+        first = self.requests.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = (self.requests.get_nowait() if remaining <= 0 else
+                        self.requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+            if item is None:
+                # Finish this batch, then stop.
+                self.requests.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _serve(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            try:
+                observations = np.stack([obs for obs, _, _ in batch])
+                logits, values = self.model.forward(observations)
+            except Exception as error:
+                for _, future, _ in batch:
+                    future.set_exception(error)
+                continue
+            now = time.perf_counter()
+            with self.lock:
+                self.batch_fill_counts[len(batch)] += 1
+                self.evaluated += len(batch)
+                for _, _, submitted in batch:
+                    bucket = bisect.bisect_left(LATENCY_BUCKETS, now - submitted)
+                    self.latency_counts[bucket] += 1
+            for i, (_, future, _) in enumerate(batch):
+                future.set_result((logits[i], float(values[i])))
+
+    def stats(self):
+        """Histograms since the server started.
+
+        latency:     (upper bound in seconds or None, request count) pairs
+        batch_fill:  batch size -> number of forward passes of that size
+        """
+        with self.lock:
+            latency = list(zip(LATENCY_BUCKETS + [None], self.latency_counts))
+            fill = {size: count for size, count in
+                    enumerate(self.batch_fill_counts) if count}
+            batches = sum(fill.values())
+            return {
+                "requests": self.evaluated,
+                "batches": batches,
+                "mean_batch_size": self.evaluated / batches if batches else 0.0,
+                "latency": latency,
+                "batch_fill": fill,
+            }
+
+    def close(self):
+        """Stop the server after the queued requests; returns once it has.
+
+        Any request still queued when the server thread stops is failed
+        with RuntimeError rather than left unresolved.
+        """
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            self.requests.put(None)
+        self.thread.join()
+        while True:
+            try:
+                item = self.requests.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                item[1].set_exception(
+                    RuntimeError("inference server closed before evaluating"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batched inference throughput")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=200,
+                        help="sequential requests per client")
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--max-wait", type=float, default=0.002)
+    args = parser.parse_args(argv)
+
+    from ai import sample_positions
+    positions = sample_positions(64)
+    observations = [observation(position) for position in positions]
+    net = PolicyValueNet()
+
+    def run_clients(evaluate):
+        def client(offset):
+            for i in range(args.requests):
+                evaluate(observations[(offset + i) % len(observations)])
+
+        threads = [threading.Thread(target=client, args=(i,))
+                   for i in range(args.clients)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - started
+
+    total = args.clients * args.requests
+    elapsed = run_clients(lambda obs: net.forward(obs[None, :]))
+    print("one forward pass per request: %.0f positions/s" % (total / elapsed))
+
+    server = InferenceServer(net, args.max_batch_size, args.max_wait)
+    elapsed = run_clients(lambda obs: server.submit(obs).result())
+    server.close()
+    stats = server.stats()
+    print("server: %.0f positions/s, mean batch %.1f of %d" % (
+        stats["requests"] / elapsed, stats["mean_batch_size"],
+        args.max_batch_size))
+    print("latency:")
+    for bound, count in stats["latency"]:
+        label = "<= %.1f ms" % (bound * 1000) if bound else "slower"
+        print("  %-12s %d" % (label, count))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,220 @@
+"""Streaming loader for self-play shards (see selfplay.py).
+
+Shards are memory-mapped, so only the records being read are paged in.  A
+background thread reads contiguous chunks from the shards in random order
+into a fixed-size shuffle buffer, draws each batch from random buffer slots,
+refills those slots with the next records, and decodes the batch.  Decoded
+batches wait in a bounded queue so the learner only blocks when the loader
+really is behind.  The decoding is NumPy work that releases the GIL, so a
+thread is enough.
+
+Each batch is a dict of arrays:
+
+    boards    (B, 7, 7) int8  GameState.board layout: 0 empty, 1 fox,
+                              2 goose, -1 off the board (None in GameState)
+    fox_turn  (B,) bool
+    action    (B,) int64      from_point * 33 + to_point
+    outcome   (B,) int8       +1 fox won, -1 geese won, 0 draw
+    ply       (B,) int64
+    policy    (B, NUM_MOVES) float32, only for shards with policy targets
+
+Usage:
+    python loader.py data --batch-size 1024 --batches 500
+"""
+
+import argparse
+import queue
+import sys
+import threading
+import time
+
+import numpy as np
+
+from rules import BOARD_SIZE, is_valid_point
+from selfplay import shard_paths
+
+# Cells of the 7x7 board in the order of the packed goose bits, which is the
+# row-major order of engine.POINTS.
+_POINT_CELLS = np.array([r * BOARD_SIZE + c
+                         for r in range(BOARD_SIZE) for c in range(BOARD_SIZE)
+                         if is_valid_point(r, c)], dtype=np.int64)
+_POINT_BITS = np.arange(len(_POINT_CELLS), dtype=np.uint64)
+_EMPTY_BOARD = np.full(BOARD_SIZE * BOARD_SIZE, -1, dtype=np.int8)
+_EMPTY_BOARD[_POINT_CELLS] = 0
+
+
+def decode_boards(records):
+    """(B, 7, 7) int8 boards for an array of packed records."""
+    count = len(records)
+    geese = (records["geese"][:, None] >> _POINT_BITS) & np.uint64(1)
+    boards = np.tile(_EMPTY_BOARD, (count, 1))
+    boards[:, _POINT_CELLS] = geese.astype(np.int8) * 2
+    boards[np.arange(count), _POINT_CELLS[records["fox"]]] = 1
+    return boards.reshape(count, BOARD_SIZE, BOARD_SIZE)
+
+
+def decode(records):
+    batch = {
+        "boards": decode_boards(records),
+        "fox_turn": records["fox_turn"].astype(bool),
+        "action": records["action"].astype(np.int64),
+        "outcome": records["outcome"].copy(),
+        "ply": records["ply"].astype(np.int64),
+    }
+    if "policy" in records.dtype.names:
+        batch["policy"] = records["policy"].astype(np.float32) / 255
+    return batch
+
+
+class ShardLoader:
+    """Iterate over shuffled, decoded batches from a shard directory.
+
+    batch_size:      positions per batch; a final short batch is dropped
+    shuffle_buffer:  records held for shuffling; larger mixes games better
+    prefetch:        decoded batches kept ready in the queue
+    chunk_size:      records read from a shard at a time
+    epochs:          passes over the data, or None to repeat forever
+    """
+
+    def __init__(self, directory, batch_size=256, shuffle_buffer=1 << 16,
+                 prefetch=8, chunk_size=4096, epochs=1, seed=None):
+        self.paths = shard_paths(directory)
+        if not self.paths:
+            raise ValueError("no shards in %s" % directory)
+        self.shards = [np.load(path, mmap_mode="r") for path in self.paths]
+        self.batch_size = batch_size
+        self.shuffle_buffer = max(shuffle_buffer, batch_size)
+        self.chunk_size = chunk_size
+        self.epochs = epochs
+        self.rng = np.random.default_rng(seed)
+        self.queue = queue.Queue(maxsize=prefetch)
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.error = None
+        # Counters for stats().
+        self.started = None
+        self.positions = 0
+        self.batches = 0
+        self.waits = 0
+
+    def __len__(self):
+        """Records per epoch."""
+        return sum(len(shard) for shard in self.shards)
+
+    def _chunks(self):
+        """Contiguous record blocks from every shard, in random order."""
+        epoch = 0
+        while self.epochs is None or epoch < self.epochs:
+            blocks = [(shard, start) for shard in self.shards
+                      for start in range(0, len(shard), self.chunk_size)]
+            for i in self.rng.permutation(len(blocks)):
+                shard, start = blocks[i]
+                yield np.array(shard[start:start + self.chunk_size])
+            epoch += 1
+
+    def _put(self, batch):
+        while not self.stop_event.is_set():
+            try:
+                self.queue.put(batch, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _fill(self):
+        try:
+            buffer = np.empty(self.shuffle_buffer, dtype=self.shards[0].dtype)
+            size = 0
+            pending = np.empty(0, dtype=buffer.dtype)
+            for chunk in self._chunks():
+                pending = np.concatenate([pending, chunk])
+                if size < len(buffer):
+                    take = min(len(buffer) - size, len(pending))
+                    buffer[size:size + take] = pending[:take]
+                    size += take
+                    pending = pending[take:]
+                while size == len(buffer) and len(pending) >= self.batch_size:
+                    slots = self.rng.choice(size, self.batch_size, replace=False)
+                    batch = decode(buffer[slots])
+                    buffer[slots] = pending[:self.batch_size]
+                    pending = pending[self.batch_size:]
+                    if not self._put(batch):
+                        return
+            # Out of data: drain whatever is left, still shuffled.
+            rest = np.concatenate([buffer[:size], pending])
+            rest = rest[self.rng.permutation(len(rest))]
+            for start in range(0, len(rest) - self.batch_size + 1,
+                               self.batch_size):
+                if not self._put(decode(rest[start:start + self.batch_size])):
+                    return
+        except Exception as error:
+            self.error = error
+        self._put(None)
+
+    def start(self):
+        if self.thread is None:
+            self.started = time.perf_counter()
+            self.thread = threading.Thread(target=self._fill, daemon=True)
+            self.thread.start()
+
+    def __iter__(self):
+        self.start()
+        while True:
+            if self.queue.empty():
+                self.waits += 1
+            batch = self.queue.get()
+            if batch is None:
+                if self.error is not None:
+                    raise self.error
+                return
+            self.positions += self.batch_size
+            self.batches += 1
+            yield batch
+
+    def close(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+
+    def stats(self):
+        """Throughput and prefetch state since start()."""
+        elapsed = time.perf_counter() - self.started if self.started else 0.0
+        return {
+            "positions": self.positions,
+            "batches": self.batches,
+            "positions_per_second": self.positions / elapsed if elapsed else 0.0,
+            "queue_depth": self.queue.qsize(),
+            "queue_capacity": self.queue.maxsize,
+            "waits": self.waits,
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Shard loader throughput")
+    parser.add_argument("directory")
+    parser.add_argument("--batch-size", type=int, default=1024)
+    parser.add_argument("--batches", type=int, default=500)
+    parser.add_argument("--shuffle-buffer", type=int, default=1 << 16)
+    parser.add_argument("--prefetch", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    loader = ShardLoader(args.directory, args.batch_size, args.shuffle_buffer,
+                         args.prefetch, epochs=None, seed=args.seed)
+    try:
+        for count, _ in enumerate(loader, 1):
+            if count % 100 == 0 or count == args.batches:
+                stats = loader.stats()
+                print("%6d batches: %.0f positions/s, queue %d/%d, "
+                      "%d waits" % (count, stats["positions_per_second"],
+                                    stats["queue_depth"],
+                                    stats["queue_capacity"], stats["waits"]))
+            if count == args.batches:
+                break
+    finally:
+        loader.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+"""Monte Carlo Tree Search player with NumPy-batched random rollouts.
+
+The tree is ordinary Python objects, but leaves are collected in batches:
+each batch descends the tree `batch_size` times (using a virtual loss so the
+descents spread out), then plays all of the new leaves out at once with
+vector_rules.random_playouts and backs the results up.
+
+Run this module directly to measure playouts per second:
+    python mcts.py --iterations 4096 --batch-size 256
+"""
+
+import argparse
+import math
+import sys
+import threading
+import time
+
+import numpy as np
+
+from engine import Position
+from search import SearchResult, SearchAborted
+import vector_rules
+
+
+class Node:
+    __slots__ = ("move", "parent", "position", "children", "untried",
+                 "visits", "value", "terminal")
+
+    def __init__(self, position, move=None, parent=None):
+        self.move = move
+        self.parent = parent
+        self.position = position
+        self.children = []
+        winner = position.winner()
+        self.terminal = None
+        if winner is not None:
+            self.terminal = 1 if winner == "Fox" else -1
+            self.untried = []
+        else:
+            self.untried = position.legal_moves()
+        self.visits = 0
+        # Sum of results from the point of view of the side that moved here.
+        self.value = 0.0
+
+    def select_child(self, exploration):
+        log_visits = math.log(self.visits)
+        best = None
+        best_score = -math.inf
+        for child in self.children:
+            score = (child.value / child.visits +
+                     exploration * math.sqrt(log_visits / child.visits))
+            if score > best_score:
+                best_score = score
+                best = child
+        return best
+
+
+class MCTS:
+    """UCT search.
+
+    iterations:     playouts per move
+    exploration:    UCT exploration constant
+    rollout_depth:  plies a playout may run before it is scored as a draw
+    batch_size:     leaves played out together in one NumPy call
+    """
+
+    def __init__(self, iterations=2048, exploration=1.4, rollout_depth=100,
+                 batch_size=128, seed=None, stop_event=None):
+        self.iterations = iterations
+        self.exploration = exploration
+        self.rollout_depth = rollout_depth
+        self.batch_size = batch_size
+        self.rng = np.random.default_rng(seed)
+        self.stop_event = stop_event if stop_event is not None else threading.Event()
+        self.playouts = 0
+        # Tree of the last search, for callers that want the visit counts.
+        self.root = None
+
+    def stop(self):
+        self.stop_event.set()
+
+    def search(self, position, time_limit=float("inf")):
+        """Return a SearchResult; `nodes` counts playouts, `score` is the
+        chosen move's win rate in thousandths."""
+        started = time.perf_counter()
+        deadline = started + time_limit
+        root = Node(position)
+        self.root = root
+        self.playouts = 0
+        while self.playouts < self.iterations:
+            if self.stop_event.is_set():
+                raise SearchAborted()
+            if root.terminal is not None or (
+                    self.playouts and time.perf_counter() >= deadline):
+                break
+            batch = min(self.batch_size, self.iterations - self.playouts)
+            self._run_batch(root, batch)
+        if not root.children:
+            move = root.untried[0] if root.untried else None
+            return SearchResult(move, 0, 0, self.playouts,
+                                time.perf_counter() - started)
+        best = max(root.children, key=lambda child: child.visits)
+        score = int(1000 * best.value / best.visits)
+        return SearchResult(best.move, score, _tree_depth(best) + 1,
+                            self.playouts, time.perf_counter() - started)
+
+    def _run_batch(self, root, batch):
+        leaves = []
+        for _ in range(batch):
+            node = root
+            node.visits += 1  # virtual loss until the result is backed up
+            while not node.untried and node.children:
+                node = node.select_child(self.exploration)
+                node.visits += 1
+            if node.untried:
+                move = node.untried.pop(
+                    int(self.rng.integers(len(node.untried))))
+                child = Node(node.position.play(move), move, node)
+                node.children.append(child)
+                node = child
+                node.visits += 1
+            leaves.append(node)
+
+        results = [leaf.terminal for leaf in leaves]
+        pending = [i for i, result in enumerate(results) if result is None]
+        if pending:
+            fox, geese, fox_turn = vector_rules.from_positions(
+                [leaves[i].position for i in pending])
+            outcomes = vector_rules.random_playouts(
+                fox, geese, fox_turn, self.rng, self.rollout_depth)
+            for i, outcome in zip(pending, outcomes):
+                results[i] = int(outcome)
+        self.playouts += len(leaves)
+
+        for leaf, result in zip(leaves, results):
+            # result: +1 fox won, -1 geese won, 0 undecided.
+            reward = 0.5 + 0.5 * result
+            node = leaf
+            while node.parent is not None:
+                # The side that moved into `node` is the one not to move now.
+                moved_fox = not node.position.fox_turn
+                node.value += reward if moved_fox else 1.0 - reward
+                node = node.parent
+
+
+def _tree_depth(node):
+    depth = 0
+    while node.children:
+        node = max(node.children, key=lambda child: child.visits)
+        depth += 1
+    return depth
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="MCTS playout throughput")
+    parser.add_argument("--iterations", type=int, default=4096)
+    parser.add_argument("--batch-size", type=int, default=128)
+    parser.add_argument("--rollout-depth", type=int, default=100)
+    parser.add_argument("--exploration", type=float, default=1.4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    mcts = MCTS(args.iterations, args.exploration, args.rollout_depth,
+                args.batch_size, args.seed)
+    result = mcts.search(Position.start())
+    print("move %s  win rate %.3f  %d playouts in %.2fs  (%.0f playouts/s)" % (
+        result.move, result.score / 1000, result.nodes, result.elapsed,
+        result.nodes / result.elapsed))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""Lazy SMP: several processes search the same root and share one table.
+
+Every worker runs the ordinary iterative-deepening search on its own core.
+They communicate only through a SharedTranspositionTable, so work one worker
+finishes becomes a free TT hit for the others.  Odd-numbered helpers search
+one ply deeper than the main worker to spread the workers over different
+parts of the tree.  The main worker's result is the answer; when it
+finishes, the helpers are told to stop.  A worker that dies without
+reporting makes parallel_search() raise RuntimeError rather than hang.
+
+Speedups are reported against a plain single-process Searcher with the same
+table size, so they include the cost of the processes and the shared table.
+
+Usage:
+    python parallel_search.py --depth 8 --workers 1 2 4 8 16
+"""
+
+import argparse
+import multiprocessing
+import os
+import queue
+import sys
+import time
+
+from engine import Position
+from search import Searcher, SearchAborted, SearchResult
+from ttable import SharedTranspositionTable
+
+# Seconds between liveness checks while waiting for worker results.
+POLL_INTERVAL = 0.5
+
+
+def _worker(worker_id, tt_name, tt_bits, position, depth, time_limit,
+            stop_event, results):
+    tt = SharedTranspositionTable(tt_bits, name=tt_name)
+    searcher = Searcher(stop_event=stop_event, tt=tt)
+    if worker_id % 2 == 1:
+        depth += 1
+    try:
+        result = searcher.search_timed(position, time_limit, depth)
+    except SearchAborted:
+        result = None
+    else:
+        if worker_id == 0:
+            stop_event.set()
+    results.put((worker_id, result, searcher.nodes, tt.stats()))
+    tt.close()
+
+
+def _next_result(results, processes, pending):
+    """The next worker report; raises RuntimeError if a worker that has not
+    reported yet has exited, instead of waiting for it forever."""
+    while True:
+        try:
+            return results.get(timeout=POLL_INTERVAL)
+        except queue.Empty:
+            pass
+        dead = [i for i in sorted(pending)
+                if processes[i].exitcode is not None]
+        if dead:
+            # A report sent just before exiting may still be in the pipe.
+            try:
+                return results.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                raise RuntimeError("search worker %d exited with code %s "
+                                   "without a result" % (
+                                       dead[0], processes[dead[0]].exitcode))
+
+
+def parallel_search(position, workers, depth=64, time_limit=float("inf"),
+                    tt_bits=20):
+    """Search `position` with `workers` processes; returns a SearchResult.
+
+    `nodes` in the result is the total over all workers.
+    """
+    ctx = multiprocessing.get_context()
+    tt = SharedTranspositionTable(tt_bits, create=True)
+    stop_event = ctx.Event()
+    results = ctx.Queue()
+    started = time.perf_counter()
+    processes = [
+        ctx.Process(target=_worker,
+                    args=(i, tt.name, tt_bits, position, depth, time_limit,
+                          stop_event, results))
+        for i in range(workers)
+    ]
+    try:
+        for process in processes:
+            process.start()
+        main_result = None
+        nodes = 0
+        pending = set(range(workers))
+        while pending:
+            worker_id, result, worker_nodes, _ = _next_result(
+                results, processes, pending)
+            pending.discard(worker_id)
+            nodes += worker_nodes
+            if worker_id == 0:
+                main_result = result
+        for process in processes:
+            process.join()
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        tt.close()
+        tt.unlink()
+    elapsed = time.perf_counter() - started
+    return SearchResult(main_result.move, main_result.score, main_result.depth,
+                        nodes, elapsed, main_result.iterations)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lazy SMP speedup report")
+    parser.add_argument("--depth", type=int, default=7)
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=[1, 2, 4, 8, 16])
+    parser.add_argument("--tt-bits", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    position = Position.start()
+    print("cpu count: %d" % os.cpu_count())
+    searcher = Searcher(tt_bits=args.tt_bits)
+    result = searcher.search_timed(position, float("inf"), args.depth)
+    baseline = result.elapsed
+    print("  Searcher: depth %d in %6.2fs  %9d nodes  %8.0f nodes/s" % (
+        result.depth, result.elapsed, result.nodes,
+        result.nodes / result.elapsed))
+    for workers in args.workers:
+        result = parallel_search(position, workers, depth=args.depth,
+                                 tt_bits=args.tt_bits)
+        print("%2d workers: depth %d in %6.2fs  %9d nodes  %8.0f nodes/s  "
+              "speedup %.2fx" % (workers, result.depth, result.elapsed,
+                                 result.nodes, result.nodes / result.elapsed,
+                                 baseline / result.elapsed))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,370 @@
+"""Perft: count the leaf nodes of the game tree to a fixed depth.
+
+The same count from two move generators means they agree on every move in
+every position along the way, which makes perft the test to run before
+trusting a faster generator.  Each implementation counts on its own:
+
+    engine   engine.SearchState (bitboards, make/unmake)
+    rules    rules.GameState, the rules combine.py plays by
+    vector   vector_rules, a whole tree level per NumPy call
+    game     game.py's GameState: fox moves first, full 7x7 board, geese
+             move orthogonally, the fox wins below five geese
+
+engine, rules and vector implement the same rules and are cross-checked:
+any difference in a depth's total or in the divide breakdown is reported
+and the exit status is 1.  game.py plays a different game, so its counts
+are listed but not compared.  game.py starts a pygame window when
+imported, so its GameState class is lifted out of the source with ast.
+
+Positions are given as 7 rows separated by "/", top row first, then the
+side to move ("f" or "g"): F fox, G goose, "." empty, "x" off the board,
+and a digit for that many empty cells.  The combine.py start position is
+
+    xx...xx/xx...xx/7/3F3/GGGGGGG/xxGGGxx/xxGGGxx g
+
+Finished games have no moves, so they add nothing at greater depths.
+
+Usage:
+    python perft.py --depth 5
+    python perft.py --depth 4 --divide --impl engine rules
+    python perft.py --depth 3 --fen "xx...xx/xx...xx/7/3F3/3G3/xxGGGxx/xxGGGxx f"
+"""
+
+import argparse
+import ast
+import os
+import sys
+import time
+
+import rules
+from rules import BOARD_SIZE, is_valid_point
+from engine import POINTS, Position, SearchState, square, row_col
+
+START_FEN = "xx...xx/xx...xx/7/3F3/GGGGGGG/xxGGGxx/xxGGGxx g"
+IMPLEMENTATIONS = ("engine", "rules", "vector", "game")
+# Implementations of combine.py's rules, whose counts must agree.
+CROSS_CHECKED = ("engine", "rules", "vector")
+
+GAME_PY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "game.py")
+
+
+################################################################################
+# Positions
+################################################################################
+def parse_fen(fen):
+    """(fox (row, col), [goose (row, col)], fox_turn) from a position string."""
+    try:
+        board, side = fen.split()
+    except ValueError:
+        raise ValueError("expected '<rows> <side>', got %r" % fen)
+    rows = board.split("/")
+    if len(rows) != BOARD_SIZE or side not in ("f", "g"):
+        raise ValueError("bad position string %r" % fen)
+    fox = None
+    geese = []
+    for r, text in enumerate(rows):
+        c = 0
+        for char in text:
+            if char.isdigit():
+                c += int(char)
+                continue
+            if char == "F":
+                fox = (r, c)
+            elif char == "G":
+                geese.append((r, c))
+            elif char not in ".x":
+                raise ValueError("bad square %r in %r" % (char, fen))
+            c += 1
+        if c != BOARD_SIZE:
+            raise ValueError("row %d of %r has %d squares" % (r, fen, c))
+    if fox is None:
+        raise ValueError("no fox in %r" % fen)
+    return fox, geese, side == "f"
+
+
+def format_fen(fox, geese, fox_turn, plus_board=True):
+    rows = []
+    for r in range(BOARD_SIZE):
+        row = ""
+        for c in range(BOARD_SIZE):
+            if (r, c) == fox:
+                row += "F"
+            elif (r, c) in geese:
+                row += "G"
+            elif plus_board and not is_valid_point(r, c):
+                row += "x"
+            else:
+                row += "."
+        rows.append(row)
+    return "/".join(rows) + (" f" if fox_turn else " g")
+
+
+def _move_name(move):
+    (fr, fc), (tr, tc) = move
+    return "%d,%d-%d,%d" % (fr, fc, tr, tc)
+
+
+################################################################################
+# Implementations
+################################################################################
+class EnginePerft:
+    name = "engine"
+
+    def setup(self, fox, geese, fox_turn):
+        bits = 0
+        for r, c in geese:
+            bits |= 1 << square(r, c)
+        return SearchState(Position(square(*fox), bits, fox_turn))
+
+    def divide(self, state, depth):
+        counts = {}
+        if state.is_game_over():
+            return counts
+        for move in state.legal_moves():
+            state.make(move)
+            counts[(row_col(move[0]), row_col(move[1]))] = self._perft(state, depth - 1)
+            state.unmake()
+        return counts
+
+    def _perft(self, state, depth):
+        if depth == 0:
+            return 1
+        if state.is_game_over():
+            return 0
+        moves = state.legal_moves()
+        if depth == 1:
+            return len(moves)
+        nodes = 0
+        for move in moves:
+            state.make(move)
+            nodes += self._perft(state, depth - 1)
+            state.unmake()
+        return nodes
+
+
+class _BoardGamePerft:
+    """Drives a GameState through select_piece/move_piece, copying it for
+    each child since GameState cannot undo a move."""
+
+    def moves(self, state):
+        if state.game_over:
+            return []
+        pieces = [state.fox_pos] if state.fox_turn else list(state.geese_positions)
+        moves = []
+        for piece in pieces:
+            state.select_piece(*piece)
+            moves.extend((piece, (move[0], move[1])) for move in state.valid_moves)
+        state.selected_piece = None
+        state.valid_moves = []
+        return moves
+
+    def play(self, state, move):
+        child = self.copy(state)
+        child.select_piece(*move[0])
+        child.move_piece(*move[1])
+        return child
+
+    def divide(self, state, depth):
+        return {move: self._perft(self.play(state, move), depth - 1)
+                for move in self.moves(state)}
+
+    def _perft(self, state, depth):
+        if depth == 0:
+            return 1
+        moves = self.moves(state)
+        if depth == 1:
+            return len(moves)
+        return sum(self._perft(self.play(state, move), depth - 1)
+                   for move in moves)
+
+
+class RulesPerft(_BoardGamePerft):
+    name = "rules"
+
+    def __init__(self):
+        if not rules.diagonal_connections:
+            rules.initialize_diagonal_connections()
+
+    def setup(self, fox, geese, fox_turn):
+        state = rules.GameState()
+        state.board = [[0 if is_valid_point(r, c) else None
+                        for c in range(BOARD_SIZE)] for r in range(BOARD_SIZE)]
+        state.fox_pos = fox
+        state.board[fox[0]][fox[1]] = 1
+        state.geese_positions = list(geese)
+        for r, c in geese:
+            state.board[r][c] = 2
+        state.fox_turn = fox_turn
+        state.zobrist_key = rules.zobrist_key(fox, geese, fox_turn)
+        if len(geese) < 3:
+            state.game_over = True
+            state.winner = "Fox"
+        else:
+            state.check_for_game_over_on_turn()
+        return state
+
+    def copy(self, state):
+        child = rules.GameState.__new__(rules.GameState)
+        child.__dict__.update(state.__dict__)
+        child.board = [row[:] for row in state.board]
+        child.geese_positions = state.geese_positions[:]
+        # Draw rules are off here; share nothing mutable with the parent.
+        child.draw_rules = rules.DrawRules(None, None)
+        return child
+
+
+def load_game_py_state(path=GAME_PY):
+    """game.py's GameState class, without running the rest of game.py."""
+    with open(path) as f:
+        tree = ast.parse(f.read(), path)
+    keep = [node for node in tree.body
+            if (isinstance(node, ast.ClassDef) and node.name == "GameState") or
+            (isinstance(node, ast.Assign) and
+             any(getattr(target, "id", None) == "BOARD_SIZE"
+                 for target in node.targets))]
+    namespace = {}
+    exec(compile(ast.Module(body=keep, type_ignores=[]), path, "exec"), namespace)
+    return namespace["GameState"]
+
+
+class GamePyPerft(_BoardGamePerft):
+    name = "game"
+
+    def __init__(self):
+        self.state_class = load_game_py_state()
+
+    def start(self):
+        state = self.state_class()
+        return state.fox_pos, list(state.geese_positions), state.fox_turn
+
+    def setup(self, fox, geese, fox_turn):
+        state = self.state_class()
+        state.board = [[0] * BOARD_SIZE for _ in range(BOARD_SIZE)]
+        state.fox_pos = fox
+        state.board[fox[0]][fox[1]] = 1
+        state.geese_positions = list(geese)
+        for r, c in geese:
+            state.board[r][c] = 2
+        state.fox_turn = fox_turn
+        return state
+
+    def copy(self, state):
+        child = self.state_class.__new__(self.state_class)
+        child.__dict__.update(state.__dict__)
+        child.board = [row[:] for row in state.board]
+        child.geese_positions = state.geese_positions[:]
+        return child
+
+
+class VectorPerft:
+    """Expands a whole tree level at once; memory grows with the level."""
+
+    name = "vector"
+
+    def __init__(self):
+        import numpy as np
+        import vector_rules
+        self.np = np
+        self.vr = vector_rules
+
+    def setup(self, fox, geese, fox_turn):
+        return EnginePerft().setup(fox, geese, fox_turn).position()
+
+    def _expand(self, fox, geese, fox_turn):
+        """Children of every live board, and the legal mask."""
+        legal = self.vr.legal_mask(fox, geese, fox_turn)
+        legal[geese.sum(axis=1) < 3] = False
+        rows, moves = self.np.nonzero(legal)
+        fox, geese, fox_turn = fox[rows], geese[rows], fox_turn[rows]
+        self.vr.apply_moves(fox, geese, fox_turn, moves)
+        return (fox, geese, fox_turn), legal
+
+    def _perft(self, boards, depth):
+        if depth == 0:
+            return len(boards[0])
+        for _ in range(depth - 1):
+            boards, _ = self._expand(*boards)
+        legal = self.vr.legal_mask(*boards)
+        legal[boards[1].sum(axis=1) < 3] = False
+        return int(legal.sum())
+
+    def divide(self, position, depth):
+        np = self.np
+        vr = self.vr
+        boards = vr.from_positions([position])
+        children, legal = self._expand(*boards)
+        moves = np.nonzero(legal[0])[0]
+        counts = {}
+        for i, move in enumerate(moves):
+            child = tuple(array[i:i + 1] for array in children)
+            frm = row_col(POINTS[vr.MOVE_FROM[move]])
+            to = row_col(POINTS[vr.MOVE_TO[move]])
+            counts[(frm, to)] = self._perft(child, depth - 1)
+        return counts
+
+_CLASSES = {"engine": EnginePerft, "rules": RulesPerft,
+            "vector": VectorPerft, "game": GamePyPerft}
+
+
+def perft(name, depth, fen=None):
+    """(divide {move: nodes}, seconds) for one implementation.
+
+    Without `fen` each implementation starts from its own start position.
+    """
+    implementation = _CLASSES[name]()
+    if fen is not None:
+        setup = parse_fen(fen)
+    elif name == "game":
+        setup = implementation.start()
+    else:
+        setup = parse_fen(START_FEN)
+    state = implementation.setup(*setup)
+    started = time.perf_counter()
+    counts = implementation.divide(state, depth) if depth else {}
+    elapsed = time.perf_counter() - started
+    return counts, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Count and cross-check move trees")
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--fen", default=None,
+                        help="position string (default: each implementation's start)")
+    parser.add_argument("--impl", nargs="+", choices=IMPLEMENTATIONS,
+                        default=["engine", "rules", "vector", "game"])
+    parser.add_argument("--divide", action="store_true",
+                        help="print the count below every first move")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name in args.impl:
+        for depth in range(1, args.depth + 1):
+            counts, elapsed = perft(name, depth, args.fen)
+            nodes = sum(counts.values())
+            print("%-7s depth %2d: %12d nodes  %8.3fs  %12.0f nodes/s" % (
+                name, depth, nodes, elapsed, nodes / elapsed if elapsed else 0))
+        results[name] = counts
+        if args.divide:
+            for move in sorted(counts):
+                print("    %s: %d" % (_move_name(move), counts[move]))
+
+    checked = [name for name in args.impl if name in CROSS_CHECKED]
+    mismatches = 0
+    for name in checked[1:]:
+        reference = results[checked[0]]
+        counts = results[name]
+        for move in sorted(set(reference) | set(counts)):
+            if reference.get(move) != counts.get(move):
+                mismatches += 1
+                print("MISMATCH %s vs %s after %s: %s != %s" % (
+                    checked[0], name, _move_name(move), reference.get(move),
+                    counts.get(move)))
+    if len(checked) > 1:
+        print("%s: %s at depth %d" % (
+            " / ".join(checked), "MISMATCH" if mismatches else "agree",
+            args.depth))
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
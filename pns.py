@@ -0,0 +1,257 @@
+"""Depth-first proof-number search (df-pn) for forced wins.
+
+prove() answers one question about a position: can `attacker` ("Geese" by
+default) force a win from here?  OR nodes are positions with the attacker
+to move, AND nodes the defender.  Proof and disproof numbers steer the
+search into the narrowest forcing line, which is what makes deep traps
+provable where plain alpha-beta gets lost in the width of the tree.
+
+A position repeated on the current path counts as not won for the attacker,
+so DISPROVEN means "no forced win", not necessarily a forced loss.  Such a
+disproof depends on the path that led to it, so it is stored together with
+the path positions it relied on and only trusted while all of them are on
+the current path again; proofs never rely on repetitions and are stored
+plainly.  Unsolved proof and disproof numbers are capped below INFINITY, so
+INFINITY always means solved: pn == INFINITY comes with dn == 0 and the
+reverse.
+
+Usage:
+    python pns.py --plies 20 --max-nodes 200000
+"""
+
+import argparse
+import random
+import sys
+import time
+from collections import namedtuple
+
+from engine import Position, SearchState
+
+INFINITY = 10 ** 9
+
+# Path positions a value relies on; empty for path-independent values.
+NO_KEYS = frozenset()
+
+PROVEN = "proven"
+DISPROVEN = "disproven"
+UNKNOWN = "unknown"
+
+ProofResult = namedtuple("ProofResult",
+                         "status proof_size nodes entries elapsed")
+
+
+class _Limit(Exception):
+    pass
+
+
+class ProofNumberSearch:
+    """df-pn with a bounded table.
+
+    max_nodes:    node expansions before giving up with UNKNOWN
+    max_entries:  table size; beyond it, unsolved entries are dropped
+    """
+
+    def __init__(self, attacker="Geese", max_nodes=1000000,
+                 max_entries=1000000):
+        self.attacker = attacker
+        self.max_nodes = max_nodes
+        self.max_entries = max_entries
+        # key -> (proof number, disproof number), or for a disproof that
+        # relies on repetitions, (INFINITY, 0, keys of those path positions).
+        self.table = {}
+        self.nodes = 0
+        self.path = set()
+
+    def prove(self, position):
+        if not isinstance(position, Position):
+            position = Position.from_game_state(position)
+        started = time.perf_counter()
+        self.nodes = 0
+        state = SearchState(position)
+        try:
+            self._mid(state, INFINITY, INFINITY)
+        except _Limit:
+            pass
+        pn, dn = self.table.get(state.key, (1, 1))[:2]
+        if pn == 0:
+            status = PROVEN
+            proof_size = self._proof_size(SearchState(position))
+        elif dn == 0:
+            status = DISPROVEN
+            proof_size = 0
+        else:
+            status = UNKNOWN
+            proof_size = 0
+        return ProofResult(status, proof_size, self.nodes, len(self.table),
+                           time.perf_counter() - started)
+
+    def _is_or_node(self, state):
+        return state.fox_turn == (self.attacker == "Fox")
+
+    def _terminal(self, state):
+        """(pn, dn) for a finished game, or None."""
+        winner = state.winner()
+        if winner is None:
+            return None
+        if winner == self.attacker:
+            return 0, INFINITY
+        return INFINITY, 0
+
+    def _lookup(self, state):
+        """(pn, dn, keys) for a position; see NO_KEYS."""
+        key = state.key
+        if key in self.path:
+            return INFINITY, 0, frozenset((key,))
+        entry = self.table.get(key)
+        if entry is not None:
+            if len(entry) == 2:
+                return entry[0], entry[1], NO_KEYS
+            if entry[2] <= self.path:
+                return entry
+            # Relied on positions no longer on the path: search it again.
+            return 1, 1, NO_KEYS
+        terminal = self._terminal(state)
+        if terminal is not None:
+            return terminal[0], terminal[1], NO_KEYS
+        return 1, 1, NO_KEYS
+
+    def _store(self, key, pn, dn, keys=NO_KEYS):
+        if len(self.table) >= self.max_entries and key not in self.table:
+            self._collect()
+        self.table[key] = (pn, dn, keys) if keys else (pn, dn)
+
+    def _collect(self):
+        """Free table space, keeping solved positions as long as possible."""
+        solved = {key: value for key, value in self.table.items()
+                  if value[0] == 0 or value[1] == 0}
+        if len(solved) >= self.max_entries // 2:
+            solved = dict(list(solved.items())[-(self.max_entries // 2):])
+        self.table = solved
+
+    def _mid(self, state, th_pn, th_dn):
+        self.nodes += 1
+        if self.nodes > self.max_nodes:
+            raise _Limit()
+        terminal = self._terminal(state)
+        if terminal is not None:
+            self._store(state.key, *terminal)
+            return
+
+        or_node = self._is_or_node(state)
+        moves = state.legal_moves()
+        self.path.add(state.key)
+        try:
+            while True:
+                children = []
+                for move in moves:
+                    state.make(move)
+                    children.append(self._lookup(state))
+                    state.unmake()
+                # Sums are capped at INFINITY - 1: transpositions can add up
+                # to huge numbers without anything being solved.
+                if or_node:
+                    pn = min(c[0] for c in children)
+                    if pn == 0:
+                        dn = INFINITY
+                    else:
+                        dn = min(INFINITY - 1, sum(c[1] for c in children))
+                else:
+                    dn = min(c[1] for c in children)
+                    if dn == 0:
+                        pn = INFINITY
+                    else:
+                        pn = min(INFINITY - 1, sum(c[0] for c in children))
+                if pn >= th_pn or dn >= th_dn:
+                    break
+                # The child that decides this node's number, and the runner-up
+                # that bounds how long we may stay in it.  The bound is half
+                # as large again as the runner-up: with the +1 bound alone,
+                # siblings whose numbers grow in lockstep through cycles were
+                # re-entered in turn, each for a single expansion.
+                index = 0 if or_node else 1
+                order = sorted(range(len(children)),
+                               key=lambda i: children[i][index])
+                best = order[0]
+                second = children[order[1]][index] if len(order) > 1 else INFINITY
+                child_pn, child_dn = children[best][:2]
+                if or_node:
+                    child_th_pn = min(th_pn, second + 1 + second // 2)
+                    child_th_dn = th_dn - dn + child_dn
+                else:
+                    child_th_pn = th_pn - pn + child_pn
+                    child_th_dn = min(th_dn, second + 1 + second // 2)
+                state.make(moves[best])
+                self._mid(state, child_th_pn, child_th_dn)
+                state.unmake()
+        finally:
+            self.path.discard(state.key)
+        keys = NO_KEYS
+        if dn == 0:
+            if or_node:
+                # Every move is refuted; the disproof needs all of them.
+                keys = NO_KEYS.union(*(c[2] for c in children))
+            else:
+                # One refuting move is enough; prefer the least path-bound.
+                keys = min((c[2] for c in children if c[1] == 0), key=len)
+            # A repetition of this very position holds on any path to it.
+            keys = keys - {state.key}
+        self._store(state.key, pn, dn, keys)
+
+    def _proof_size(self, state):
+        """Nodes in the proof tree: one winning reply at OR nodes, every
+        reply at AND nodes."""
+        seen = set()
+        stack = [state.position()]
+        while stack:
+            position = stack.pop()
+            key = position.key()
+            if key in seen:
+                continue
+            seen.add(key)
+            if position.winner() is not None:
+                continue
+            children = [position.play(move) for move in position.legal_moves()]
+            if position.fox_turn == (self.attacker == "Fox"):
+                for child in children:
+                    if self.table.get(child.key(), (1, 1))[0] == 0 or (
+                            child.winner() == self.attacker):
+                        stack.append(child)
+                        break
+            else:
+                stack.extend(children)
+        return len(seen)
+
+
+def prove(game_state, attacker="Geese", max_nodes=1000000, max_entries=1000000):
+    """Convenience wrapper: df-pn on a GameState or engine Position."""
+    search = ProofNumberSearch(attacker, max_nodes, max_entries)
+    return search.prove(game_state)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prove forced wins with df-pn")
+    parser.add_argument("--attacker", choices=["Geese", "Fox"], default="Geese")
+    parser.add_argument("--plies", type=int, default=0,
+                        help="random plies to play from the start first")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-nodes", type=int, default=1000000)
+    parser.add_argument("--max-entries", type=int, default=1000000)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    state = SearchState()
+    for _ in range(args.plies):
+        if state.is_game_over():
+            break
+        state.make(rng.choice(state.legal_moves()))
+    result = prove(state.position(), args.attacker, args.max_nodes,
+                   args.max_entries)
+    print("%s win for %s: %s  (proof tree %d nodes, %d searched, "
+          "%d table entries, %.2fs)" % (
+              state.position(), args.attacker, result.status,
+              result.proof_size, result.nodes, result.entries, result.elapsed))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,228 @@
+"""Tabular Q-learning over a perfectly indexed value table.
+
+Every position with a given number of geese has a dense index, the one
+tablebase.position_index uses: fox point x colex rank of the goose set x
+side to move (see engine.rank_geese).  ValueTable keeps one array per goose count, indexed
+directly, so a lookup is arithmetic and one array read: no hashing and no
+per-position Python objects.  Values are float16 by default (2 bytes per
+position) and hold the expected result for the fox: +1 fox wins, -1 geese
+win.
+
+Moves are deterministic, so Q(s, a) is the value of the position a leads
+to, and one value per position is all the table needs.  QLearner plays many
+games at once on a BatchEnv and moves every visited position towards the
+best value among its successors (the Q-learning target: the fox takes the
+maximum, the geese the minimum), whichever move the epsilon-greedy policy
+then plays.  Finished successors score their real result.
+
+A full 13-goose layer has 33 * C(32, 13) * 2 (about 23 billion) positions,
+so train the full game with a directory: layers are then memory-mapped .npy
+files, which the OS keeps sparse until positions are actually written.
+
+Usage:
+    python qlearning.py --out qtable --envs 1024 --steps 10000
+"""
+
+import argparse
+import mmap
+import os
+import sys
+import time
+
+import numpy as np
+
+from engine import BINOMIAL
+from batch_env import BatchEnv
+from tablebase import MIN_GEESE, layer_size, position_index
+import vector_rules
+from vector_rules import NUM_POINTS, ACTION_OF_MOVE
+
+_BINOMIAL = np.array(BINOMIAL, dtype=np.int64)
+_POINTS = np.arange(NUM_POINTS)
+
+
+def batch_indices(fox, geese, fox_turn):
+    """(goose counts, layer indices) for vector_rules arrays, all at once."""
+    counts = geese.sum(axis=1)
+    # Points after the fox's shift down one, as in engine.rank_geese.
+    adjusted = _POINTS[None, :] - (_POINTS[None, :] > fox[:, None])
+    order = np.cumsum(geese, axis=1)
+    rank = np.where(geese, _BINOMIAL[adjusted, order], 0).sum(axis=1)
+    index = fox * _BINOMIAL[NUM_POINTS - 1, counts] + rank
+    return counts, index * 2 + fox_turn
+
+
+class ValueTable:
+    """One dense value array per goose count.
+
+    directory:  if given, layers are memory-mapped files there (created on
+                first use, reopened on the next run); otherwise they are
+                in-memory arrays, which only suits small layers
+    """
+
+    def __init__(self, directory=None, dtype=np.float16):
+        self.directory = directory
+        self.dtype = np.dtype(dtype)
+        self.layers = {}
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def layer_path(self, count):
+        return os.path.join(self.directory, "values_%02d.npy" % count)
+
+    def layer(self, count):
+        array = self.layers.get(count)
+        if array is None:
+            shape = (layer_size(count),)
+            if self.directory is None:
+                array = np.zeros(shape, dtype=self.dtype)
+            else:
+                path = self.layer_path(count)
+                mode = "r+" if os.path.exists(path) else "w+"
+                array = np.lib.format.open_memmap(path, mode=mode,
+                                                  dtype=self.dtype, shape=shape)
+                # Lookups are scattered; read-ahead would only fetch
+                # neighbours that are never used.
+                array._mmap.madvise(mmap.MADV_RANDOM)
+            self.layers[count] = array
+        return array
+
+    def value(self, position):
+        if position.geese.bit_count() < MIN_GEESE:
+            return 1.0
+        layer = self.layer(position.geese.bit_count())
+        return float(layer[position_index(position.fox, position.geese,
+                                          position.fox_turn)])
+
+    def lookup(self, counts, indices):
+        """Values for arrays of (goose count, index)."""
+        values = np.empty(len(indices), dtype=np.float32)
+        for count in np.unique(counts):
+            rows = counts == count
+            values[rows] = self.layer(int(count))[indices[rows]]
+        return values
+
+    def update(self, counts, indices, targets, alpha):
+        """Move every entry `alpha` of the way to its target.
+
+        Entries listed twice get both updates, each measured from the old
+        value.
+        """
+        for count in np.unique(counts):
+            rows = counts == count
+            layer = self.layer(int(count))
+            unique, inverse = np.unique(indices[rows], return_inverse=True)
+            old = layer[unique].astype(np.float32)
+            summed = np.zeros(len(unique), dtype=np.float32)
+            np.add.at(summed, inverse, alpha * (targets[rows] - old[inverse]))
+            layer[unique] = old + summed
+
+    def flush(self):
+        for array in self.layers.values():
+            if isinstance(array, np.memmap):
+                array.flush()
+
+
+class QLearner:
+    """Epsilon-greedy Q-learning over `num_envs` simultaneous games."""
+
+    def __init__(self, table, num_envs=1024, alpha=0.1, epsilon=0.1,
+                 max_plies=200, seed=None):
+        self.table = table
+        self.alpha = alpha
+        self.epsilon = epsilon
+        self.env = BatchEnv(num_envs, max_plies, seed)
+        self.rng = self.env.rng
+        self.env.reset()
+        self.updates = 0
+        self.games = 0
+        self.last_error = 0.0
+
+    def _successor_values(self, rows, moves):
+        """Fox-side values of the positions `moves` lead to on `rows`."""
+        env = self.env
+        fox = env.fox[rows]
+        geese = env.geese[rows]
+        fox_turn = env.fox_turn[rows]
+        mover_is_fox = fox_turn.copy()
+        vector_rules.apply_moves(fox, geese, fox_turn, moves)
+        values = np.zeros(len(rows), dtype=np.float32)
+        _, has_move = vector_rules.action_mask(fox, geese, fox_turn)
+        few_geese = geese.sum(axis=1) < MIN_GEESE
+        won = few_geese | ~has_move
+        values[won] = np.where(mover_is_fox[won], 1.0, -1.0)
+        live = ~won
+        if live.any():
+            counts, indices = batch_indices(fox[live], geese[live],
+                                            fox_turn[live])
+            values[live] = self.table.lookup(counts, indices)
+        return values
+
+    def step(self):
+        """One Q-learning update and one move in every game."""
+        env = self.env
+        legal = vector_rules.legal_mask(env.fox, env.geese, env.fox_turn)
+        rows, moves = np.nonzero(legal)
+        values = self._successor_values(rows, moves)
+        # Score from the mover's side so every row maximizes.
+        sign = np.where(env.fox_turn, 1.0, -1.0).astype(np.float32)
+        scores = values * sign[rows]
+        starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+        best = np.maximum.reduceat(scores, starts)
+
+        counts, indices = batch_indices(env.fox, env.geese, env.fox_turn)
+        targets = best * sign
+        current = self.table.lookup(counts, indices)
+        self.table.update(counts, indices, targets, self.alpha)
+        self.last_error = float(np.abs(targets - current).mean())
+        self.updates += len(indices)
+
+        # Greedy rows pick a random best move, exploring rows any move.
+        # Every game has a move (BatchEnv restarts finished ones), so
+        # `starts` holds one segment per game in env order.
+        explore = self.rng.random(env.num_envs) < self.epsilon
+        keys = self.rng.random(len(rows))
+        keys += (~explore[rows] & (scores >= best[rows])) * 2.0
+        order = np.lexsort((keys, rows))
+        chosen = order[np.r_[starts[1:], len(rows)] - 1]
+        actions = ACTION_OF_MOVE[moves[chosen]]
+        _, _, dones, _, _ = env.step(actions)
+        self.games += int(dones.sum())
+
+    def train(self, steps, report_every=0):
+        for step in range(1, steps + 1):
+            self.step()
+            if report_every and step % report_every == 0:
+                print("step %d: %d updates, %d games, mean |TD error| %.4f" % (
+                    step, self.updates, self.games, self.last_error))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tabular Q-learning")
+    parser.add_argument("--out", default=None,
+                        help="directory for memory-mapped value layers")
+    parser.add_argument("--envs", type=int, default=1024)
+    parser.add_argument("--steps", type=int, default=1000)
+    parser.add_argument("--alpha", type=float, default=0.1)
+    parser.add_argument("--epsilon", type=float, default=0.1)
+    parser.add_argument("--max-plies", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.out is None:
+        parser.error("--out is required: the 13-goose layer is too large "
+                     "to keep in memory")
+    table = ValueTable(args.out)
+    learner = QLearner(table, args.envs, args.alpha, args.epsilon,
+                       args.max_plies, args.seed)
+    started = time.perf_counter()
+    learner.train(args.steps, report_every=max(1, args.steps // 10))
+    table.flush()
+    elapsed = time.perf_counter() - started
+    print("%d updates in %.1fs (%.0f updates/s)" % (
+        learner.updates, elapsed, learner.updates / elapsed))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,340 @@
+"""Fox and Geese rules for the plus-shaped board, without any pygame code.
+
+combine.py draws the game on top of these definitions; tools that only need
+the rules (engines, benchmarks, training code) import this module directly.
+"""
+
+import random
+
+BOARD_SIZE = 7  # 7x7 grid underlying the plus-shaped board
+
+##########################################################################
+# Board definition: A cell is valid if its row or column is in [2, 3, 4].
+##########################################################################
+def is_valid_point(row, col):
+    return (row in [2, 3, 4]) or (col in [2, 3, 4])
+
+# Dictionary to store valid diagonal connections.
+diagonal_connections = {}
+
+def initialize_diagonal_connections():
+    """Create a mapping of all valid diagonal connections on the board."""
+    global diagonal_connections
+    diagonal_connections.clear()
+    for r in range(BOARD_SIZE - 1):
+        for c in range(BOARD_SIZE - 1):
+            if (is_valid_point(r, c) and is_valid_point(r, c+1) and
+                is_valid_point(r+1, c) and is_valid_point(r+1, c+1)):
+                tl = (r, c)       # top-left
+                tr = (r, c+1)     # top-right
+                bl = (r+1, c)     # bottom-left
+                br = (r+1, c+1)   # bottom-right
+                if (r + c) % 2 == 0:  # Diagonal from top-left to bottom-right
+                    diagonal_connections[(tl, br)] = True
+                    diagonal_connections[(br, tl)] = True
+                else:  # Diagonal from top-right to bottom-left
+                    diagonal_connections[(tr, bl)] = True
+                    diagonal_connections[(bl, tr)] = True
+
+def has_diagonal_connection(row, col, dr, dc):
+    """Check for an actual diagonal connection from (row, col) in direction (dr, dc)."""
+    target_row, target_col = row + dr, col + dc
+    return ((row, col), (target_row, target_col)) in diagonal_connections
+
+################################################################################
+# Zobrist keys: one random 64-bit number per (piece, point) and one for the
+# side to move.  XOR-ing them together identifies a position.  The seed is
+# fixed so keys are stable across processes and saved files.
+################################################################################
+_zobrist_rng = random.Random(0x0F0C5)
+ZOBRIST_FOX = [[_zobrist_rng.getrandbits(64) for _ in range(BOARD_SIZE)]
+               for _ in range(BOARD_SIZE)]
+ZOBRIST_GOOSE = [[_zobrist_rng.getrandbits(64) for _ in range(BOARD_SIZE)]
+                 for _ in range(BOARD_SIZE)]
+ZOBRIST_FOX_TURN = _zobrist_rng.getrandbits(64)
+
+def zobrist_key(fox_pos, geese_positions, fox_turn):
+    """Compute the Zobrist key of a position from scratch."""
+    key = ZOBRIST_FOX[fox_pos[0]][fox_pos[1]]
+    for r, c in geese_positions:
+        key ^= ZOBRIST_GOOSE[r][c]
+    if fox_turn:
+        key ^= ZOBRIST_FOX_TURN
+    return key
+
+################################################################################
+# Game state
+################################################################################
+DRAW = "Draw"  # GameState.winner when a draw rule ends the game
+
+# Draw rules for automated play (self-play, environments, matches, tools).
+REPETITION_LIMIT = 3
+PLY_LIMIT = 300
+
+class DrawRules:
+    """Repetition and move-limit draws, tracked from Zobrist keys.
+
+    GameState and the engine-based pipelines (selfplay.py, env.py,
+    batch_env.py, arena.py, bench.py) all use this class, so they agree on
+    when a game is drawn.  Either limit may be None to turn it off.
+
+    repetition_limit:  draw when the same position (pieces and side to move)
+                       occurs this many times
+    ply_limit:         draw after this many moves in total
+    """
+
+    def __init__(self, repetition_limit=REPETITION_LIMIT, ply_limit=PLY_LIMIT):
+        self.repetition_limit = repetition_limit
+        self.ply_limit = ply_limit
+        self.reset(None)
+
+    def reset(self, key):
+        """Start a new game whose first position has `key`."""
+        self.ply = 0
+        # Keys since the last capture: earlier positions had more geese
+        # and cannot come back.
+        self.counts = {} if key is None else {key: 1}
+
+    def record(self, key, irreversible):
+        """Count the position a move reached; returns a draw reason or None.
+
+        `irreversible` is true for captures.  The caller ignores the reason
+        if the move also ended the game.
+        """
+        self.ply += 1
+        if irreversible:
+            self.counts.clear()
+        count = self.counts.get(key, 0) + 1
+        self.counts[key] = count
+        if self.repetition_limit is not None and count >= self.repetition_limit:
+            return "repetition"
+        if self.ply_limit is not None and self.ply >= self.ply_limit:
+            return "move limit"
+        return None
+
+    def repetitions(self, key):
+        """How many times the position with `key` has occurred."""
+        return self.counts.get(key, 0)
+
+class GameState:
+    """One game on the plus-shaped board.
+
+    The draw rules (see DrawRules) are off by default, as in the original
+    game; automated play turns them on so every game ends.
+    """
+
+    def __init__(self, repetition_limit=None, ply_limit=None):
+        # Create board: valid cells get 0; invalid cells are None.
+        self.board = []
+        for row in range(BOARD_SIZE):
+            row_list = []
+            for col in range(BOARD_SIZE):
+                row_list.append(0 if is_valid_point(row, col) else None)
+            self.board.append(row_list)
+        
+        # Place fox at center (3,3)
+        self.fox_pos = (3, 3)
+        self.board[3][3] = 1
+
+        # Place geese:
+        self.geese_positions = []
+        for col in range(7):
+            self.board[4][col] = 2
+            self.geese_positions.append((4, col))
+        for col in [2, 3, 4]:
+            self.board[5][col] = 2
+            self.geese_positions.append((5, col))
+        for col in [2, 3, 4]:
+            self.board[6][col] = 2
+            self.geese_positions.append((6, col))
+        
+        # Geese move first.
+        self.fox_turn = False
+        self.selected_piece = None
+        self.valid_moves = []
+        self.game_over = False
+        self.winner = None
+        self.zobrist_key = zobrist_key(self.fox_pos, self.geese_positions,
+                                       self.fox_turn)
+
+        self.draw_rules = DrawRules(repetition_limit, ply_limit)
+        self.draw_rules.reset(self.zobrist_key)
+        self.draw_reason = None
+
+    def select_piece(self, row, col):
+        if self.game_over or not is_valid_point(row, col):
+            return False
+        # Geese turn: select a goose.
+        if not self.fox_turn and self.board[row][col] == 2:
+            self.selected_piece = (row, col)
+            self.calculate_valid_moves()
+            return True
+        # Fox turn: select the fox.
+        if self.fox_turn and self.board[row][col] == 1:
+            self.selected_piece = (row, col)
+            self.calculate_valid_moves()
+            return True
+        return False
+
+    def calculate_valid_moves(self):
+        self.valid_moves = []
+        if not self.selected_piece:
+            return
+        row, col = self.selected_piece
+        piece_type = self.board[row][col]
+        
+        if piece_type == 1:  # Fox moves: all 8 directions.
+            directions = [(-1, 0), (1, 0), (0, -1), (0, 1),
+                          (-1, -1), (-1, 1), (1, -1), (1, 1)]
+            for dr, dc in directions:
+                new_r, new_c = row + dr, col + dc
+                if dr != 0 and dc != 0:
+                    if not has_diagonal_connection(row, col, dr, dc):
+                        continue
+                if 0 <= new_r < BOARD_SIZE and 0 <= new_c < BOARD_SIZE and is_valid_point(new_r, new_c):
+                    if self.board[new_r][new_c] == 0:
+                        self.valid_moves.append((new_r, new_c, None))
+                    elif self.board[new_r][new_c] == 2:
+                        jump_r, jump_c = new_r + dr, new_c + dc
+                        if (0 <= jump_r < BOARD_SIZE and 0 <= jump_c < BOARD_SIZE and 
+                            is_valid_point(jump_r, jump_c) and self.board[jump_r][jump_c] == 0):
+                            if dr != 0 and dc != 0:
+                                if not (has_diagonal_connection(row, col, dr, dc) and 
+                                        has_diagonal_connection(new_r, new_c, dr, dc)):
+                                    continue
+                            self.valid_moves.append((jump_r, jump_c, (new_r, new_c)))
+        elif piece_type == 2:  # Geese moves: forward and diagonally upward.
+            directions = [(-1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1)]
+            for dr, dc in directions:
+                new_r, new_c = row + dr, col + dc
+                if dr != 0 and dc != 0:
+                    if not has_diagonal_connection(row, col, dr, dc):
+                        continue
+                if 0 <= new_r < BOARD_SIZE and 0 <= new_c < BOARD_SIZE:
+                    if is_valid_point(new_r, new_c) and self.board[new_r][new_c] == 0:
+                        self.valid_moves.append((new_r, new_c, None))
+    
+    def move_piece(self, row, col):
+        if (not self.selected_piece or 
+            (row, col) not in [(m[0], m[1]) for m in self.valid_moves]):
+            return False
+        old_r, old_c = self.selected_piece
+        piece_type = self.board[old_r][old_c]
+        capture_pos = None
+        for mv in self.valid_moves:
+            if (mv[0], mv[1]) == (row, col):
+                capture_pos = mv[2]
+                break
+        
+        self.board[old_r][old_c] = 0
+        self.board[row][col] = piece_type
+        
+        if piece_type == 1:
+            self.fox_pos = (row, col)
+            self.zobrist_key ^= ZOBRIST_FOX[old_r][old_c] ^ ZOBRIST_FOX[row][col]
+            if capture_pos:
+                cap_r, cap_c = capture_pos
+                self.board[cap_r][cap_c] = 0
+                self.zobrist_key ^= ZOBRIST_GOOSE[cap_r][cap_c]
+                if (cap_r, cap_c) in self.geese_positions:
+                    self.geese_positions.remove((cap_r, cap_c))
+                if len(self.geese_positions) < 3:
+                    self.game_over = True
+                    self.winner = "Fox"
+        else:
+            if (old_r, old_c) in self.geese_positions:
+                self.geese_positions.remove((old_r, old_c))
+            self.geese_positions.append((row, col))
+            self.zobrist_key ^= ZOBRIST_GOOSE[old_r][old_c] ^ ZOBRIST_GOOSE[row][col]
+            self.check_if_fox_trapped()
+        
+        self.selected_piece = None
+        self.valid_moves = []
+        # Switch turn.
+        self.fox_turn = not self.fox_turn
+        self.zobrist_key ^= ZOBRIST_FOX_TURN
+        draw_reason = self.draw_rules.record(self.zobrist_key,
+                                             capture_pos is not None)
+        # Check if the new active player has any legal moves.
+        self.check_for_game_over_on_turn()
+        if draw_reason is not None and not self.game_over:
+            self.draw_reason = draw_reason
+            self.game_over = True
+            self.winner = DRAW
+        return True
+
+    @property
+    def ply(self):
+        return self.draw_rules.ply
+
+    def repetitions(self):
+        """How many times the current position has occurred."""
+        return self.draw_rules.repetitions(self.zobrist_key)
+
+    def check_if_fox_trapped(self):
+        # Existing check after a goose move.
+        row, col = self.fox_pos
+        directions = [(-1, 0), (1, 0), (0, -1), (0, 1),
+                      (-1, -1), (-1, 1), (1, -1), (1, 1)]
+        for dr, dc in directions:
+            nr, nc = row + dr, col + dc
+            if 0 <= nr < BOARD_SIZE and 0 <= nc < BOARD_SIZE and is_valid_point(nr, nc):
+                if self.board[nr][nc] == 0:
+                    return False
+                if self.board[nr][nc] == 2:
+                    jr, jc = nr + dr, nc + dc
+                    if (0 <= jr < BOARD_SIZE and 0 <= jc < BOARD_SIZE and 
+                        is_valid_point(jr, jc) and self.board[jr][jc] == 0):
+                        return False
+        self.game_over = True
+        self.winner = "Geese"
+        return True
+
+    def check_for_game_over_on_turn(self):
+        """Check if the current player (fox or geese) has any valid moves.
+           If not, end the game accordingly."""
+        if self.fox_turn:
+            fox_r, fox_c = self.fox_pos
+            moves = []
+            directions = [(-1, 0), (1, 0), (0, -1), (0, 1),
+                          (-1, -1), (-1, 1), (1, -1), (1, 1)]
+            for dr, dc in directions:
+                new_r, new_c = fox_r + dr, fox_c + dc
+                if dr != 0 and dc != 0:
+                    if not has_diagonal_connection(fox_r, fox_c, dr, dc):
+                        continue
+                if (0 <= new_r < BOARD_SIZE and 0 <= new_c < BOARD_SIZE and 
+                    is_valid_point(new_r, new_c)):
+                    if self.board[new_r][new_c] == 0:
+                        moves.append((new_r, new_c))
+                    elif self.board[new_r][new_c] == 2:
+                        jump_r, jump_c = new_r + dr, new_c + dc
+                        if (0 <= jump_r < BOARD_SIZE and 0 <= jump_c < BOARD_SIZE and 
+                            is_valid_point(jump_r, jump_c) and self.board[jump_r][jump_c] == 0):
+                            if dr != 0 and dc != 0:
+                                if not (has_diagonal_connection(fox_r, fox_c, dr, dc) and 
+                                        has_diagonal_connection(new_r, new_c, dr, dc)):
+                                    continue
+                            moves.append((jump_r, jump_c))
+            if not moves:
+                self.game_over = True
+                self.winner = "Geese"
+        else:
+            # Check if at least one goose can move.
+            possible = False
+            for (r, c) in self.geese_positions:
+                directions = [(-1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1)]
+                for dr, dc in directions:
+                    new_r, new_c = r + dr, c + dc
+                    if dr != 0 and dc != 0:
+                        if not has_diagonal_connection(r, c, dr, dc):
+                            continue
+                    if (0 <= new_r < BOARD_SIZE and 0 <= new_c < BOARD_SIZE and 
+                        is_valid_point(new_r, new_c) and self.board[new_r][new_c] == 0):
+                        possible = True
+                        break
+                if possible:
+                    break
+            if not possible:
+                self.game_over = True
+                self.winner = "Fox"
@@ -0,0 +1,346 @@
+"""Alpha-beta search for Fox and Geese on top of engine.SearchState.
+
+Scores are negamax style: always from the point of view of the side to move.
+A search can be stopped from another thread through its stop event; the
+searcher then unwinds with SearchAborted and the caller decides what to do
+with the partial result.
+
+Run this module directly to compare move ordering on and off:
+    python search.py --depth 6 --positions 20
+"""
+
+import argparse
+import sys
+import threading
+import time
+from collections import namedtuple
+
+from engine import SearchState, encode_move, decode_move, row_col
+from ttable import TranspositionTable, EXACT, LOWER_BOUND, UPPER_BOUND, NO_MOVE
+
+MATE = 100000
+MATE_THRESHOLD = MATE - 1000
+
+# How often (in nodes) the stop event and clock are checked.
+CHECK_INTERVAL = 1024
+
+# iterations: (depth, nodes, seconds) per completed iterative-deepening pass.
+SearchResult = namedtuple("SearchResult",
+                          "move score depth nodes elapsed iterations",
+                          defaults=((),))
+
+
+class SearchAborted(Exception):
+    pass
+
+
+def evaluate(state):
+    """Static score for the side to move.
+
+    Geese want many geese left, a fox with few moves and a flock that has
+    advanced up the board; the fox wants the opposite.
+    """
+    geese = state.geese
+    score = 100 * geese.bit_count() - 12 * state.fox_mobility
+    # Row of each goose: the flock starts on rows 4-6 and traps the fox by
+    # moving up, so reward progress a little.
+    advance = 0
+    row_bits = geese
+    row = 0
+    while row_bits:
+        advance += (row_bits & 0x7F).bit_count() * (6 - row)
+        row_bits >>= 7
+        row += 1
+    score += 2 * advance
+    return -score if state.fox_turn else score
+
+
+def _score_to_tt(score, ply):
+    """Store mate scores relative to the node, not the root."""
+    if score > MATE_THRESHOLD:
+        return score + ply
+    if score < -MATE_THRESHOLD:
+        return score - ply
+    return score
+
+
+def _score_from_tt(score, ply):
+    if score > MATE_THRESHOLD:
+        return score - ply
+    if score < -MATE_THRESHOLD:
+        return score + ply
+    return score
+
+
+# Move ordering scores; quiet moves fall back to their history score.
+CAPTURE_ORDER = 1 << 30
+KILLER_ORDER = (1 << 29, 1 << 28)
+MAX_PLY = 128
+
+
+class Searcher:
+    """Alpha-beta searcher.
+
+    With `ordering` on (the default), moves are tried TT move first, then
+    captures, then the two killer moves of the ply, then quiet moves by
+    history score.  With it off only the TT move is moved to the front.
+
+    `stats`, a search_stats.SearchStats, counts nodes, cutoffs, table hits
+    and branching for the searches its mode selects.
+    """
+
+    def __init__(self, tt_bits=18, stop_event=None, ordering=True, tt=None,
+                 stats=None):
+        self.tt = tt if tt is not None else TranspositionTable(tt_bits)
+        self.stop_event = stop_event if stop_event is not None else threading.Event()
+        self.ordering = ordering
+        self.nodes = 0
+        self.deadline = None
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+        # Indexed by [fox_turn][from * 64 + to].
+        self.history = [[0] * 4096, [0] * 4096]
+        # A search_stats.SearchStats, and the MoveStats of the search in
+        # progress when it is being counted.
+        self.stats = stats
+        self.counters = None
+
+    def stop(self):
+        self.stop_event.set()
+
+    def search(self, position, depth):
+        """Fixed-depth alpha-beta from `position`; returns a SearchResult."""
+        state = SearchState(position)
+        self.nodes = 0
+        self.deadline = None
+        self._begin_stats()
+        started = time.perf_counter()
+        score, move = self._root(state, depth, None)
+        result = SearchResult(move, score, depth, self.nodes,
+                              time.perf_counter() - started)
+        self._finish_stats(result)
+        return result
+
+    def search_timed(self, position, time_limit, max_depth=64):
+        """Iterative deepening until `time_limit` seconds have passed.
+
+        The move from the last completed iteration is returned, so a move is
+        always ready even if the first iteration is cut short.  Setting the
+        stop event still raises SearchAborted.
+        """
+        state = SearchState(position)
+        self.nodes = 0
+        self._begin_stats()
+        started = time.perf_counter()
+        self.deadline = started + time_limit
+        moves = state.legal_moves()
+        best_move = moves[0] if moves else None
+        best_score = 0
+        completed = 0
+        iterations = []
+        for depth in range(1, max_depth + 1):
+            nodes_before = self.nodes
+            iteration_started = time.perf_counter()
+            try:
+                score, move = self._root(state, depth, best_move)
+            except SearchAborted:
+                if self.stop_event.is_set():
+                    raise
+                break
+            best_score, best_move, completed = score, move, depth
+            iterations.append((depth, self.nodes - nodes_before,
+                               time.perf_counter() - iteration_started))
+            # A forced result will not change with more depth.
+            if abs(score) > MATE_THRESHOLD or time.perf_counter() >= self.deadline:
+                break
+        self.deadline = None
+        result = SearchResult(best_move, best_score, completed, self.nodes,
+                              time.perf_counter() - started, tuple(iterations))
+        self._finish_stats(result)
+        return result
+
+    def _begin_stats(self):
+        self.counters = None
+        if self.stats is not None:
+            self.counters = self.stats.begin(MAX_PLY)
+        if self.counters is not None:
+            self.counters.tt_probes = self.tt.probes
+            self.counters.tt_hits = self.tt.hits
+
+    def _finish_stats(self, result):
+        if self.counters is not None:
+            self.stats.finish(self.counters, result, self.tt)
+            self.counters = None
+
+    def _check_abort(self):
+        if self.stop_event.is_set():
+            raise SearchAborted()
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            raise SearchAborted()
+
+    def _root(self, state, depth, previous_best):
+        entry = self.tt.probe(state.key)
+        moves = self._ordered_moves(state, entry, 0)
+        if previous_best in moves:
+            moves.remove(previous_best)
+            moves.insert(0, previous_best)
+        counters = self.counters
+        if counters is not None:
+            counters.expanded[0] += 1
+            counters.children[0] += len(moves)
+        best_move = moves[0] if moves else None
+        alpha, beta = -MATE - 1, MATE + 1
+        for move in moves:
+            state.make(move)
+            score = -self._negamax(state, depth - 1, -beta, -alpha, 1)
+            state.unmake()
+            if score > alpha:
+                alpha = score
+                best_move = move
+        if best_move is not None:
+            self.tt.store(state.key, depth, alpha, EXACT, encode_move(best_move))
+        return alpha, best_move
+
+    def _ordered_moves(self, state, entry, ply):
+        moves = state.legal_moves()
+        tt_move = None
+        if entry is not None and entry[3] != NO_MOVE:
+            tt_move = decode_move(entry[3])
+        if self.ordering and len(moves) > 1:
+            killers = self.killers[ply]
+            history = self.history[state.fox_turn]
+
+            def order(move):
+                if move[2] is not None:
+                    return CAPTURE_ORDER
+                if move == killers[0]:
+                    return KILLER_ORDER[0]
+                if move == killers[1]:
+                    return KILLER_ORDER[1]
+                return history[move[0] * 64 + move[1]]
+
+            moves.sort(key=order, reverse=True)
+        if tt_move is not None and tt_move in moves:
+            moves.remove(tt_move)
+            moves.insert(0, tt_move)
+        return moves
+
+    def _record_cutoff(self, state, move, depth, ply):
+        """Remember a quiet move that caused a beta cutoff."""
+        if move[2] is not None:
+            return
+        killers = self.killers[ply]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+        self.history[state.fox_turn][move[0] * 64 + move[1]] += depth * depth
+
+    def _negamax(self, state, depth, alpha, beta, ply):
+        self.nodes += 1
+        if self.nodes % CHECK_INTERVAL == 0:
+            self._check_abort()
+        counters = self.counters
+        if counters is not None:
+            counters.nodes += 1
+
+        winner = state.winner()
+        if winner is not None:
+            # The side to move has lost (or the fox already took enough).
+            won = (winner == "Fox") == state.fox_turn
+            return MATE - ply if won else -(MATE - ply)
+        if depth <= 0 or ply >= MAX_PLY - 1:
+            if counters is not None:
+                counters.leaf_nodes += 1
+            return evaluate(state)
+
+        original_alpha = alpha
+        entry = self.tt.probe(state.key)
+        if entry is not None and entry[0] >= depth:
+            score = _score_from_tt(entry[1], ply)
+            flag = entry[2]
+            if flag == EXACT:
+                return score
+            if flag == LOWER_BOUND and score >= beta:
+                return score
+            if flag == UPPER_BOUND and score <= alpha:
+                return score
+
+        best_score = -MATE - 1
+        best_move = None
+        moves = self._ordered_moves(state, entry, ply)
+        if counters is not None:
+            counters.expanded[ply] += 1
+            counters.children[ply] += len(moves)
+        for move in moves:
+            state.make(move)
+            score = -self._negamax(state, depth - 1, -beta, -alpha, ply + 1)
+            state.unmake()
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        if counters is not None:
+                            counters.beta_cutoffs += 1
+                            if move is moves[0]:
+                                counters.first_move_cutoffs += 1
+                        if self.ordering:
+                            self._record_cutoff(state, move, depth, ply)
+                        break
+
+        if best_score <= original_alpha:
+            flag = UPPER_BOUND
+        elif best_score >= beta:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        self.tt.store(state.key, depth, _score_to_tt(best_score, ply), flag,
+                      encode_move(best_move))
+        return best_score
+
+
+def effective_branching_factor(iterations):
+    """Geometric mean growth in nodes from one iteration to the next."""
+    counts = [nodes for _, nodes, _ in iterations if nodes]
+    if len(counts) < 2:
+        return 0.0
+    return (counts[-1] / counts[0]) ** (1.0 / (len(counts) - 1))
+
+
+def move_to_board(move):
+    """((from_row, from_col), (to_row, to_col)) for GameState.select/move_piece."""
+    frm, to, _ = move
+    return row_col(frm), row_col(to)
+
+
+def main(argv=None):
+    # Imported here: ai imports this module.
+    from ai import sample_positions
+
+    parser = argparse.ArgumentParser(
+        description="Effective branching factor with and without move ordering")
+    parser.add_argument("--depth", type=int, default=6)
+    parser.add_argument("--positions", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    positions = sample_positions(args.positions, args.seed)
+    for ordering in (False, True):
+        nodes = 0
+        elapsed = 0.0
+        ebf = []
+        for position in positions:
+            searcher = Searcher(ordering=ordering)
+            result = searcher.search_timed(position, float("inf"), args.depth)
+            nodes += result.nodes
+            elapsed += result.elapsed
+            if len(result.iterations) > 1:
+                ebf.append(effective_branching_factor(result.iterations))
+        print("ordering %-3s: %9d nodes  %6.2fs  mean EBF %.2f" % (
+            "on" if ordering else "off", nodes, elapsed,
+            sum(ebf) / len(ebf) if ebf else 0.0))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+"""Persistent cache of finished searches, shared across sessions.
+
+Each entry maps a position's Zobrist key to the result of a search from it:
+depth reached, score, best move, and the time budget it was given.  Entries
+live in an LRU-ordered dict capped at `max_entries`; the file on disk is an
+append-only log of fixed-size records, each ending in a CRC32 of the rest.
+
+Crash safety comes from the log format: new entries are only ever appended,
+and on load a record whose checksum does not match (a write cut short by a
+crash or power loss) ends the log and is cut off.  When the log holds many
+superseded or evicted records, flush() rewrites it with just the live
+entries into a temporary file and renames that over the old one, so the
+file on disk is always either the old log or the new one.
+
+load_async() reads the file on a background thread, so the caller starts
+immediately; lookups made before loading finishes are simply misses.
+
+Usage:
+    python search_cache.py stats search_cache.bin
+    python search_cache.py compact search_cache.bin
+"""
+
+import argparse
+import os
+import struct
+import sys
+import threading
+import zlib
+from collections import OrderedDict, namedtuple
+
+# key, depth, score, encoded move, time budget in ms, CRC32 of the rest
+_BODY = struct.Struct("<QBiiI")
+_CRC = struct.Struct("<I")
+RECORD_SIZE = _BODY.size + _CRC.size
+
+CacheEntry = namedtuple("CacheEntry", "depth score move budget_ms")
+
+
+class SearchCache:
+    def __init__(self, path, max_entries=200000):
+        self.path = path
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.pending = []
+        self.log_records = 0
+        self.lock = threading.Lock()
+        self.loader = None
+        self.loaded = False
+        self.hits = 0
+        self.misses = 0
+
+    ############################################################################
+    # Loading and saving
+    ############################################################################
+    def load(self):
+        """Read the log; returns the number of valid records."""
+        records = []
+        valid_bytes = 0
+        if os.path.exists(self.path):
+            with open(self.path, "rb") as f:
+                data = f.read()
+            for offset in range(0, len(data) - RECORD_SIZE + 1, RECORD_SIZE):
+                body = data[offset:offset + _BODY.size]
+                (crc,) = _CRC.unpack_from(data, offset + _BODY.size)
+                if zlib.crc32(body) != crc:
+                    break
+                records.append(_BODY.unpack(body))
+                valid_bytes = offset + RECORD_SIZE
+            if valid_bytes != len(data):
+                # Drop a torn tail so later appends line up again.
+                with open(self.path, "r+b") as f:
+                    f.truncate(valid_bytes)
+        with self.lock:
+            # Entries added while loading are newer than anything on disk.
+            newer = self.entries
+            self.entries = OrderedDict()
+            for key, depth, score, move, budget_ms in records:
+                self._insert(key, CacheEntry(depth, score, move, budget_ms))
+            for key, entry in newer.items():
+                self._insert(key, entry)
+            self.log_records = len(records)
+            self.loaded = True
+        return len(records)
+
+    def load_async(self):
+        """Start load() on a daemon thread."""
+        if self.loader is None:
+            self.loader = threading.Thread(target=self.load, daemon=True)
+            self.loader.start()
+
+    def flush(self):
+        """Append new entries to the log, compacting it when mostly stale."""
+        if self.loader is not None:
+            self.loader.join()
+        with self.lock:
+            if self.log_records > 2 * max(len(self.entries), 1024):
+                self._compact()
+                return
+            if not self.pending:
+                return
+            pending, self.pending = self.pending, []
+            with open(self.path, "ab") as f:
+                for key, entry in pending:
+                    f.write(_pack(key, entry))
+                f.flush()
+                os.fsync(f.fileno())
+            self.log_records += len(pending)
+
+    def _compact(self):
+        partial = self.path + ".tmp"
+        with open(partial, "wb") as f:
+            for key, entry in self.entries.items():
+                f.write(_pack(key, entry))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(partial, self.path)
+        self.log_records = len(self.entries)
+        self.pending = []
+
+    def compact(self):
+        if self.loader is not None:
+            self.loader.join()
+        with self.lock:
+            self._compact()
+
+    def close(self):
+        self.flush()
+
+    ############################################################################
+    # Lookups
+    ############################################################################
+    def _insert(self, key, entry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def get(self, key):
+        """The CacheEntry for `key`, or None."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, depth, score, move, budget_ms=0):
+        """Remember a search result unless a deeper one is already known."""
+        entry = CacheEntry(min(depth, 255), score, move, budget_ms)
+        with self.lock:
+            old = self.entries.get(key)
+            if old is not None and old.depth > entry.depth:
+                return False
+            self._insert(key, entry)
+            self.pending.append((key, entry))
+            return True
+
+    def __len__(self):
+        return len(self.entries)
+
+    def stats(self):
+        with self.lock:
+            return {"entries": len(self.entries), "log_records": self.log_records,
+                    "pending": len(self.pending), "hits": self.hits,
+                    "misses": self.misses, "loaded": self.loaded}
+
+
+def _pack(key, entry):
+    body = _BODY.pack(key, entry.depth, entry.score, entry.move, entry.budget_ms)
+    return body + _CRC.pack(zlib.crc32(body))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect a search cache file")
+    parser.add_argument("command", choices=["stats", "compact"])
+    parser.add_argument("path")
+    args = parser.parse_args(argv)
+
+    cache = SearchCache(args.path, max_entries=sys.maxsize)
+    records = cache.load()
+    print("%d valid records, %d distinct positions" % (records, len(cache)))
+    if args.command == "compact":
+        cache.compact()
+        print("compacted to %d records" % len(cache))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
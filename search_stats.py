@@ -0,0 +1,196 @@
+"""Counters for alpha-beta searches, one record per move searched.
+
+A Searcher given a SearchStats object counts, for each search it records:
+
+    nodes               interior and leaf nodes below the root
+    leaf_nodes          static evaluations at the depth limit (the search
+                        has no quiescence stage, so these are where one
+                        would start)
+    beta_cutoffs        nodes that failed high
+    first_move_cutoffs  of those, the ones where the first move tried was
+                        enough; the ratio measures move ordering
+    tt_probes, tt_hits  transposition table lookups and hits
+    branching           legal moves per expanded node, for each ply
+    iterations          (depth, nodes, seconds) per iterative-deepening pass
+
+Modes trade detail for cost:
+
+    off       nothing is counted; the searcher pays one None check per node
+    sampled   every `sample_every`-th search is counted, the rest run as off
+    full      every search is counted
+
+Finished records are kept in memory (the last `keep` of them) and, with a
+path, appended to a JSON-lines file, one line per move, so a game's AI can
+be profiled from the log afterwards.
+
+Usage:
+    python search_stats.py --mode full --depth 5 --positions 10 --out stats.jsonl
+    python search_stats.py --summary stats.jsonl
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+from collections import deque
+
+OFF = "off"
+SAMPLED = "sampled"
+FULL = "full"
+MODES = (OFF, SAMPLED, FULL)
+
+
+class MoveStats:
+    """Counters for one search; incremented directly by the Searcher."""
+
+    __slots__ = ("nodes", "leaf_nodes", "beta_cutoffs", "first_move_cutoffs",
+                 "expanded", "children", "tt_probes", "tt_hits", "started")
+
+    def __init__(self, max_ply):
+        self.nodes = 0
+        self.leaf_nodes = 0
+        self.beta_cutoffs = 0
+        self.first_move_cutoffs = 0
+        # Per ply: nodes whose moves were generated, and how many moves.
+        self.expanded = [0] * max_ply
+        self.children = [0] * max_ply
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.started = time.perf_counter()
+
+    def branching(self):
+        """Average legal moves per expanded node, for each ply reached."""
+        factors = []
+        for expanded, children in zip(self.expanded, self.children):
+            if not expanded:
+                break
+            factors.append(round(children / expanded, 3))
+        return factors
+
+
+class SearchStats:
+    def __init__(self, mode=SAMPLED, sample_every=16, path=None, keep=1000):
+        if mode not in MODES:
+            raise ValueError("unknown stats mode %r" % mode)
+        self.mode = mode
+        self.sample_every = max(1, sample_every)
+        self.path = path
+        self.records = deque(maxlen=keep)
+        self.searches = 0
+        self.lock = threading.Lock()
+        self.file = None
+
+    def begin(self, max_ply):
+        """A MoveStats for a search that should be counted, else None."""
+        if self.mode == OFF:
+            return None
+        with self.lock:
+            self.searches += 1
+            if self.mode == SAMPLED and (self.searches - 1) % self.sample_every:
+                return None
+        return MoveStats(max_ply)
+
+    def finish(self, counters, result, tt):
+        """Turn a finished search's counters into a record and store it.
+
+        `tt` is the searcher's table; its counters are read as deltas from
+        the values noted in Searcher._begin_stats.
+        """
+        elapsed = time.perf_counter() - counters.started
+        iterations = result.iterations or ((result.depth, result.nodes,
+                                            result.elapsed),)
+        record = {
+            "time": time.time(),
+            "mode": self.mode,
+            "move": list(result.move) if result.move is not None else None,
+            "score": result.score,
+            "depth": result.depth,
+            "elapsed": elapsed,
+            "nodes": counters.nodes,
+            "leaf_nodes": counters.leaf_nodes,
+            "nps": counters.nodes / elapsed if elapsed else 0.0,
+            "beta_cutoffs": counters.beta_cutoffs,
+            "first_move_cutoffs": counters.first_move_cutoffs,
+            "first_move_cutoff_rate": (counters.first_move_cutoffs /
+                                       counters.beta_cutoffs
+                                       if counters.beta_cutoffs else 0.0),
+            "tt_probes": tt.probes - counters.tt_probes,
+            "tt_hits": tt.hits - counters.tt_hits,
+            "branching": counters.branching(),
+            "iterations": [{"depth": depth, "nodes": nodes, "seconds": seconds}
+                           for depth, nodes, seconds in iterations],
+        }
+        probes = record["tt_probes"]
+        record["tt_hit_rate"] = record["tt_hits"] / probes if probes else 0.0
+        with self.lock:
+            self.records.append(record)
+            if self.path is not None:
+                if self.file is None:
+                    self.file = open(self.path, "a")
+                self.file.write(json.dumps(record) + "\n")
+                self.file.flush()
+        return record
+
+    def summary(self):
+        return summarize(list(self.records))
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+def summarize(records):
+    """Totals and rates over a list of records."""
+    totals = {"moves": len(records)}
+    for field in ("nodes", "leaf_nodes", "beta_cutoffs", "first_move_cutoffs",
+                  "tt_probes", "tt_hits", "elapsed"):
+        totals[field] = sum(record[field] for record in records)
+    totals["nps"] = totals["nodes"] / totals["elapsed"] if totals["elapsed"] else 0.0
+    totals["first_move_cutoff_rate"] = (
+        totals["first_move_cutoffs"] / totals["beta_cutoffs"]
+        if totals["beta_cutoffs"] else 0.0)
+    totals["tt_hit_rate"] = (totals["tt_hits"] / totals["tt_probes"]
+                             if totals["tt_probes"] else 0.0)
+    return totals
+
+
+def read_records(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Record or summarize search stats")
+    parser.add_argument("--summary", metavar="JSONL",
+                        help="summarize an existing stats file and exit")
+    parser.add_argument("--mode", choices=MODES, default=FULL)
+    parser.add_argument("--sample-every", type=int, default=16)
+    parser.add_argument("--depth", type=int, default=5)
+    parser.add_argument("--positions", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="append JSON lines here")
+    args = parser.parse_args(argv)
+
+    if args.summary:
+        records = read_records(args.summary)
+    else:
+        # Imported here: ai imports this module.
+        from ai import sample_positions
+        from search import Searcher
+        stats = SearchStats(args.mode, args.sample_every, args.out)
+        for position in sample_positions(args.positions, args.seed):
+            Searcher(tt_bits=16, stats=stats).search_timed(
+                position, float("inf"), args.depth)
+        stats.close()
+        records = list(stats.records)
+    for field, value in summarize(records).items():
+        print("%-24s %s" % (field, round(value, 3) if isinstance(value, float)
+                            else value))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
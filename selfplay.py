@@ -0,0 +1,259 @@
+"""Headless self-play that writes games to compact binary shards.
+
+Every position is one fixed-size record (RECORD_DTYPE, 15 bytes):
+
+    geese     uint64  bit i set when a goose stands on engine.POINTS[i]
+    fox       uint8   point index of the fox
+    fox_turn  uint8   side to move
+    action    uint16  move played, as from_point * 33 + to_point
+    outcome   int8    result of the game: +1 fox won, -1 geese won, 0 draw
+                      (rules.DrawRules: repetition or --max-plies)
+    ply       uint16  plies played before this position
+
+With --policy-targets each record also carries `policy`, the search's move
+distribution over vector_rules' NUM_MOVES table moves quantized to uint8.
+A GameState.board copy would be 49 Python ints per position; this is small
+enough for 100M positions to fit in a couple of gigabytes.
+
+Shards are ordinary .npy files of `--shard-size` records, filled one game at
+a time through a memory map and renamed into place when full, so a worker
+never holds more than one game in memory.  A game that does not fit in the
+rest of a shard is cut off there.  Finished shards are skipped when the same
+command is run again, which makes interrupted runs resumable.
+
+Usage:
+    python selfplay.py --out data --shards 64 --workers 4 --policy random
+    python selfplay.py --out data --policy mcts --iterations 256 --policy-targets
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+
+from engine import POINT_INDEX, SearchState
+from rules import DrawRules, REPETITION_LIMIT
+from vector_rules import NUM_POINTS, NUM_MOVES, MOVE_OF_ACTION
+
+RECORD_FIELDS = [
+    ("geese", "<u8"),
+    ("fox", "u1"),
+    ("fox_turn", "u1"),
+    ("action", "<u2"),
+    ("outcome", "i1"),
+    ("ply", "<u2"),
+]
+RECORD_DTYPE = np.dtype(RECORD_FIELDS)
+POLICY_RECORD_DTYPE = np.dtype(RECORD_FIELDS + [("policy", "u1", (NUM_MOVES,))])
+
+POLICIES = ("random", "alphabeta", "mcts")
+METADATA_FILE = "selfplay.json"
+
+_OUTCOMES = {"Fox": 1, "Geese": -1, None: 0}
+
+
+def record_dtype(policy_targets):
+    return POLICY_RECORD_DTYPE if policy_targets else RECORD_DTYPE
+
+
+def shard_path(directory, index):
+    return os.path.join(directory, "shard_%05d.npy" % index)
+
+
+def shard_paths(directory):
+    """Finished shards in `directory`, in index order."""
+    names = sorted(name for name in os.listdir(directory)
+                   if name.startswith("shard_") and name.endswith(".npy"))
+    return [os.path.join(directory, name) for name in names]
+
+
+def pack_geese(geese):
+    """Engine goose bitboard -> one bit per point index."""
+    packed = 0
+    while geese:
+        low = geese & -geese
+        packed |= 1 << POINT_INDEX[low.bit_length() - 1]
+        geese ^= low
+    return packed
+
+
+def move_action(move):
+    return POINT_INDEX[move[0]] * NUM_POINTS + POINT_INDEX[move[1]]
+
+
+################################################################################
+# Policies
+################################################################################
+# Each policy has choose(state, moves) -> (move, probabilities aligned with
+# `moves`), duck-typed like arena.py's agents.
+class _Policy:
+    """Shared setup and epsilon exploration for the policies below."""
+
+    def __init__(self, args, rng):
+        self.args = args
+        self.rng = rng
+
+    def explore(self, moves, move, target):
+        if self.args.epsilon and self.rng.random() < self.args.epsilon:
+            move = moves[int(self.rng.integers(len(moves)))]
+        return move, target
+
+
+class _RandomPolicy(_Policy):
+    def choose(self, state, moves):
+        move = moves[int(self.rng.integers(len(moves)))]
+        return move, np.full(len(moves), 1.0 / len(moves))
+
+
+class _AlphaBetaPolicy(_Policy):
+    def __init__(self, args, rng):
+        super().__init__(args, rng)
+        from search import Searcher
+        self.searcher = Searcher(tt_bits=16)
+
+    def choose(self, state, moves):
+        result = self.searcher.search(state.position(), self.args.depth)
+        target = np.array([float(move == result.move) for move in moves])
+        return self.explore(moves, result.move, target)
+
+
+class _MCTSPolicy(_Policy):
+    def __init__(self, args, rng):
+        super().__init__(args, rng)
+        from mcts import MCTS
+        self.mcts = MCTS(args.iterations, seed=int(rng.integers(2 ** 32)))
+
+    def choose(self, state, moves):
+        result = self.mcts.search(state.position())
+        visits = {child.move: child.visits for child in self.mcts.root.children}
+        target = np.array([visits.get(move, 0) for move in moves], dtype=float)
+        if target.sum():
+            target /= target.sum()
+        return self.explore(moves, result.move, target)
+
+
+_POLICY_CLASSES = {
+    "random": _RandomPolicy,
+    "alphabeta": _AlphaBetaPolicy,
+    "mcts": _MCTSPolicy,
+}
+
+
+################################################################################
+# Shard writing
+################################################################################
+def play_game(policy, max_plies, dtype):
+    """Play one game; returns its records as a structured array."""
+    state = SearchState()
+    draw_rules = DrawRules(REPETITION_LIMIT, max_plies)
+    draw_rules.reset(state.key)
+    records = []
+    policy_rows = []
+    with_policy = "policy" in dtype.names
+    while not state.is_game_over():
+        moves = state.legal_moves()
+        move, target = policy.choose(state, moves)
+        records.append((pack_geese(state.geese), POINT_INDEX[state.fox],
+                        state.fox_turn, move_action(move), 0, len(records)))
+        if with_policy:
+            row = np.zeros(NUM_MOVES, dtype=np.uint8)
+            table_moves = MOVE_OF_ACTION[int(state.fox_turn),
+                                         [move_action(m) for m in moves]]
+            row[table_moves] = np.rint(target * 255)
+            policy_rows.append(row)
+        state.make(move)
+        if draw_rules.record(state.key, move[2] is not None) is not None:
+            break
+    game = np.zeros(len(records), dtype=dtype)
+    for i, field in enumerate(name for name, _ in RECORD_FIELDS):
+        game[field] = [record[i] for record in records]
+    game["outcome"] = _OUTCOMES[state.winner()]
+    if with_policy and records:
+        game["policy"] = policy_rows
+    return game
+
+
+def write_shard(task):
+    """Fill one shard; run in a pool worker.  Returns (index, games, seconds)."""
+    directory, index, args = task
+    started = time.perf_counter()
+    rng = np.random.default_rng([args.seed, index])
+    policy = _POLICY_CLASSES[args.policy](args, rng)
+    dtype = record_dtype(args.policy_targets)
+    path = shard_path(directory, index)
+    partial = path + ".tmp"
+    shard = np.lib.format.open_memmap(partial, mode="w+", dtype=dtype,
+                                      shape=(args.shard_size,))
+    filled = 0
+    games = 0
+    while filled < args.shard_size:
+        game = play_game(policy, args.max_plies, dtype)
+        count = min(len(game), args.shard_size - filled)
+        shard[filled:filled + count] = game[:count]
+        filled += count
+        games += 1
+    shard.flush()
+    del shard
+    os.replace(partial, path)
+    return index, games, time.perf_counter() - started
+
+
+def _check_metadata(directory, args):
+    """Record the record format, and refuse to resume with a different one."""
+    metadata = {"shard_size": args.shard_size,
+                "policy_targets": args.policy_targets,
+                "dtype": record_dtype(args.policy_targets).descr}
+    path = os.path.join(directory, METADATA_FILE)
+    if os.path.exists(path):
+        with open(path) as f:
+            existing = json.load(f)
+        if existing != json.loads(json.dumps(metadata)):
+            raise SystemExit("%s was written with different settings: %s"
+                             % (directory, existing))
+        return
+    with open(path, "w") as f:
+        json.dump(metadata, f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write self-play shards")
+    parser.add_argument("--out", required=True, help="shard directory")
+    parser.add_argument("--shards", type=int, default=16)
+    parser.add_argument("--shard-size", type=int, default=1 << 16,
+                        help="positions per shard")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--policy", choices=POLICIES, default="random")
+    parser.add_argument("--depth", type=int, default=3,
+                        help="alphabeta search depth")
+    parser.add_argument("--iterations", type=int, default=256,
+                        help="mcts playouts per move")
+    parser.add_argument("--epsilon", type=float, default=0.1,
+                        help="chance of a random move (search policies)")
+    parser.add_argument("--policy-targets", action="store_true")
+    parser.add_argument("--max-plies", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.out, exist_ok=True)
+    _check_metadata(args.out, args)
+    todo = [(args.out, index, args) for index in range(args.shards)
+            if not os.path.exists(shard_path(args.out, index))]
+    print("%d of %d shards to write" % (len(todo), args.shards))
+    started = time.perf_counter()
+    positions = 0
+    with multiprocessing.Pool(args.workers) as pool:
+        for done, (index, games, seconds) in enumerate(
+                pool.imap_unordered(write_shard, todo), 1):
+            positions += args.shard_size
+            elapsed = time.perf_counter() - started
+            print("shard %5d: %d games in %.1fs  [%d/%d, %.0f positions/s]" % (
+                index, games, seconds, done, len(todo), positions / elapsed))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,312 @@
+"""Retrograde solver and memory-mapped win/loss/draw tablebase.
+
+Positions are solved one layer at a time, where a layer is every position
+with the same number of geese.  Goose moves stay inside a layer and fox
+captures drop into the layer below, so each layer only needs the one under it
+to be finished.  Layers with fewer than 3 geese are never stored: the fox has
+already won there.
+
+Within a layer the solve is predecessor-driven retrograde analysis.  One
+pass over the layer decides the positions with no moves (a loss) and the
+fox positions whose captures settle them through the layer below, and gives
+every other position a count of the moves not yet known to lose.  Each
+decided position is then "unmoved": its predecessors in the layer (a goose
+stepping back, or the fox stepping back) are looked up by index, and a
+predecessor with a losing child is a win, while one whose count drops to
+zero is a loss.  Positions never decided are draws.
+
+Each layer is a flat file holding 2 bits per position (see engine.rank_geese
+for the index), memory-mapped while solving and while probing, with a
+temporary 1 byte per position file of move counts next to it during the
+solve.  A decided position no longer needs its count, so its byte doubles
+as the mark PENDING until it has been unmoved.  Propagation sweeps the
+counts file for marks with mmap.find() and repeats the sweep until none are
+left, so there is no queue.  Peak memory is the interpreter and the move
+tables (about 16 MB resident solving layers 3-4) whatever the layer, plus
+the two files, which live in the OS page cache and are paged to and from
+disk as needed.  A finished layer is marked with a `.done` file; stopping a
+solve loses only the layer in progress, which starts over on the next run.
+
+Layer sizes grow quickly (2 * 33 * C(32, n) positions).  The solver handles
+about 400k positions a second on one core: layer 3 takes about 2s, layer 4
+about 7s and layer 5 about 35s.  At that rate layer 8 (690M positions)
+takes about 30 minutes with a 172 MB layer file and a 690 MB counts file,
+and layer 13 (23G positions) about 16 hours with 5.8 GB and 23 GB files.
+Those rates assume both files fit in RAM; beyond that the solve still
+finishes, at disk speed.
+
+Usage:
+    python tablebase.py solve tablebase --max-geese 4
+    python tablebase.py stats tablebase
+"""
+
+import argparse
+import mmap
+import os
+import sys
+import time
+
+from engine import (POINTS, POINT_INDEX, POINT_MASK, BINOMIAL, FOX_STEPS,
+                    FOX_STEP_MASK, FOX_JUMPS, GOOSE_SOURCE_MASK, goose_mobility,
+                    rank_geese, unrank_geese)
+
+# Values are from the point of view of the side to move.
+UNKNOWN = 0  # also "draw" once a layer is finished
+WIN = 1
+LOSS = 2
+
+VALUE_NAMES = {UNKNOWN: "draw", WIN: "win", LOSS: "loss"}
+
+MIN_GEESE = 3  # with fewer geese the fox has won
+MAX_GEESE = 13
+
+# Counts-file byte of a decided position that still has to be unmoved; move
+# counts stay far below it.
+PENDING = 255
+
+
+def layer_size(count):
+    """Number of positions (both sides to move) with `count` geese."""
+    return len(POINTS) * BINOMIAL[len(POINTS) - 1][count] * 2
+
+
+def position_index(fox, geese, fox_turn):
+    count = geese.bit_count()
+    index = POINT_INDEX[fox] * BINOMIAL[len(POINTS) - 1][count]
+    index += rank_geese(fox, geese)
+    return index * 2 + (1 if fox_turn else 0)
+
+
+def layer_path(directory, count):
+    return os.path.join(directory, "geese_%02d.tb" % count)
+
+
+def _read(mm, index):
+    return (mm[index >> 2] >> ((index & 3) * 2)) & 3
+
+
+def _write(mm, index, value):
+    mm[index >> 2] |= value << ((index & 3) * 2)
+
+
+def _open_layer(directory, count, writable):
+    path = layer_path(directory, count)
+    if writable and not os.path.exists(path):
+        with open(path, "wb") as f:
+            f.truncate((layer_size(count) + 3) // 4)
+    f = open(path, "r+b" if writable else "rb")
+    access = mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ
+    mm = mmap.mmap(f.fileno(), 0, access=access)
+    f.close()
+    return mm
+
+
+def is_layer_done(directory, count):
+    return os.path.exists(layer_path(directory, count) + ".done")
+
+
+################################################################################
+# Solver
+################################################################################
+def _initial_value(fox, geese, fox_turn, count, lower):
+    """(value, moves left to refute) before any propagation.
+
+    Fox captures are settled here from the finished layer below; a capture
+    into a draw is counted, so its position can never become a loss.
+    """
+    if not fox_turn:
+        moves = goose_mobility(fox, geese)
+        return (LOSS, 0) if moves == 0 else (UNKNOWN, moves)
+    moves = (FOX_STEP_MASK[fox] & ~geese).bit_count()
+    for mid, land in FOX_JUMPS[fox]:
+        if (geese >> mid) & 1 and not (geese >> land) & 1:
+            if lower is None:
+                # Down to two geese: the fox has won.
+                return WIN, 0
+            child = _read(lower, position_index(land, geese & ~(1 << mid), False))
+            if child == LOSS:
+                return WIN, 0
+            if child == UNKNOWN:
+                moves += 1
+    return (LOSS, 0) if moves == 0 else (UNKNOWN, moves)
+
+
+def _predecessors(fox, geese, fox_turn):
+    """Positions in the same layer with a move to this one (no captures)."""
+    if fox_turn:
+        # A goose just moved onto one of its squares from an empty one.
+        empty = POINT_MASK & ~geese & ~(1 << fox)
+        bits = geese
+        while bits:
+            low = bits & -bits
+            bits ^= low
+            sources = GOOSE_SOURCE_MASK[low.bit_length() - 1] & empty
+            while sources:
+                source = sources & -sources
+                sources ^= source
+                yield fox, geese ^ low ^ source, False
+    else:
+        # The fox just stepped here; fox steps are symmetric.
+        for frm in FOX_STEPS[fox]:
+            if not (geese >> frm) & 1:
+                yield frm, geese, True
+
+
+def solve_layer(directory, count, log=print):
+    """Solve every position with `count` geese; the layer below must be done."""
+    if is_layer_done(directory, count):
+        log("layer %d already solved" % count)
+        return
+    if count > MIN_GEESE and not is_layer_done(directory, count - 1):
+        raise RuntimeError("layer %d must be solved before layer %d"
+                           % (count - 1, count))
+    path = layer_path(directory, count)
+    counts_path = path + ".counts"
+    size = layer_size(count)
+    # An unfinished layer starts over.
+    for name, length in ((path, (size + 3) // 4), (counts_path, size)):
+        with open(name, "wb") as f:
+            f.truncate(length)
+    layer = _open_layer(directory, count, writable=True)
+    with open(counts_path, "r+b") as f:
+        counts = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_WRITE)
+    lower = _open_layer(directory, count - 1, False) if count > MIN_GEESE else None
+    ranks = BINOMIAL[len(POINTS) - 1][count]
+    pending = bytes((PENDING,))
+    decided = 0
+    try:
+        started = time.perf_counter()
+        for fox_point, fox in enumerate(POINTS):
+            base = fox_point * ranks * 2
+            for rank in range(ranks):
+                geese = unrank_geese(fox, count, rank)
+                for side in (0, 1):
+                    index = base + rank * 2 + side
+                    value, moves = _initial_value(fox, geese, side == 1, count,
+                                                  lower)
+                    if value != UNKNOWN:
+                        _write(layer, index, value)
+                        counts[index] = PENDING
+                        decided += 1
+                    else:
+                        counts[index] = moves
+        log("layer %d: %d of %d positions decided directly in %.1fs"
+            % (count, decided, size, time.perf_counter() - started))
+
+        started = time.perf_counter()
+        sweeps = 0
+        index = counts.find(pending)
+        while index != -1:
+            counts[index] = 0
+            value = _read(layer, index)
+            fox_point, rank = divmod(index >> 1, ranks)
+            fox = POINTS[fox_point]
+            geese = unrank_geese(fox, count, rank)
+            for parent in _predecessors(fox, geese, index & 1 == 1):
+                parent_index = position_index(*parent)
+                if _read(layer, parent_index) != UNKNOWN:
+                    continue
+                if value == LOSS:
+                    _write(layer, parent_index, WIN)
+                    counts[parent_index] = PENDING
+                    decided += 1
+                else:
+                    left = counts[parent_index] - 1
+                    counts[parent_index] = left
+                    if left == 0:
+                        _write(layer, parent_index, LOSS)
+                        counts[parent_index] = PENDING
+                        decided += 1
+            # Marks behind this point are picked up by the next sweep.
+            index = counts.find(pending, index + 1)
+            if index == -1:
+                sweeps += 1
+                index = counts.find(pending)
+        layer.flush()
+        log("layer %d: %d positions decided in total, propagation %.1fs "
+            "in %d sweeps" % (count, decided, time.perf_counter() - started,
+                              sweeps))
+    finally:
+        layer.close()
+        counts.close()
+        if lower is not None:
+            lower.close()
+    os.remove(counts_path)
+    open(path + ".done", "w").close()
+
+
+def solve(directory, max_geese=MAX_GEESE, log=print):
+    os.makedirs(directory, exist_ok=True)
+    for count in range(MIN_GEESE, max_geese + 1):
+        solve_layer(directory, count, log)
+
+
+################################################################################
+# Probing
+################################################################################
+class Tablebase:
+    """Read-only access to solved layers; files are mapped on first use."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.layers = {}
+
+    def has_layer(self, count):
+        return count < MIN_GEESE or is_layer_done(self.directory, count)
+
+    def probe(self, position):
+        """WIN, LOSS or UNKNOWN (draw) for the side to move, None if unsolved."""
+        count = position.geese.bit_count()
+        if count < MIN_GEESE:
+            return WIN if position.fox_turn else LOSS
+        layer = self.layers.get(count)
+        if layer is None:
+            if not is_layer_done(self.directory, count):
+                return None
+            layer = _open_layer(self.directory, count, writable=False)
+            self.layers[count] = layer
+        return _read(layer, position_index(position.fox, position.geese,
+                                           position.fox_turn))
+
+    def close(self):
+        for layer in self.layers.values():
+            layer.close()
+        self.layers.clear()
+
+
+def layer_stats(directory, count):
+    """Count wins, losses and draws in a finished layer."""
+    totals = {WIN: 0, LOSS: 0, UNKNOWN: 0}
+    layer = _open_layer(directory, count, writable=False)
+    try:
+        for index in range(layer_size(count)):
+            totals[_read(layer, index)] += 1
+    finally:
+        layer.close()
+    return totals
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fox and Geese tablebase")
+    sub = parser.add_subparsers(dest="command", required=True)
+    solve_cmd = sub.add_parser("solve", help="solve layers up to --max-geese")
+    solve_cmd.add_argument("directory")
+    solve_cmd.add_argument("--max-geese", type=int, default=MAX_GEESE)
+    stats_cmd = sub.add_parser("stats", help="win/loss/draw counts per layer")
+    stats_cmd.add_argument("directory")
+    args = parser.parse_args(argv)
+
+    if args.command == "solve":
+        solve(args.directory, args.max_geese)
+    else:
+        for count in range(MIN_GEESE, MAX_GEESE + 1):
+            if not is_layer_done(args.directory, count):
+                break
+            totals = layer_stats(args.directory, count)
+            print("geese=%2d  win=%d loss=%d draw=%d" % (
+                count, totals[WIN], totals[LOSS], totals[UNKNOWN]))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,22 @@
+import os
+import sys
+
+import pytest
+
+# The modules live at the top of the repository, not in a package.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tablebase  # noqa: E402
+
+SOLVED_LAYERS = (3, 4)
+
+
+@pytest.fixture(scope="session")
+def solved(tmp_path_factory):
+    """A Tablebase with SOLVED_LAYERS solved in a temporary directory."""
+    directory = str(tmp_path_factory.mktemp("tablebase"))
+    for count in SOLVED_LAYERS:
+        tablebase.solve_layer(directory, count, log=lambda message: None)
+    tb = tablebase.Tablebase(directory)
+    yield tb
+    tb.close()
@@ -0,0 +1,61 @@
+"""BatchEnv against engine.SearchState and rules.DrawRules, game by game."""
+
+import numpy as np
+
+import vector_rules as vr
+from batch_env import BatchEnv, FOX_WON, GEESE_WON, NO_WINNER
+from engine import POINTS, POINT_INDEX, SearchState
+from env import OBSERVATION_SIZE, write_observation
+from rules import DrawRules, REPETITION_LIMIT
+
+ENVS = 16
+STEPS = 400
+MAX_PLIES = 60
+
+
+class Game:
+    def __init__(self):
+        self.state = SearchState()
+        self.draw_rules = DrawRules(REPETITION_LIMIT, MAX_PLIES)
+        self.draw_rules.reset(self.state.key)
+
+    def actions(self):
+        return {POINT_INDEX[frm] * vr.NUM_POINTS + POINT_INDEX[to]
+                for frm, to, _ in self.state.legal_moves()}
+
+    def step(self, action):
+        """(winner, done) after playing `action`."""
+        index = vr.MOVE_OF_ACTION[int(self.state.fox_turn), action]
+        capture = vr.MOVE_CAPTURE[index]
+        move = (POINTS[vr.MOVE_FROM[index]], POINTS[vr.MOVE_TO[index]],
+                None if capture == vr.NO_CAPTURE else POINTS[capture])
+        assert move in self.state.legal_moves()
+        self.state.make(move)
+        drawn = self.draw_rules.record(self.state.key, move[2] is not None)
+        winner = {"Fox": FOX_WON, "Geese": GEESE_WON, None: NO_WINNER}[
+            self.state.winner()]
+        return winner, winner != NO_WINNER or drawn is not None
+
+
+def test_steps_match_the_engine():
+    env = BatchEnv(ENVS, max_plies=MAX_PLIES, seed=7)
+    obs, mask = env.reset()
+    games = [Game() for _ in range(ENVS)]
+    expected = np.empty(OBSERVATION_SIZE, dtype=np.int8)
+    finished = 0
+    for _ in range(STEPS):
+        for row, game in enumerate(games):
+            assert set(np.nonzero(mask[row])[0]) == game.actions()
+            write_observation(game.state, expected)
+            assert (obs[row] == expected).all()
+        actions = env.random_actions(mask)
+        obs, rewards, dones, mask, info = env.step(actions)
+        for row, game in enumerate(games):
+            winner, done = game.step(int(actions[row]))
+            assert info["winner"][row] == winner
+            assert dones[row] == done
+            assert rewards[row] == (winner != NO_WINNER)
+            if done:
+                games[row] = Game()
+                finished += 1
+    assert finished > ENVS
@@ -0,0 +1,37 @@
+"""engine.SearchState against rules.GameState over random games."""
+
+import random
+
+import rules
+from engine import NUM_SQUARES, SearchState, row_col
+from perft import RulesPerft
+
+GAMES = 100
+MAX_PLIES = 150
+
+
+def engine_moves(state):
+    return {(row_col(frm), row_col(to)) for frm, to, _ in state.legal_moves()}
+
+
+def test_random_games_match_rules():
+    perft = RulesPerft()
+    rng = random.Random(1)
+    for _ in range(GAMES):
+        game = rules.GameState()
+        state = SearchState()
+        for _ in range(MAX_PLIES):
+            assert state.is_game_over() == game.game_over
+            if game.game_over:
+                assert state.winner() == game.winner
+                break
+            moves = perft.moves(game)
+            assert engine_moves(state) == set(moves)
+            move = rng.choice(moves)
+            game.select_piece(*move[0])
+            game.move_piece(*move[1])
+            state.make(next(m for m in state.legal_moves()
+                            if (row_col(m[0]), row_col(m[1])) == move))
+            assert row_col(state.fox) == game.fox_pos
+            assert ({row_col(sq) for sq in range(NUM_SQUARES) if (state.geese >> sq) & 1}
+                    == set(game.geese_positions))
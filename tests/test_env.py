@@ -0,0 +1,39 @@
+"""FoxGeeseEnv rewards and draws."""
+
+from engine import POINT_INDEX, square
+from env import FoxGeeseEnv
+from vector_rules import NUM_POINTS
+
+# Geese to move from the start: one goose steps up, then the fox and that
+# goose shuffle back and forth until the position after the first move has
+# occurred three times.
+REPETITION_LINE = [((4, 0), (3, 0))] + [
+    ((3, 3), (2, 3)), ((3, 0), (3, 1)), ((2, 3), (3, 3)), ((3, 1), (3, 0)),
+] * 2
+
+
+def action(frm, to):
+    return (POINT_INDEX[square(*frm)] * NUM_POINTS +
+            POINT_INDEX[square(*to)])
+
+
+def test_repetition_draw_pays_nothing():
+    env = FoxGeeseEnv()
+    _, info = env.reset()
+    for ply, (frm, to) in enumerate(REPETITION_LINE, 1):
+        assert info["action_mask"][action(frm, to)]
+        _, reward, terminated, truncated, info = env.step(action(frm, to))
+        if ply < len(REPETITION_LINE):
+            assert not (terminated or truncated)
+    assert terminated and not truncated
+    assert info["winner"] is None
+    assert reward == 0.0
+
+
+def test_move_limit_truncates_without_reward():
+    env = FoxGeeseEnv(max_plies=len(REPETITION_LINE) - 1)
+    env.reset()
+    for frm, to in REPETITION_LINE[:-1]:
+        _, reward, terminated, truncated, info = env.step(action(frm, to))
+    assert truncated and not terminated
+    assert reward == 0.0
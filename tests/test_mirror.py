@@ -0,0 +1,36 @@
+"""Left-right mirror symmetry of positions and moves."""
+
+from ai import sample_positions
+from engine import (POINTS, MIRROR_SQUARE, SearchState, canonical,
+                    mirror_geese, mirror_move)
+
+POSITIONS = sample_positions(200, seed=5, max_plies=60)
+
+
+def test_mirror_is_an_involution():
+    assert all(MIRROR_SQUARE[MIRROR_SQUARE[sq]] == sq for sq in POINTS)
+    for position in POSITIONS:
+        assert position.mirror().mirror() == position
+        assert mirror_geese(mirror_geese(position.geese)) == position.geese
+        for move in position.legal_moves():
+            assert mirror_move(mirror_move(move)) == move
+
+
+def test_mirror_maps_legal_moves_and_results():
+    for position in POSITIONS:
+        mirrored = position.mirror()
+        assert (sorted(map(mirror_move, position.legal_moves())) ==
+                sorted(mirrored.legal_moves()))
+        assert position.winner() == mirrored.winner()
+        for move in position.legal_moves():
+            assert position.play(move).mirror() == mirrored.play(mirror_move(move))
+
+
+def test_canonical_form_is_shared_with_the_mirror():
+    for position in POSITIONS:
+        canon, mirrored = position.canonical()
+        assert position.mirror().canonical()[0] == canon
+        assert canon == (position.mirror() if mirrored else position)
+        assert canonical(canon.fox, canon.geese)[:2] == (canon.fox, canon.geese)
+        assert (SearchState(position).canonical_key() ==
+                SearchState(position.mirror()).canonical_key())
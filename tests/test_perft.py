@@ -0,0 +1,38 @@
+"""Perft counts, and agreement between the cross-checked generators."""
+
+import pytest
+
+from perft import CROSS_CHECKED, format_fen, parse_fen, perft
+
+# Leaf counts from the combine.py start position, depths 1 to 5.
+START_COUNTS = [10, 54, 812, 3852, 62722]
+
+# Fox to move with one goose ahead of it, depths 1 to 3.
+SPARSE_FEN = "xx...xx/xx...xx/7/3F3/3G3/xxGGGxx/xxGGGxx f"
+SPARSE_COUNTS = [7, 43, 216]
+
+
+@pytest.mark.parametrize("name", CROSS_CHECKED)
+def test_start_counts(name):
+    for depth, expected in enumerate(START_COUNTS, 1):
+        counts, _ = perft(name, depth)
+        assert sum(counts.values()) == expected, (name, depth)
+
+
+@pytest.mark.parametrize("name", CROSS_CHECKED)
+def test_sparse_counts(name):
+    for depth, expected in enumerate(SPARSE_COUNTS, 1):
+        counts, _ = perft(name, depth, SPARSE_FEN)
+        assert sum(counts.values()) == expected, (name, depth)
+
+
+def test_divide_agrees_below_every_first_move():
+    reference, _ = perft(CROSS_CHECKED[0], 4)
+    for name in CROSS_CHECKED[1:]:
+        counts, _ = perft(name, 4)
+        assert counts == reference, name
+
+
+def test_fen_round_trip():
+    setup = parse_fen(SPARSE_FEN)
+    assert parse_fen(format_fen(*setup)) == setup
@@ -0,0 +1,58 @@
+"""df-pn against the tablebase on random 3- and 4-goose positions."""
+
+import random
+
+import pytest
+
+import pns
+import tablebase
+from engine import POINTS, Position
+
+LAYERS = (3, 4)  # conftest.SOLVED_LAYERS
+
+POSITIONS_PER_LAYER = 20
+MAX_NODES = 300000
+
+
+def random_positions(tb, count, number, decisive, seed):
+    """Unfinished positions with `count` geese, decisive or drawn."""
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < number:
+        points = rng.sample(POINTS, count + 1)
+        geese = 0
+        for point in points[1:]:
+            geese |= 1 << point
+        position = Position(points[0], geese, rng.random() < 0.5)
+        if position.winner() is not None:
+            continue
+        if (tb.probe(position) != tablebase.UNKNOWN) == decisive:
+            positions.append(position)
+    return positions
+
+
+def attacker_wins(value, position, attacker):
+    mover = "Fox" if position.fox_turn else "Geese"
+    return value == (tablebase.WIN if attacker == mover else tablebase.LOSS)
+
+
+@pytest.mark.parametrize("count", LAYERS)
+def test_decisive_positions_are_solved_correctly(solved, count):
+    for position in random_positions(solved, count, POSITIONS_PER_LAYER,
+                                     True, seed=count):
+        value = solved.probe(position)
+        for attacker in ("Geese", "Fox"):
+            result = pns.prove(position, attacker, max_nodes=MAX_NODES)
+            assert result.status != pns.UNKNOWN, (position, attacker)
+            expected = (pns.PROVEN if attacker_wins(value, position, attacker)
+                        else pns.DISPROVEN)
+            assert result.status == expected, (position, attacker)
+
+
+def test_drawn_positions_are_never_proven(solved):
+    # Disproving a draw can take far more nodes, so UNKNOWN is allowed here.
+    for position in random_positions(solved, 3, POSITIONS_PER_LAYER,
+                                      False, seed=0):
+        for attacker in ("Geese", "Fox"):
+            result = pns.prove(position, attacker, max_nodes=2000)
+            assert result.status != pns.PROVEN, (position, attacker)
@@ -0,0 +1,87 @@
+"""rules.DrawRules, directly and through GameState.move_piece."""
+
+import rules
+from perft import RulesPerft
+from rules import DRAW, DrawRules
+
+A, B, C = 11, 22, 33
+
+# From the start: a goose steps up, then the fox and that goose shuffle
+# until the position after the first move has occurred three times.
+REPETITION_LINE = [((4, 0), (3, 0))] + [
+    ((3, 3), (2, 3)), ((3, 0), (3, 1)), ((2, 3), (3, 3)), ((3, 1), (3, 0)),
+] * 2
+
+
+def play(state, frm, to):
+    assert state.select_piece(*frm)
+    assert state.move_piece(*to)
+
+
+def test_threefold_repetition():
+    draw_rules = DrawRules(3, None)
+    draw_rules.reset(A)
+    assert draw_rules.record(B, False) is None
+    assert draw_rules.record(A, False) is None
+    assert draw_rules.record(B, False) is None
+    assert draw_rules.repetitions(A) == 2
+    assert draw_rules.record(A, False) == "repetition"
+
+
+def test_ply_limit():
+    draw_rules = DrawRules(None, 3)
+    draw_rules.reset(A)
+    assert draw_rules.record(B, False) is None
+    assert draw_rules.record(C, False) is None
+    assert draw_rules.record(A, False) == "move limit"
+    assert draw_rules.ply == 3
+
+
+def test_capture_clears_the_counts():
+    draw_rules = DrawRules(3, None)
+    draw_rules.reset(A)
+    draw_rules.record(B, False)
+    draw_rules.record(A, False)
+    assert draw_rules.record(C, True) is None
+    assert draw_rules.repetitions(A) == 0
+    assert draw_rules.repetitions(C) == 1
+    assert draw_rules.record(A, False) is None
+    assert draw_rules.record(A, False) is None
+    assert draw_rules.record(A, False) == "repetition"
+
+
+def test_limits_can_be_turned_off():
+    draw_rules = DrawRules(None, None)
+    draw_rules.reset(A)
+    assert all(draw_rules.record(A, False) is None for _ in range(1000))
+
+
+def test_game_state_draws_by_repetition():
+    state = rules.GameState(3, None)
+    for frm, to in REPETITION_LINE[:-1]:
+        play(state, frm, to)
+        assert not state.game_over
+    assert state.repetitions() == 2
+    play(state, *REPETITION_LINE[-1])
+    assert state.game_over
+    assert state.winner == DRAW
+    assert state.draw_reason == "repetition"
+
+
+def test_winning_move_beats_a_draw_on_the_same_ply():
+    # Fox to move next to a goose it can jump, leaving two geese.
+    setup = ((3, 3), [(3, 4), (0, 2), (0, 4)], True)
+    perft = RulesPerft()
+    state = perft.setup(*setup)
+    state.draw_rules = DrawRules(None, 1)
+    state.draw_rules.reset(state.zobrist_key)
+    play(state, (3, 3), (3, 5))
+    assert state.winner == "Fox"
+    assert state.draw_reason is None
+
+    state = perft.setup(*setup)
+    state.draw_rules = DrawRules(None, 1)
+    state.draw_rules.reset(state.zobrist_key)
+    play(state, (3, 3), (2, 3))
+    assert state.winner == DRAW
+    assert state.draw_reason == "move limit"
@@ -0,0 +1,67 @@
+"""The search cache log: torn writes on load, and compaction."""
+
+import os
+
+from search_cache import RECORD_SIZE, CacheEntry, SearchCache
+
+
+def write_entries(path, count):
+    cache = SearchCache(path)
+    for key in range(count):
+        cache.put(key, depth=key % 20, score=key - 5, move=key * 3, budget_ms=100)
+    cache.flush()
+    return cache
+
+
+def test_torn_tail_is_cut_off(tmp_path):
+    path = str(tmp_path / "cache.bin")
+    write_entries(path, 10)
+    with open(path, "rb") as f:
+        whole = f.read()
+    # A crash halfway through appending an eleventh record.
+    with open(path, "ab") as f:
+        f.write(whole[:RECORD_SIZE // 2])
+
+    cache = SearchCache(path)
+    assert cache.load() == 10
+    assert len(cache) == 10
+    assert cache.get(7) == CacheEntry(7, 2, 21, 100)
+    assert os.path.getsize(path) == 10 * RECORD_SIZE
+
+    # Appends after the cut line up with the record boundaries again.
+    cache.put(10, 1, 0, 0)
+    cache.flush()
+    reloaded = SearchCache(path)
+    assert reloaded.load() == 11
+    assert reloaded.get(10) == CacheEntry(1, 0, 0, 0)
+
+
+def test_corrupt_record_ends_the_log(tmp_path):
+    path = str(tmp_path / "cache.bin")
+    write_entries(path, 10)
+    with open(path, "r+b") as f:
+        f.seek(4 * RECORD_SIZE + 3)
+        f.write(b"\xff")
+
+    cache = SearchCache(path)
+    assert cache.load() == 4
+    assert cache.get(3) is not None and cache.get(4) is None
+    assert os.path.getsize(path) == 4 * RECORD_SIZE
+
+
+def test_compaction_keeps_only_live_entries(tmp_path):
+    path = str(tmp_path / "cache.bin")
+    cache = SearchCache(path, max_entries=5)
+    for rounds in range(3):
+        for key in range(8):
+            cache.put(key, depth=rounds, score=rounds, move=key)
+        cache.flush()
+    assert os.path.getsize(path) == 24 * RECORD_SIZE
+
+    cache.compact()
+    assert os.path.getsize(path) == 5 * RECORD_SIZE
+    assert not os.path.exists(path + ".tmp")
+    reloaded = SearchCache(path)
+    assert reloaded.load() == 5
+    assert sorted(reloaded.entries) == [3, 4, 5, 6, 7]
+    assert reloaded.get(7) == CacheEntry(2, 2, 7, 0)
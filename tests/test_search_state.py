@@ -0,0 +1,44 @@
+"""SearchState make/unmake and its incremental mobility counts."""
+
+import random
+
+from ai import sample_positions
+from engine import SearchState, fox_mobility, goose_mobility
+
+
+def snapshot(state):
+    return (state.fox, state.geese, state.fox_turn, state.fox_mobility,
+            state.goose_mobility, state.key, state.mirror_key)
+
+
+def assert_mobility(state):
+    assert state.fox_mobility == fox_mobility(state.fox, state.geese)
+    assert state.goose_mobility == goose_mobility(state.fox, state.geese)
+
+
+def test_make_unmake_restores_every_field():
+    for position in sample_positions(50, seed=2, max_plies=60):
+        state = SearchState(position)
+        before = snapshot(state)
+        for move in state.legal_moves():
+            state.make(move)
+            assert_mobility(state)
+            state.unmake()
+            assert snapshot(state) == before
+        assert not state.history
+
+
+def test_mobility_stays_exact_along_random_lines():
+    rng = random.Random(3)
+    for _ in range(30):
+        state = SearchState()
+        snapshots = []
+        while not state.is_game_over() and len(snapshots) < 120:
+            snapshots.append(snapshot(state))
+            state.make(rng.choice(state.legal_moves()))
+            assert_mobility(state)
+            assert state.is_game_over() == (not state.legal_moves() or
+                                            state.geese.bit_count() < 3)
+        while snapshots:
+            state.unmake()
+            assert snapshot(state) == snapshots.pop()
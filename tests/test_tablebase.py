@@ -0,0 +1,51 @@
+"""Solved tablebase layers against the rules and their own children."""
+
+import random
+
+from engine import BINOMIAL, POINTS, Position, square, unrank_geese
+from tablebase import LOSS, UNKNOWN, WIN
+
+SAMPLES_PER_LAYER = 3000
+
+
+def children_values(solved, position):
+    return [solved.probe(position.play(move))
+            for move in position.legal_moves()]
+
+
+def test_terminal_positions(solved):
+    # Fox in the middle of the top row, boxed in by four geese.
+    trapped = Position(square(0, 3), (1 << square(0, 2)) | (1 << square(0, 4)) |
+                       (1 << square(1, 3)) | (1 << square(2, 3)), True)
+    assert trapped.winner() == "Geese"
+    assert solved.probe(trapped) == LOSS
+    # Geese to move with every goose on the top row: no goose can move.
+    stuck = Position(square(3, 3), (1 << square(0, 2)) | (1 << square(0, 3)) |
+                     (1 << square(0, 4)), False)
+    assert stuck.winner() == "Fox"
+    assert solved.probe(stuck) == LOSS
+    # Fox to move with a capture that leaves two geese.
+    capture = Position(square(3, 3), (1 << square(3, 4)) | (1 << square(0, 2)) |
+                       (1 << square(0, 4)), True)
+    assert solved.probe(capture) == WIN
+
+
+def test_values_agree_with_children(solved):
+    rng = random.Random(8)
+    for count in (3, 4):
+        ranks = BINOMIAL[len(POINTS) - 1][count]
+        for _ in range(SAMPLES_PER_LAYER):
+            fox = rng.choice(POINTS)
+            position = Position(fox, unrank_geese(fox, count,
+                                                  rng.randrange(ranks)),
+                                rng.random() < 0.5)
+            value = solved.probe(position)
+            children = children_values(solved, position)
+            if value == WIN:
+                assert LOSS in children, position
+            elif value == LOSS:
+                assert all(child == WIN for child in children), position
+            else:
+                assert value == UNKNOWN
+                assert LOSS not in children, position
+                assert UNKNOWN in children, position
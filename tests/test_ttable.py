@@ -0,0 +1,46 @@
+"""Zobrist keys and the transposition table."""
+
+import random
+
+import rules
+from engine import SearchState, position_key, row_col
+from perft import RulesPerft
+from ttable import EXACT, LOWER_BOUND, NO_MOVE, TranspositionTable
+
+
+def test_incremental_keys_match_full_hashes():
+    perft = RulesPerft()
+    rng = random.Random(4)
+    for _ in range(30):
+        game = rules.GameState()
+        state = SearchState()
+        while not game.game_over and len(state.history) < 120:
+            assert state.key == position_key(state.fox, state.geese,
+                                             state.fox_turn)
+            assert state.key == game.zobrist_key
+            assert state.mirror_key == state.position().mirror().key()
+            move = rng.choice(perft.moves(game))
+            game.select_piece(*move[0])
+            game.move_piece(*move[1])
+            state.make(next(m for m in state.legal_moves()
+                            if (row_col(m[0]), row_col(m[1])) == move))
+
+
+def test_store_and_probe():
+    tt = TranspositionTable(8)
+    assert tt.probe(12345) is None
+    assert tt.store(12345, 3, 17, EXACT, 42)
+    assert tt.probe(12345) == (3, 17, EXACT, 42)
+    assert (tt.hits, tt.misses) == (1, 1)
+
+
+def test_deeper_entry_wins_a_collision():
+    tt = TranspositionTable(8)
+    first, second = 5, 5 + tt.size
+    tt.store(first, 6, 1, EXACT)
+    assert not tt.store(second, 2, 2, LOWER_BOUND)
+    assert tt.probe(first) == (6, 1, EXACT, NO_MOVE)
+    assert tt.store(second, 7, 2, LOWER_BOUND)
+    assert tt.probe(first) is None
+    assert tt.probe(second)[:3] == (7, 2, LOWER_BOUND)
+    assert (tt.rejections, tt.replacements) == (1, 1)
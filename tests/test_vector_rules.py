@@ -0,0 +1,53 @@
+"""vector_rules against the engine, one board per row."""
+
+import numpy as np
+
+import vector_rules as vr
+from ai import sample_positions
+from engine import POINTS, POINT_INDEX, Position
+
+POSITIONS = sample_positions(300, seed=6, max_plies=80)
+
+
+def table_move(index):
+    capture = vr.MOVE_CAPTURE[index]
+    return (POINTS[vr.MOVE_FROM[index]], POINTS[vr.MOVE_TO[index]],
+            None if capture == vr.NO_CAPTURE else POINTS[capture])
+
+
+def test_legal_moves_match_the_engine():
+    fox, geese, fox_turn = vr.from_positions(POSITIONS)
+    legal = vr.legal_mask(fox, geese, fox_turn)
+    actions, has_move = vr.action_mask(fox, geese, fox_turn)
+    for row, position in enumerate(POSITIONS):
+        expected = sorted(position.legal_moves(), key=repr)
+        moves = sorted(map(table_move, np.nonzero(legal[row])[0]), key=repr)
+        assert moves == expected
+        assert has_move[row] == bool(expected)
+        assert set(np.nonzero(actions[row])[0]) == {
+            POINT_INDEX[frm] * vr.NUM_POINTS + POINT_INDEX[to]
+            for frm, to, _ in expected}
+
+
+def test_apply_moves_matches_play():
+    fox, geese, fox_turn = vr.from_positions(POSITIONS)
+    rows, moves = np.nonzero(vr.legal_mask(fox, geese, fox_turn))
+    fox, geese, fox_turn = fox[rows], geese[rows], fox_turn[rows]
+    vr.apply_moves(fox, geese, fox_turn, moves)
+    bitboards = vr.to_geese_bitboards(geese)
+    keys = vr.position_keys(fox, geese, fox_turn)
+    for i, (row, move) in enumerate(zip(rows, moves)):
+        child = POSITIONS[row].play(table_move(move))
+        assert Position(POINTS[fox[i]], int(bitboards[i]),
+                        bool(fox_turn[i])) == child
+        assert int(keys[i]) == child.key()
+
+
+def test_playouts_score_finished_boards():
+    # Fox to move and boxed in: the geese have already won.
+    trapped = Position(POINTS[0], sum(1 << sq for sq in POINTS[1:]), True)
+    fox, geese, fox_turn = vr.from_positions([trapped] + POSITIONS[:50])
+    outcome = vr.random_playouts(fox, geese, fox_turn,
+                                 np.random.default_rng(0))
+    assert outcome[0] == -1
+    assert set(outcome.tolist()) <= {-1, 0, 1}
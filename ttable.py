@@ -0,0 +1,149 @@
+"""Fixed-size transposition table keyed by 64-bit Zobrist keys.
+
+Entries live in parallel `array` columns instead of Python objects, so the
+table costs a fixed ~16 bytes per slot no matter how full it gets.  A slot is
+picked from the low bits of the key; when two positions collide, the one
+searched to the greater depth is kept.
+"""
+
+from array import array
+from multiprocessing import shared_memory
+
+EXACT = 0
+LOWER_BOUND = 1  # score is at least the stored value (fail-high)
+UPPER_BOUND = 2  # score is at most the stored value (fail-low)
+
+NO_MOVE = -1
+
+
+class TranspositionTable:
+    def __init__(self, size_bits=20):
+        self.size = 1 << size_bits
+        self.mask = self.size - 1
+        self.clear()
+
+    def clear(self):
+        self.keys = array("Q", bytes(8 * self.size))
+        self.scores = array("i", bytes(4 * self.size))
+        self.moves = array("i", [NO_MOVE]) * self.size
+        # depth + 1, so 0 marks an empty slot
+        self.depths = array("b", bytes(self.size))
+        self.flags = array("B", bytes(self.size))
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.probes = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.replacements = 0
+        self.rejections = 0
+
+    def probe(self, key):
+        """Return (depth, score, flag, move) for `key`, or None on a miss."""
+        self.probes += 1
+        slot = key & self.mask
+        if self.depths[slot] and self.keys[slot] == key:
+            self.hits += 1
+            return (self.depths[slot] - 1, self.scores[slot], self.flags[slot],
+                    self.moves[slot])
+        self.misses += 1
+        return None
+
+    def store(self, key, depth, score, flag, move=NO_MOVE):
+        """Store an entry, keeping the deeper of two colliding positions."""
+        slot = key & self.mask
+        stored_depth = self.depths[slot]
+        if stored_depth and self.keys[slot] != key:
+            if depth + 1 < stored_depth:
+                self.rejections += 1
+                return False
+            self.replacements += 1
+        self.stores += 1
+        self.keys[slot] = key
+        self.depths[slot] = min(depth, 126) + 1
+        self.scores[slot] = score
+        self.flags[slot] = flag
+        self.moves[slot] = move
+        return True
+
+    def hit_rate(self):
+        return self.hits / self.probes if self.probes else 0.0
+
+    def occupancy(self):
+        used = sum(1 for d in self.depths if d)
+        return used / self.size
+
+    def stats(self):
+        return {
+            "size": self.size,
+            "probes": self.probes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate(),
+            "stores": self.stores,
+            "replacements": self.replacements,
+            "rejections": self.rejections,
+        }
+
+
+class SharedTranspositionTable(TranspositionTable):
+    """Transposition table in shared memory for several search processes.
+
+    Each slot is two 64-bit words: the entry packed into one word, and the
+    key XOR-ed with that word.  Processes read and write without locks; a
+    slot torn by two concurrent writers simply fails the key check and reads
+    as a miss.  Create it once with create=True and attach from each worker
+    by name.
+    """
+
+    def __init__(self, size_bits=20, name=None, create=False):
+        self.size = 1 << size_bits
+        self.size_bits = size_bits
+        self.mask = self.size - 1
+        self.shm = shared_memory.SharedMemory(name=name, create=create,
+                                              size=16 * self.size)
+        self.name = self.shm.name
+        self.words = self.shm.buf.cast("Q")
+        self.reset_stats()
+
+    def close(self):
+        self.words.release()
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+    def clear(self):
+        self.shm.buf[:] = bytes(16 * self.size)
+        self.reset_stats()
+
+    def occupancy(self):
+        used = sum(1 for i in range(1, 2 * self.size, 2) if self.words[i])
+        return used / self.size
+
+    def probe(self, key):
+        self.probes += 1
+        slot = (key & self.mask) << 1
+        data = self.words[slot + 1]
+        if data and self.words[slot] ^ data == key:
+            self.hits += 1
+            return ((data & 0x7F) - 1, (data >> 32) - 0x80000000,
+                    (data >> 7) & 3, ((data >> 9) & 0x3FFFF) - 1)
+        self.misses += 1
+        return None
+
+    def store(self, key, depth, score, flag, move=NO_MOVE):
+        slot = (key & self.mask) << 1
+        old = self.words[slot + 1]
+        if old and self.words[slot] ^ old != key:
+            if depth + 1 < (old & 0x7F):
+                self.rejections += 1
+                return False
+            self.replacements += 1
+        self.stores += 1
+        data = ((min(depth, 126) + 1) | (flag << 7) | ((move + 1) << 9) |
+                ((score + 0x80000000) << 32))
+        self.words[slot] = key ^ data
+        self.words[slot + 1] = data
+        return True
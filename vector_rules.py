@@ -0,0 +1,245 @@
+"""Fox and Geese rules over NumPy arrays, for many boards at once.
+
+A batch of B positions is three arrays:
+
+    fox       (B,)     int   point index of the fox (engine.POINTS order)
+    geese     (B, 33)  bool  True where a goose stands
+    fox_turn  (B,)     bool  side to move
+
+Every move that can ever be legal is listed once in the MOVE_* tables, so
+legality for the whole batch is a handful of fancy-indexing operations on a
+(B, NUM_MOVES) array and no Python loop runs per board.  The tables come
+from the engine's move tables, which in turn come from
+rules.initialize_diagonal_connections().
+"""
+
+import numpy as np
+
+from engine import (POINTS, POINT_INDEX, FOX_STEPS, FOX_JUMPS, GOOSE_SHIFTS,
+                    FOX_KEYS, GOOSE_KEYS)
+from rules import ZOBRIST_FOX_TURN
+
+NUM_POINTS = len(POINTS)
+NO_CAPTURE = NUM_POINTS  # extra always-true column in geese_with_sentinel()
+
+
+def _build_move_table():
+    moves = []  # (is_fox, from_point, to_point, capture_point)
+    for shift, source in GOOSE_SHIFTS:
+        for sq in POINTS:
+            if (source >> sq) & 1:
+                moves.append((False, POINT_INDEX[sq], POINT_INDEX[sq + shift],
+                              NO_CAPTURE))
+    for sq in POINTS:
+        for to in FOX_STEPS[sq]:
+            moves.append((True, POINT_INDEX[sq], POINT_INDEX[to], NO_CAPTURE))
+        for mid, land in FOX_JUMPS[sq]:
+            moves.append((True, POINT_INDEX[sq], POINT_INDEX[land],
+                          POINT_INDEX[mid]))
+    return moves
+
+
+_MOVES = _build_move_table()
+NUM_MOVES = len(_MOVES)
+MOVE_IS_FOX = np.array([m[0] for m in _MOVES], dtype=bool)
+MOVE_FROM = np.array([m[1] for m in _MOVES], dtype=np.int64)
+MOVE_TO = np.array([m[2] for m in _MOVES], dtype=np.int64)
+MOVE_CAPTURE = np.array([m[3] for m in _MOVES], dtype=np.int64)
+
+NUM_GOOSE_MOVES = int((~MOVE_IS_FOX).sum())  # goose moves come first
+
+# Fixed discrete action space for agents: action = from_point * 33 + to_point.
+# Within one side every move has its own action; a goose move and a fox step
+# between the same two points share an action, told apart by the side to
+# move.  MOVE_OF_ACTION[fox_turn, action] is the table move or -1.
+NUM_ACTIONS = NUM_POINTS * NUM_POINTS
+ACTION_OF_MOVE = MOVE_FROM * NUM_POINTS + MOVE_TO
+MOVE_OF_ACTION = np.full((2, NUM_ACTIONS), -1, dtype=np.int64)
+MOVE_OF_ACTION[MOVE_IS_FOX.astype(np.int64), ACTION_OF_MOVE] = np.arange(NUM_MOVES)
+
+# Fox moves grouped by the fox's point, padded with NUM_MOVES (a dummy
+# column that is never legal) so each row has the same width.
+_fox_groups = [[] for _ in range(NUM_POINTS)]
+for _i in np.nonzero(MOVE_IS_FOX)[0]:
+    _fox_groups[MOVE_FROM[_i]].append(_i)
+MAX_FOX_MOVES = max(len(g) for g in _fox_groups)
+FOX_MOVES_FROM = np.full((NUM_POINTS, MAX_FOX_MOVES), NUM_MOVES, dtype=np.int64)
+for _point, _group in enumerate(_fox_groups):
+    FOX_MOVES_FROM[_point, :len(_group)] = _group
+_PADDED_TO = np.append(MOVE_TO, 0)
+_PADDED_CAPTURE = np.append(MOVE_CAPTURE, NO_CAPTURE)
+_PADDED_REAL = np.append(np.ones(NUM_MOVES, dtype=bool), False)
+
+_POINT_SQUARES = np.array(POINTS, dtype=np.uint64)
+
+
+def geese_with_sentinel(geese):
+    """geese plus a trailing True column, so NO_CAPTURE always passes."""
+    padded = np.ones((geese.shape[0], NUM_POINTS + 1), dtype=bool)
+    padded[:, :NUM_POINTS] = geese
+    return padded
+
+
+def empty_points(fox, geese):
+    empty = ~geese
+    empty[np.arange(len(fox)), fox] = False
+    return empty
+
+
+def legal_mask(fox, geese, fox_turn):
+    """(B, NUM_MOVES) bool: which table moves are legal on each board."""
+    empty = empty_points(fox, geese)
+    from_ok = np.where(MOVE_IS_FOX, fox[:, None] == MOVE_FROM,
+                       geese[:, MOVE_FROM])
+    legal = from_ok & (MOVE_IS_FOX == fox_turn[:, None])
+    legal &= empty[:, MOVE_TO]
+    legal &= geese_with_sentinel(geese)[:, MOVE_CAPTURE]
+    return legal
+
+
+def goose_legal(fox, geese):
+    """(B, NUM_GOOSE_MOVES) bool for boards with the geese to move."""
+    empty = empty_points(fox, geese)
+    goose_from = MOVE_FROM[:NUM_GOOSE_MOVES]
+    goose_to = MOVE_TO[:NUM_GOOSE_MOVES]
+    return geese[:, goose_from] & empty[:, goose_to]
+
+
+def fox_legal(fox, geese):
+    """(candidates, legal), both (B, MAX_FOX_MOVES), for boards with the fox
+    to move; candidates are move-table indices."""
+    empty = empty_points(fox, geese)
+    candidates = FOX_MOVES_FROM[fox]
+    rows = np.arange(len(fox))[:, None]
+    legal = _PADDED_REAL[candidates]
+    legal &= empty[rows, _PADDED_TO[candidates]]
+    legal &= geese_with_sentinel(geese)[rows, _PADDED_CAPTURE[candidates]]
+    return candidates, legal
+
+
+_PADDED_ACTION = np.append(ACTION_OF_MOVE, 0)
+
+
+def action_mask(fox, geese, fox_turn):
+    """(B, NUM_ACTIONS) legal-action mask, and (B,) whether any move exists.
+
+    Only the side to move's candidate moves are examined, and only the legal
+    entries are written, so the cost is dominated by allocating the mask.
+    """
+    count = len(fox)
+    mask = np.zeros((count, NUM_ACTIONS), dtype=bool)
+    has_move = np.zeros(count, dtype=bool)
+    flat = mask.reshape(-1)
+    goose_rows = np.nonzero(~fox_turn)[0]
+    if len(goose_rows):
+        legal = goose_legal(fox[goose_rows], geese[goose_rows])
+        has_move[goose_rows] = legal.any(axis=1)
+        cells = goose_rows[:, None] * NUM_ACTIONS + ACTION_OF_MOVE[:NUM_GOOSE_MOVES]
+        flat[cells[legal]] = True
+    fox_rows = np.nonzero(fox_turn)[0]
+    if len(fox_rows):
+        candidates, legal = fox_legal(fox[fox_rows], geese[fox_rows])
+        has_move[fox_rows] = legal.any(axis=1)
+        cells = fox_rows[:, None] * NUM_ACTIONS + _PADDED_ACTION[candidates]
+        flat[cells[legal]] = True
+    return mask, has_move
+
+
+def apply_moves(fox, geese, fox_turn, moves, active=None):
+    """Play table move `moves[b]` on every board b (in place).
+
+    Boards where `active` is False are left untouched.
+    """
+    if active is None:
+        active = np.ones(len(fox), dtype=bool)
+    rows = np.nonzero(active)[0]
+    chosen = moves[rows]
+    is_fox = MOVE_IS_FOX[chosen]
+    fox_rows = rows[is_fox]
+    goose_rows = rows[~is_fox]
+    goose_moves = chosen[~is_fox]
+    geese[goose_rows, MOVE_FROM[goose_moves]] = False
+    geese[goose_rows, MOVE_TO[goose_moves]] = True
+    fox_moves = chosen[is_fox]
+    fox[fox_rows] = MOVE_TO[fox_moves]
+    captures = MOVE_CAPTURE[fox_moves]
+    took = captures != NO_CAPTURE
+    geese[fox_rows[took], captures[took]] = False
+    fox_turn[rows] = ~fox_turn[rows]
+
+
+def random_moves(legal, rng):
+    """A uniformly random legal move per board, and whether one exists."""
+    keys = rng.random(legal.shape)
+    keys[~legal] = -1.0
+    return keys.argmax(axis=1), legal.any(axis=1)
+
+
+def from_positions(positions):
+    """Convert engine.Position objects into (fox, geese, fox_turn) arrays."""
+    fox = np.array([POINT_INDEX[p.fox] for p in positions], dtype=np.int64)
+    bits = np.array([p.geese for p in positions], dtype=np.uint64)
+    geese = ((bits[:, None] >> _POINT_SQUARES) & np.uint64(1)).astype(bool)
+    fox_turn = np.array([p.fox_turn for p in positions], dtype=bool)
+    return fox, geese, fox_turn
+
+
+def to_geese_bitboards(geese):
+    """(B,) uint64 engine bitboards for a (B, 33) goose array."""
+    return (geese.astype(np.uint64) << _POINT_SQUARES).sum(axis=1,
+                                                          dtype=np.uint64)
+
+
+_FOX_KEYS = np.array([FOX_KEYS[sq] for sq in POINTS], dtype=np.uint64)
+_GOOSE_KEYS = np.array([GOOSE_KEYS[sq] for sq in POINTS], dtype=np.uint64)
+
+
+def position_keys(fox, geese, fox_turn):
+    """(B,) uint64 Zobrist keys, equal to engine.position_key."""
+    keys = _FOX_KEYS[fox] ^ np.bitwise_xor.reduce(
+        np.where(geese, _GOOSE_KEYS, np.uint64(0)), axis=1)
+    keys[fox_turn] ^= np.uint64(ZOBRIST_FOX_TURN)
+    return keys
+
+
+def random_playouts(fox, geese, fox_turn, rng, max_plies=200):
+    """Play every board out with uniformly random moves.
+
+    Works on copies.  Returns (B,) int8: +1 fox won, -1 geese won, 0 if
+    still undecided after `max_plies`.  Finished boards are dropped from the
+    working arrays, and each ply only looks at the moves of the side to move.
+    """
+    fox = fox.copy()
+    geese = geese.copy()
+    fox_turn = fox_turn.copy()
+    outcome = np.zeros(len(fox), dtype=np.int8)
+    index = np.arange(len(fox))
+    moves = np.zeros(len(fox), dtype=np.int64)
+    has_move = np.zeros(len(fox), dtype=bool)
+    for ply in range(max_plies + 1):
+        few_geese = geese.sum(axis=1) < 3
+        has_move[:] = False
+        fox_rows = np.nonzero(fox_turn & ~few_geese)[0]
+        if len(fox_rows):
+            candidates, legal = fox_legal(fox[fox_rows], geese[fox_rows])
+            choice, any_legal = random_moves(legal, rng)
+            moves[fox_rows] = candidates[np.arange(len(fox_rows)), choice]
+            has_move[fox_rows] = any_legal
+        goose_rows = np.nonzero(~fox_turn & ~few_geese)[0]
+        if len(goose_rows):
+            legal = goose_legal(fox[goose_rows], geese[goose_rows])
+            moves[goose_rows], has_move[goose_rows] = random_moves(legal, rng)
+        # Fewer than three geese: fox wins.  No move: the side to move loses.
+        done = few_geese | ~has_move
+        outcome[index[done]] = np.where(few_geese[done] | ~fox_turn[done], 1, -1)
+        if ply == max_plies:
+            break
+        keep = ~done
+        if not keep.all():
+            index, fox, geese, fox_turn = (index[keep], fox[keep], geese[keep],
+                                           fox_turn[keep])
+            moves, has_move = moves[keep], has_move[keep]
+        if not len(index):
+            break
+        apply_moves(fox, geese, fox_turn, moves)
+    return outcome